@@ -3,6 +3,7 @@ from flask import Flask
 app = Flask(__name__)
 
 from application import api
+from application import commands
 # from application import views
 
 # tentative
@@ -6,22 +6,41 @@ from flask          import jsonify
 
 # API RESOURCE PATTERN
 
-# GET         /data/get/<id>    get data data by id
-# GET         /data/get/all     get data list
+# GET         /data/get/<id>    get data data by id (?fields=a,b)
+# GET         /data/get/all     get data list (?limit=&after=<cursor>, ?stream=1 for NDJSON, ?fields=a,b,
+#                               ?<column>=v1,v2 and ?from=&to= filters, see models.py)
 # POST        /data/upsert/     upsert data
 # POST        /data/delete/     delete data
+# POST|PATCH|DELETE /api/<model>/bulk   list of items / items with ids / list of ids (?chunk_size=)
+#
+# Every /api route takes HTTP Basic auth (API_USERNAME / API_PASSWORD, or a
+# User with a role in API_USER_ROLES; see data/repositories/credentials.py).
 
 R = Repository()
 cm_util = R.get_common_util()
+sched_util = R.get_scheduling_util()
+queue_util = R.get_queue_util()
+events_util = R.get_events_util()
+eta_util = R.get_eta_util()
+outbox_util = R.get_outbox_util()
+loyalty_util = R.get_loyalty_util()
+ratings_util = R.get_ratings_util()
+reports_util = R.get_reports_util()
+exports_util = R.get_exports_util()
+imports_util = R.get_imports_util()
+credentials_util = R.get_credentials_util()
+principals_util = R.get_principals_util()
+assignment_util = R.get_assignment_util()
 
 @auth.verify_password
 def authenticate(username, password):
-    if username and password:
-        if username == 'hifi' and password == 'hifi':
-            return True
-        else:
-            return False
-            
+    return credentials_util.authenticate(username, password)
+
+def wants_stream():
+    if request.args.get('stream') in ('1', 'true'):
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
 # Routes for CRUD Operations
 models = {
     "user":         (cm_util.User,          ["name", "email", "phone", "password", "role"]),
@@ -29,9 +48,9 @@ models = {
     "appointment":  (cm_util.Appointment,   ["user_id", "vehicle_id", "service_type", "appointment_date"]),
     "payment":      (cm_util.Payment,       ["appointment_id", "amount", "payment_method", "transaction_date"]),
     "notification": (cm_util.Notification,  ["user_id", "message", "created_at"]),
-    "loyalty":      (cm_util.Loyalty,       ["user_id", "points", "reward_status"]),
+    "loyalty":      (cm_util.Loyalty,       ["user_id", "points_earned", "reward_status"]),
     "service":      (cm_util.Service,       ["name", "description", "price", "duration"]),
-    "queue":        (cm_util.Queue,         ["appointment_id", "position"]),
+    "queue":        (cm_util.Queue,         ["appointment_id"]),
     "staff":        (cm_util.Staff,         ["name", "role", "phone", "email"]),
     "feedback":     (cm_util.Feedback,      ["user_id", "appointment_id", "rating", "created_at"])
 }
@@ -39,38 +58,250 @@ models = {
 def register_routes(model_name, model, required_fields):
 
     @app.route(f'/api/{model_name}', methods=['POST'], endpoint=f'create_{model_name}')
-    # @login_required
+    @auth.login_required
     def create(model=model):
         return cm_util.create_record(model, request.json, required_fields)
 
     @app.route(f'/api/{model_name}', methods=['GET'], endpoint=f'readall_{model_name}')
-    # @login_required
+    @auth.login_required
     def readall(model=model):
-        return cm_util.read_records(model)
+        if wants_stream():
+            return cm_util.stream_records(model, request.args)
+        return cm_util.read_records(model, request.args)
+
+    @app.route(f'/api/{model_name}/bulk', methods=['POST'], endpoint=f'bulk_create_{model_name}')
+    @auth.login_required
+    def bulk_create(model=model):
+        return cm_util.bulk_create_records(model, request.json, required_fields, request.args)
+
+    @app.route(f'/api/{model_name}/bulk', methods=['PATCH'], endpoint=f'bulk_update_{model_name}')
+    @auth.login_required
+    def bulk_update(model=model):
+        return cm_util.bulk_update_records(model, request.json, request.args)
+
+    @app.route(f'/api/{model_name}/bulk', methods=['DELETE'], endpoint=f'bulk_delete_{model_name}')
+    @auth.login_required
+    def bulk_delete(model=model):
+        return cm_util.bulk_delete_records(model, request.json, request.args)
 
     @app.route(f'/api/{model_name}/<int:id>', methods=['GET'], endpoint=f'read_{model_name}')
-    # @login_required
+    @auth.login_required
     def read(id, model=model):
-        return cm_util.read_record(model, id)
+        return cm_util.read_record(model, id, request.args)
 
     @app.route(f'/api/{model_name}/<int:id>', methods=['PUT'], endpoint=f'update_{model_name}')
-    # @login_required
+    @auth.login_required
     def update(id, model=model):
         return cm_util.update_record(model, id, request.json)
 
     @app.route(f'/api/{model_name}/<int:id>', methods=['DELETE'], endpoint=f'delete_{model_name}')
-    # @login_required
+    @auth.login_required
     def delete(id, model=model):
         return cm_util.delete_record(model, id)
 
 for model_name, (model, required_fields) in models.items():
     register_routes(model_name, model, required_fields)
 
+# Write hooks, run in registration order inside the write transaction.
+cm_util.add_hook(cm_util.Appointment, 'before_create', assignment_util.engine.assign)
+cm_util.add_hook(cm_util.Appointment, 'before_create', sched_util.engine.guard_booking)
+cm_util.add_hook(cm_util.Appointment, 'before_insert', outbox_util.booking_notifications)
+cm_util.add_hook(cm_util.Appointment, 'before_update', sched_util.engine.guard_update)
+cm_util.add_hook(cm_util.Appointment, 'before_update', eta_util.estimator.completing)
+cm_util.add_hook(cm_util.Staff, 'before_update', assignment_util.engine.going_off_shift)
+cm_util.add_hook(cm_util.Queue, 'before_create', queue_util.engine.assign_rank)
+cm_util.add_hook(cm_util.Loyalty, 'before_insert', loyalty_util.inserted)
+cm_util.add_hook(cm_util.Loyalty, 'before_update', loyalty_util.updated)
+cm_util.add_hook(cm_util.Loyalty, 'before_delete', loyalty_util.deleted)
+cm_util.add_hook(cm_util.Feedback, 'before_create', ratings_util.validate)
+cm_util.add_hook(cm_util.Feedback, 'before_insert', ratings_util.inserted)
+cm_util.add_hook(cm_util.Feedback, 'before_update', ratings_util.updated)
+cm_util.add_hook(cm_util.Feedback, 'before_delete', ratings_util.deleted)
+
+# Write listeners, run after the commit.
+cm_util.add_listener(cm_util.Queue, queue_util.engine.changed)
+cm_util.add_listener(cm_util.Queue, events_util.publish_change)
+cm_util.add_listener(cm_util.Appointment, events_util.publish_change)
+cm_util.add_listener(cm_util.Appointment, eta_util.estimator.completed)
+cm_util.add_listener(cm_util.Appointment, assignment_util.engine.changed)
+cm_util.add_listener(cm_util.Appointment, sched_util.engine.changed)
+cm_util.add_listener(cm_util.Staff, assignment_util.engine.shift_changed)
+cm_util.add_listener(cm_util.User, credentials_util.cache.changed)
+cm_util.add_listener(cm_util.User, principals_util.changed)
+
+# ==================================================================================
+# SCHEDULING
+
+# ?staff_id=&start=<iso>&service_type=
+@app.route(f'/api/schedule/check', methods=['GET'], endpoint=f'schedule_check')
+@auth.login_required
+def schedule_check():
+    return sched_util.check_slot(request.args)
+
+# ?service_type=&start=<iso>&end=<iso>[&staff_id=&limit=]
+@app.route(f'/api/schedule/free', methods=['GET'], endpoint=f'schedule_free')
+@auth.login_required
+def schedule_free():
+    return sched_util.free_slots(request.args)
+
+# ==================================================================================
+# QUEUE
+
+# Serving entries, then the waiting line in order (?limit=)
+@app.route(f'/api/queue/current', methods=['GET'], endpoint=f'queue_current')
+@auth.login_required
+def queue_current():
+    return queue_util.current(request.args)
+
+# {"appointment_id": <id>}
+@app.route(f'/api/queue/enqueue', methods=['POST'], endpoint=f'queue_enqueue')
+@auth.login_required
+def queue_enqueue():
+    return queue_util.enqueue(request.json)
+
+@app.route(f'/api/queue/next', methods=['POST'], endpoint=f'queue_next')
+@auth.login_required
+def queue_next():
+    return queue_util.serve_next()
+
+# {"position": <1-based place in line>}
+@app.route(f'/api/queue/<int:id>/move', methods=['POST'], endpoint=f'queue_move')
+@auth.login_required
+def queue_move(id):
+    return queue_util.move(id, request.json)
+
+@app.route(f'/api/queue/<int:id>/cancel', methods=['POST'], endpoint=f'queue_cancel')
+@auth.login_required
+def queue_cancel(id):
+    return queue_util.cancel(id)
+
+@app.route(f'/api/queue/<int:id>/done', methods=['POST'], endpoint=f'queue_done')
+@auth.login_required
+def queue_done(id):
+    return queue_util.done(id)
+
+@app.route(f'/api/queue/<int:id>/position', methods=['GET'], endpoint=f'queue_position')
+@auth.login_required
+def queue_position(id):
+    return queue_util.position(id)
+
+# Expected wait for every waiting position (?position= for one)
+@app.route(f'/api/queue/eta', methods=['GET'], endpoint=f'queue_eta')
+@auth.login_required
+def queue_eta():
+    return eta_util.queue_eta(request.args)
+
+@app.route(f'/api/queue/<int:id>/eta', methods=['GET'], endpoint=f'queue_entry_eta')
+@auth.login_required
+def queue_entry_eta(id):
+    return eta_util.entry_eta(id)
+
+# ==================================================================================
+# LOYALTY
+
+@app.route(f'/api/loyalty/balance/<int:user_id>', methods=['GET'], endpoint=f'loyalty_balance')
+@auth.login_required
+def loyalty_balance(user_id):
+    return loyalty_util.balance(user_id)
+
+# ==================================================================================
+# RATINGS
+
+# ?from=&to=<YYYY-MM-DD>&group_by=staff,service,day[&staff_id=&service_type=]
+@app.route(f'/api/feedback/stats', methods=['GET'], endpoint=f'feedback_stats')
+@auth.login_required
+def feedback_stats():
+    return ratings_util.rating_stats(request.args)
+
+# ==================================================================================
+# REPORTS
+
+# revenue | operations | utilization (?from=&to=<YYYY-MM-DD>, ?refresh=1)
+@app.route(f'/api/reports/<name>', methods=['GET'], endpoint=f'report')
+@auth.login_required
+def report(name):
+    return reports_util.report(name, request.args)
+
+# ==================================================================================
+# EXPORTS
+
+# appointments | payments (?format=csv|xlsx&from=&to=<YYYY-MM-DD>&status=, ?async=1)
+# Large exports answer 202 with a job; poll status_url, then fetch download_url.
+@app.route(f'/api/export/<name>', methods=['GET'], endpoint=f'export')
+@auth.login_required
+def export(name):
+    return exports_util.export(name, request.args)
+
+@app.route(f'/api/export/jobs/<job_id>', methods=['GET'], endpoint=f'export_job')
+@auth.login_required
+def export_job(job_id):
+    return exports_util.job_status(job_id)
+
+@app.route(f'/api/export/jobs/<job_id>/download', methods=['GET'], endpoint=f'export_download')
+@auth.login_required
+def export_download(job_id):
+    return exports_util.download(job_id)
+
+# ==================================================================================
+# IMPORTS
+
+# user | vehicle | service, multipart 'file' (.csv / .xlsx) with a header row
+# (?chunk_size=&start_row=<first data row to read, 1-based>). Vehicles may give
+# user_email or user_phone instead of user_id.
+@app.route(f'/api/import/<model_name>', methods=['POST'], endpoint=f'import')
+@auth.login_required
+def import_records(model_name):
+    if model_name not in models:
+        return {"error": f"Unknown model {model_name}"}, 404
+    model, required_fields = models[model_name]
+    return imports_util.import_records(model, request.files.get('file'), required_fields, request.args)
+
+# ==================================================================================
+# EVENTS
+
+# text/event-stream of committed changes (?channels=queue,appointment; resumes from Last-Event-ID)
+@app.route(f'/api/events', methods=['GET'], endpoint=f'events')
+@auth.login_required
+def events():
+    return events_util.events(request.args, request.headers)
+
+# ==================================================================================
+# STATS
+
+@app.route(f'/api/stats/cache', methods=['GET'], endpoint=f'cache_stats')
+@auth.login_required
+def cache_stats():
+    return cm_util.cache_stats()
+
+@app.route(f'/api/stats/events', methods=['GET'], endpoint=f'events_stats')
+@auth.login_required
+def events_stats():
+    return events_util.stats()
+
+@app.route(f'/api/stats/outbox', methods=['GET'], endpoint=f'outbox_stats')
+@auth.login_required
+def outbox_stats():
+    return outbox_util.stats()
+
+# Credential checks (CPU seconds spent verifying), cache hits and bulk password hashing
+@app.route(f'/api/stats/auth', methods=['GET'], endpoint=f'auth_stats')
+@auth.login_required
+def auth_stats():
+    return credentials_util.stats()
+
 # ==================================================================================
 # FACTORY
 
-# Call functions to generate data
+# Call functions to generate data (?n=<rows per table, up to API_FACTORY_MAX_ROWS>&seed=<int>)
+# Development only: answers 404 unless the app runs in debug mode or TESTING.
 @app.route(f'/api/factory', methods=['GET'], endpoint=f'factory')
+@auth.login_required
 def factory():
-    R.start_factory()
-    return jsonify({"message": "Dummy Data Created."})
+    if not (app.debug or app.testing):
+        return {"error": "Not found"}, 404
+    n = request.args.get('n', 10, type=int)
+    seed = request.args.get('seed', type=int)
+    if n is None or n < 1:
+        return {"error": "n must be a positive integer"}, 400
+    result = R.start_factory(n=min(n, app.config['API_FACTORY_MAX_ROWS']), seed=seed)
+    return jsonify({"message": "Dummy Data Created.", "seed": result["seed"], "rows": result["rows"]})
@@ -0,0 +1,43 @@
+from application    import app
+from data.repo      import Repository
+import click
+
+# CLI COMMANDS (flask <command>)
+
+R = Repository()
+outbox_util = R.get_outbox_util()
+loyalty_util = R.get_loyalty_util()
+ratings_util = R.get_ratings_util()
+
+@app.cli.command('outbox-worker')
+@click.option('--once', is_flag=True, help='Deliver one batch and exit.')
+def outbox_worker(once):
+    """Deliver pending notifications through NOTIFY_TRANSPORT."""
+    try:
+        worker = outbox_util.OutboxWorker(app)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    try:
+        if once:
+            click.echo(f"{worker.run_once()} notifications handled")
+            return
+        click.echo(f"Outbox worker started ({type(worker.transport).__name__})")
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.stop()
+        click.echo(f"Outbox worker stopped: {worker.counters}")
+
+@app.cli.command('loyalty-reconcile')
+def loyalty_reconcile():
+    """Rebuild loyalty_balance from the Loyalty ledger."""
+    click.echo(f"{loyalty_util.reconcile()} balances rebuilt")
+
+@app.cli.command('feedback-backfill')
+@click.option('--from', 'start', type=click.DateTime(['%Y-%m-%d']), default=None, help='First day to rebuild.')
+@click.option('--to', 'end', type=click.DateTime(['%Y-%m-%d']), default=None, help='Last day to rebuild.')
+def feedback_backfill(start, end):
+    """Rebuild feedback_aggregate buckets from the Feedback table."""
+    buckets = ratings_util.backfill(start and start.date(), end and end.date())
+    click.echo(f"{buckets} rating buckets")
@@ -0,0 +1,189 @@
+"""
+CRUD benchmark for the generic API layer (data/repositories/common.py and
+application/api.py).
+
+For every dataset size the database is rebuilt, seeded through the
+Repository factory and then every model is exercised through the Flask test
+client: create, read-one, read-all, update and delete. Throughput and
+p50/p99 latencies of the successful requests are written as JSON so runs can
+be diffed over time; failed requests are counted per status code instead of
+being mixed into the latencies.
+
+    cd web
+    python benchmarks/bench_crud.py --sizes 10000,100000 --ops 200
+
+Defaults to a throwaway SQLite file; pass --database for anything else
+(e.g. mysql://root@localhost/db_hifi_bench).
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+OPERATIONS = ("create", "read_one", "read_all", "update", "delete")
+# Benchmark appointments are booked one per day from here, after anything the
+# factory seeds, so the double-booking guard never rejects them.
+BOOKING_START = datetime(2099, 1, 1, 12)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000', help='comma separated row counts per model (e.g. 10000,100000,1000000)')
+    parser.add_argument('--ops', type=int, default=200, help='requests per model and operation')
+    parser.add_argument('--database', default='sqlite:////tmp/hifi_bench.sqlite')
+    parser.add_argument('--seed', type=int, default=2025)
+    parser.add_argument('--processes', type=int, default=None, help='factory generation processes')
+    parser.add_argument('--output', default=None, help='result file (default: benchmarks/results/crud-<timestamp>.json)')
+    return parser.parse_args()
+
+# Payloads for POST and PUT, built from ids that exist after seeding.
+def create_payload(model_name, i, ids, slot):
+    now = datetime.now().isoformat()
+    pick = lambda name: random.choice(ids[name])
+    return {
+        "user"          : lambda: {"name": f"Bench {i}", "email": f"bench-{i}@example.com", "phone": f"+1-555-{i:07d}", "password": "bench", "role": "customer"},
+        "vehicle"       : lambda: {"user_id": pick("user"), "plate_number": f"BENCH-{i}", "model": "Vios", "type": "Sedan"},
+        "appointment"   : lambda: {"user_id": pick("user"), "staff_id": pick("staff"), "vehicle_id": pick("vehicle"), "service_type": "Full Wash", "appointment_date": slot.isoformat()},
+        "payment"       : lambda: {"appointment_id": pick("appointment"), "amount": 120, "payment_method": "Cash", "transaction_date": now},
+        "notification"  : lambda: {"user_id": pick("user"), "message": "Your car is ready", "created_at": now},
+        "loyalty"       : lambda: {"user_id": pick("user"), "points_earned": 10, "reward_status": "Available"},
+        "service"       : lambda: {"name": "Full Wash", "description": "Bench service", "price": 99, "duration": 45},
+        "queue"         : lambda: {"appointment_id": pick("appointment"), "position": i},
+        "staff"         : lambda: {"name": f"Bench Staff {i}", "role": "Washer", "phone": f"+1-555-{i:07d}", "email": f"staff-{i}@example.com"},
+        "feedback"      : lambda: {"user_id": pick("user"), "appointment_id": pick("appointment"), "rating": 5, "created_at": now},
+    }[model_name]()
+
+UPDATE_PAYLOADS = {
+    "user"          : {"name": "Bench Renamed"},
+    "vehicle"       : {"model": "Innova"},
+    "appointment"   : {"status": "Completed"},
+    "payment"       : {"payment_status": "Paid"},
+    "notification"  : {"status": "Read"},
+    "loyalty"       : {"reward_status": "Redeemed"},
+    "service"       : {"price": 109},
+    "queue"         : {"status": "Serving"},
+    "staff"         : {"phone": "+1-555-0000000"},
+    "feedback"      : {"comment": "Bench comment"},
+}
+
+def summarize(latencies, errors):
+    # latencies of successful requests only; errors maps status code -> count.
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        "ops"               : len(latencies),
+        "errors"            : sum(errors.values()),
+        "error_statuses"    : {str(status): count for status, count in sorted(errors.items())},
+        "throughput_ops_s"  : round(len(latencies) / total, 2) if total else None,
+        "mean_ms"           : round(statistics.mean(latencies) * 1000, 3) if latencies else None,
+        "p50_ms"            : round(latencies[int(len(latencies) * 0.50)] * 1000, 3) if latencies else None,
+        "p99_ms"            : round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3) if latencies else None,
+    }
+
+def timed(client, method, url, ok=(200, 304), **kwargs):
+    start = time.perf_counter()
+    response = getattr(client, method)(url, **kwargs)
+    elapsed = time.perf_counter() - start
+    return elapsed, response.status_code in ok, response
+
+def measure(client, requests):
+    # requests are (method, url, kwargs).
+    latencies, errors = [], {}
+    for method, url, kwargs in requests:
+        elapsed, ok, response = timed(client, method, url, **kwargs)
+        if ok:
+            latencies.append(elapsed)
+        else:
+            errors[response.status_code] = errors.get(response.status_code, 0) + 1
+    return summarize(latencies, errors)
+
+def run_model(app, client, model_name, model, ids, ops):
+    from data import db
+
+    results = {}
+    results["create"] = measure(client, [
+        ('post', f'/api/{model_name}', {"json": create_payload(model_name, 10 ** 7 + i, ids, BOOKING_START + timedelta(days=i))})
+        for i in range(ops)
+    ])
+    # Only rows created above are deleted later, so seeded rows that other
+    # tables reference stay intact.
+    with app.app_context():
+        seeded_max = max(ids[model_name], default=0)
+        created = [row.id for row in db.session.query(model.id).filter(model.id > seeded_max)]
+
+    sample = [random.choice(ids[model_name]) for _ in range(ops)]
+    for operation, method, make_url, kwargs in (
+        ("read_one", 'get', lambda id: f'/api/{model_name}/{id}', {}),
+        ("read_all", 'get', lambda id: f'/api/{model_name}?after={id}', {}),
+        ("update",   'put', lambda id: f'/api/{model_name}/{id}', {"json": UPDATE_PAYLOADS[model_name]}),
+    ):
+        results[operation] = measure(client, [(method, make_url(id), kwargs) for id in sample])
+
+    results["delete"] = measure(client, [('delete', f'/api/{model_name}/{id}', {}) for id in created])
+    return results
+
+def main():
+    args = parse_args()
+    os.environ['DATABASE_URL'] = args.database
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from application        import app
+    from application.api    import R, models
+    from data               import db
+    import sqlalchemy
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['SQL_INSTRUMENTATION'] = False
+    client = app.test_client()
+    credentials = f"{app.config['API_USERNAME']}:{app.config['API_PASSWORD']}".encode()
+    client.environ_base['HTTP_AUTHORIZATION'] = 'Basic ' + base64.b64encode(credentials).decode()
+    random.seed(args.seed)
+
+    report = {
+        "meta": {
+            "started_at"    : datetime.now().isoformat(),
+            "database"      : args.database.split('@')[-1],
+            "python"        : platform.python_version(),
+            "sqlalchemy"    : sqlalchemy.__version__,
+            "ops"           : args.ops,
+            "seed"          : args.seed,
+        },
+        "results": [],
+    }
+
+    for size in [int(size) for size in args.sizes.split(',')]:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            seed_started = time.perf_counter()
+            R.start_factory(n=size, seed=args.seed, processes=args.processes)
+            seed_seconds = time.perf_counter() - seed_started
+            ids = {
+                name: [row.id for row in db.session.query(model.id)]
+                for name, (model, _) in models.items()
+            }
+        print(f"rows={size} seeded in {seed_seconds:.1f}s", file=sys.stderr)
+        for model_name, (model, _) in models.items():
+            results = run_model(app, client, model_name, model, ids, args.ops)
+            for operation in OPERATIONS:
+                report["results"].append(dict(results[operation], rows=size, model=model_name, operation=operation))
+                print(f"  {model_name:<13}{operation:<10}{results[operation]['throughput_ops_s']} ops/s "
+                      f"p50={results[operation]['p50_ms']}ms p99={results[operation]['p99_ms']}ms "
+                      f"errors={results[operation]['error_statuses'] or 0}", file=sys.stderr)
+        report["results"].append({"rows": size, "operation": "seed", "seconds": round(seed_seconds, 3)})
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'results', f"crud-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(output)
+
+if __name__ == '__main__':
+    main()
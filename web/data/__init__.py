@@ -4,10 +4,39 @@ from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 from flask_httpauth import HTTPBasicAuth
 from application import app
+import os
+import tempfile
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql://root@localhost/db_hifi' 
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'mysql://root@localhost/db_hifi')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = True
 
+# API LIST PAGINATION
+app.config['API_PAGE_SIZE'] = 50
+app.config['API_MAX_PAGE_SIZE'] = 500
+app.config['API_STREAM_BATCH_SIZE'] = 1000
+
+# API BULK WRITES
+app.config['API_BULK_CHUNK_SIZE'] = 500
+app.config['API_BULK_MAX_CHUNK_SIZE'] = 5000
+app.config['API_BULK_MAX_ITEMS'] = 10000
+app.config['API_FACTORY_MAX_ROWS'] = 10000       # per table; /api/factory only runs in debug mode / TESTING
+app.config['PASSWORD_HASH_PROCESSES'] = min(4, os.cpu_count() or 1)    # pool for bulk / import password hashing
+app.config['PASSWORD_HASH_POOL_MIN'] = 8        # smaller batches are hashed inline
+
+# API OPTIMISTIC CONCURRENCY (Appointment, Payment and Queue carry a version)
+app.config['API_REQUIRE_IF_MATCH'] = False      # True: updates without If-Match / version get 428
+
+# READ-THROUGH CACHE (per model TTL in seconds and LRU bound)
+app.config['CACHE_MODELS'] = {
+    'Service'   : {'ttl': 300, 'max_entries': 256},
+    'Staff'     : {'ttl': 300, 'max_entries': 256},
+}
+# Shared directory for cross-worker invalidation. The default is shared by
+# every worker on this host; use shared storage when workers span hosts.
+# None keeps it in-process (single worker only; the queue line is then read
+# from the database on every request).
+app.config['CACHE_INVALIDATION_DIR'] = os.environ.get('CACHE_INVALIDATION_DIR', os.path.join(tempfile.gettempdir(), 'hifi-cache-bus'))
+
 # app.config['SQLALCHEMY_POOL_SIZE'] = 20
 # app.config['SQLALCHEMY_MAX_OVERFLOW'] = 20
 # app.config['SQLALCHEMY_POOL_TIMEOUT'] = 5
@@ -17,13 +46,107 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = True
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 
+# APPOINTMENT SCHEDULING
+app.config['SCHEDULE_INDEX_TTL'] = 30           # seconds a cached staff/day index is trusted for reads
+app.config['SCHEDULE_DEFAULT_DURATION'] = 60    # minutes, when service_type matches no Service
+app.config['SCHEDULE_SLOT_MINUTES'] = 15
+app.config['SCHEDULE_STAFF_ROLES'] = ('Washer', 'Cleaner')
+app.config['SCHEDULE_MAX_WINDOW_DAYS'] = 7
+
+# STAFF ASSIGNMENT (appointments created without staff_id)
+app.config['ASSIGN_SERVICE_ROLES'] = {          # service_type -> roles; others use SCHEDULE_STAFF_ROLES
+    'Exterior Wash'     : ('Washer',),
+    'Interior Clean'    : ('Cleaner',),
+}
+app.config['ASSIGN_HEAP_TTL'] = 60              # seconds before idle staff are re-floored at "now"
+
+# QUEUE
+app.config['QUEUE_ORDER_TTL'] = 30              # seconds the in-memory line is trusted without a write
+app.config['QUEUE_DEQUEUE_RETRIES'] = 5         # attempts when workers race for the head of the line
+
+# REPORTS (/api/reports/<name>)
+app.config['REPORTS_FETCH_SIZE'] = 50000        # rows per fetchmany batch
+app.config['REPORTS_CACHE_TTL'] = 300
+app.config['REPORTS_CACHE_ENTRIES'] = 64        # cached ranges per report
+app.config['REPORTS_MAX_DAYS'] = 366
+app.config['REPORTS_SHIFT_MINUTES'] = 480       # bookable minutes per washer per day
+
+# EXPORTS (/api/export/<name>)
+app.config['EXPORT_FETCH_SIZE'] = 5000          # rows per server-side cursor batch
+app.config['EXPORT_SYNC_MAX_ROWS'] = 100000     # larger exports run as background jobs
+app.config['EXPORT_DIR'] = os.environ.get('EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'cqas-exports'))
+app.config['EXPORT_WORKERS'] = 2
+app.config['EXPORT_RETENTION'] = 86400          # seconds finished export files are kept
+
+# IMPORTS (/api/import/<model>, chunked by ?chunk_size like bulk writes)
+app.config['IMPORT_MAX_ERRORS'] = 1000          # row errors listed in the response
+
+# QUEUE WAIT ESTIMATES
+app.config['ETA_EWMA_ALPHA'] = 0.2              # weight of the newest completion in the rolling means
+app.config['ETA_MAX_SAMPLE_MINUTES'] = 240      # longer completions are ignored as outliers
+app.config['ETA_SERVERS'] = None                # cars served in parallel; None counts SCHEDULE_STAFF_ROLES staff
+app.config['ETA_STATS_TTL'] = 300
+app.config['ETA_TABLE_TTL'] = 30
+
+# NOTIFICATION OUTBOX (delivered by `flask outbox-worker`)
+app.config['NOTIFY_TRANSPORT'] = os.environ.get('NOTIFY_TRANSPORT')   # e.g. data.repositories.outbox.SMTPTransport; required outside TESTING
+app.config['NOTIFY_BATCH_SIZE'] = 100
+app.config['NOTIFY_CONCURRENCY'] = 8            # sends in flight per worker
+app.config['NOTIFY_SKIP_LOCKED'] = True         # needs MySQL 8 / PostgreSQL; False falls back to FOR UPDATE
+app.config['NOTIFY_MAX_ATTEMPTS'] = 5
+app.config['NOTIFY_BACKOFF_BASE'] = 30          # seconds, doubled per attempt
+app.config['NOTIFY_BACKOFF_MAX'] = 3600
+app.config['NOTIFY_CLAIM_TIMEOUT'] = 300        # seconds before a 'Sending' row is retried
+app.config['NOTIFY_POLL_INTERVAL'] = 2
+app.config['NOTIFY_SEND_TIMEOUT'] = 10
+app.config['NOTIFY_ON_BOOKING'] = True
+app.config['NOTIFY_BOOKING_MESSAGE'] = 'Your {service_type} appointment on {appointment_date:%b %d, %I:%M %p} is booked.'
+app.config['TWILIO_ACCOUNT_SID'] = os.environ.get('TWILIO_ACCOUNT_SID')
+app.config['TWILIO_AUTH_TOKEN'] = os.environ.get('TWILIO_AUTH_TOKEN')
+app.config['TWILIO_FROM_NUMBER'] = os.environ.get('TWILIO_FROM_NUMBER')
+app.config['SMTP_HOST'] = os.environ.get('SMTP_HOST', 'localhost')
+app.config['SMTP_PORT'] = int(os.environ.get('SMTP_PORT', 587))
+app.config['SMTP_USE_TLS'] = True
+app.config['SMTP_USERNAME'] = os.environ.get('SMTP_USERNAME')
+app.config['SMTP_PASSWORD'] = os.environ.get('SMTP_PASSWORD')
+app.config['SMTP_FROM'] = os.environ.get('SMTP_FROM', 'noreply@hifi.local')
+app.config['SMTP_SUBJECT'] = 'HiFi Car Wash'
+
+# CHANGE EVENTS (Server-Sent Events on /api/events)
+# FileBackend needs flock (POSIX); LocalBackend is single worker only (e.g. Windows dev server)
+app.config['EVENTS_BACKEND'] = os.environ.get('EVENTS_BACKEND', 'data.repositories.events.FileBackend' if os.name == 'posix'
+                                              else 'data.repositories.events.LocalBackend')
+app.config['EVENTS_LOG_DIR'] = os.environ.get('EVENTS_LOG_DIR', os.path.join(tempfile.gettempdir(), 'hifi-events'))
+app.config['EVENTS_LOG_MAX_BYTES'] = 16 << 20   # log is rotated past this (clients behind get a reset)
+app.config['EVENTS_POLL_SECONDS'] = 0.1
+app.config['EVENTS_CHANNELS'] = ('queue', 'appointment')
+app.config['EVENTS_CLIENT_QUEUE_SIZE'] = 100    # undelivered events before a slow client is evicted
+app.config['EVENTS_REPLAY_SIZE'] = 1000         # recent events kept for Last-Event-ID reconnects
+app.config['EVENTS_MAX_SUBSCRIBERS'] = 500      # open streams per worker
+app.config['EVENTS_HEARTBEAT_SECONDS'] = 15
+app.config['EVENTS_MAX_STREAM_SECONDS'] = 300   # streams end after this; clients reconnect
+app.config['EVENTS_RETRY_MS'] = 3000
+
+# SQL INSTRUMENTATION (Server-Timing header and 'sql' logger per request)
+from data.instrumentation import SQLInstrumentation
+app.config['SQL_INSTRUMENTATION'] = True
+app.config['SQL_NPLUS1_THRESHOLD'] = 5
+sql_instrumentation = SQLInstrumentation(app)
+
 # WEB VIEWS WITH LOGIN REQUIRED
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.session_protection = "strong"
+app.config['PRINCIPAL_CACHE_TTL'] = 300          # seconds a cached current_user snapshot is trusted
+app.config['PRINCIPAL_CACHE_ENTRIES'] = 4096
 
-# API BASIC AUTH
+# API BASIC AUTH (the integration account; Users only if their role is listed)
+app.config['API_USERNAME'] = os.environ.get('API_USERNAME', 'hifi')
+app.config['API_PASSWORD'] = os.environ.get('API_PASSWORD', 'hifi')
+app.config['API_USER_ROLES'] = ()               # e.g. ('admin',) to let those users' email / password in
+app.config['AUTH_CACHE_TTL'] = 60               # seconds a successful check is reused
+app.config['AUTH_CACHE_ENTRIES'] = 1024
 auth = HTTPBasicAuth()
 
 csrf = CSRFProtect()
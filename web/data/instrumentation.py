@@ -0,0 +1,92 @@
+from flask                  import current_app, g, has_request_context, request
+from sqlalchemy             import event
+from sqlalchemy.engine      import Engine
+from collections            import Counter
+import json
+import logging
+import re
+import time
+
+logger = logging.getLogger('sql')
+
+# Literals and IN lists are collapsed so the same query shape issued with
+# different parameters (the N+1 signature) maps to one fingerprint.
+_literals   = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_in_lists   = re.compile(r"\bIN\s*\([^)]*\)", re.IGNORECASE)
+_whitespace = re.compile(r"\s+")
+
+def fingerprint(statement):
+    statement = _literals.sub('?', statement)
+    statement = _in_lists.sub('IN (...)', statement)
+    return _whitespace.sub(' ', statement).strip()
+
+def _request_stats():
+    if has_request_context():
+        return g.get('sql_stats')
+    return None
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats() is not None:
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats()
+    if stats is None or not conn.info.get('query_start_time'):
+        return
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    stats['count'] += 1
+    stats['total'] += elapsed
+    if elapsed > stats['slowest'][0]:
+        stats['slowest'] = (elapsed, statement)
+    stats['fingerprints'][fingerprint(statement)] += 1
+
+class SQLInstrumentation:
+    """
+    Per-request SQL statistics: statement count, total DB time, the slowest
+    statement and repeated statement fingerprints. Reported through the
+    Server-Timing header and one structured log line per request; requests
+    repeating a fingerprint SQL_NPLUS1_THRESHOLD times or more are flagged.
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_INSTRUMENTATION', True)
+        app.config.setdefault('SQL_NPLUS1_THRESHOLD', 5)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        if current_app.config['SQL_INSTRUMENTATION']:
+            g.sql_stats = {'count': 0, 'total': 0.0, 'slowest': (0.0, None), 'fingerprints': Counter()}
+
+    def _finish(self, response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+        threshold = current_app.config['SQL_NPLUS1_THRESHOLD']
+        repeated = {
+            statement: count for statement, count in stats['fingerprints'].most_common()
+            if count > 1
+        }
+        suspect = {statement: count for statement, count in repeated.items() if count >= threshold}
+        timings = [f'db;dur={stats["total"] * 1000:.2f};desc="{stats["count"]} queries"']
+        if suspect:
+            timings.append(f'nplus1;desc="{max(suspect.values())} repeats"')
+        response.headers.add('Server-Timing', ', '.join(timings))
+        record = {
+            'method'        : request.method,
+            'path'          : request.path,
+            'status'        : response.status_code,
+            'queries'       : stats['count'],
+            'db_ms'         : round(stats['total'] * 1000, 2),
+            'slowest_ms'    : round(stats['slowest'][0] * 1000, 2),
+            'slowest'       : stats['slowest'][1],
+            'repeated'      : repeated,
+            'nplus1'        : bool(suspect),
+        }
+        logger.log(logging.WARNING if suspect else logging.INFO, json.dumps(record))
+        return response
@@ -1,7 +1,15 @@
 from data                   import db
-from data                   import login_manager
 from flask_login            import UserMixin
 from werkzeug.security      import generate_password_hash, check_password_hash
+from datetime               import datetime
+
+# serialize_columns lists the columns each to_dict reads. The generic API
+# selects only these (or a ?fields= subset) instead of loading whole entities.
+# filter_columns accept ?column=value (or value,value) equality filters and
+# range_columns accept ?column_from= / ?column_to=; ?from= / ?to= apply to the
+# first range column. Composite indexes in __table_args__ back the hot filters.
+# updatable_columns whitelists what PUT/PATCH may change. Updates and deletes
+# are issued as single statements by primary key unless orm_writes is set.
  
 class User(db.Model):
     id              = db.Column(db.Integer, primary_key=True)
@@ -11,8 +19,8 @@ class User(db.Model):
     password_hash   = db.Column(db.String(255), nullable=False)
     role            = db.Column(db.String(20), nullable=False, default='customer') # customer / guest
     image_profile   = db.Column(db.String(128), default="img/no-photo.jpg")
-    created_at      = db.Column(db.DateTime, nullable=False)
-    updated_at      = db.Column(db.DateTime, nullable=False)
+    created_at      = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at      = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
  
     @property 
     def password(self):
@@ -34,6 +42,12 @@ class User(db.Model):
         """
         return check_password_hash(self.password_hash, password)
 
+    filter_columns    = ("role",)
+    range_columns     = ("created_at",)
+    serialize_columns = ("id", "name", "email", "phone", "role")
+    updatable_columns = ("name", "email", "phone", "password", "role", "image_profile")
+    orm_writes        = True # password setter has to run
+
     def to_dict(self):
         return {
             "id"            : self.id,
@@ -49,8 +63,13 @@ class Vehicle(db.Model):
     plate_number    = db.Column(db.String(20), unique=True, nullable=False)
     model           = db.Column(db.String(100), nullable=False)
     type            = db.Column(db.String(50), nullable=False)
-    created_at      = db.Column(db.DateTime, nullable=False)
-    updated_at      = db.Column(db.DateTime, nullable=False)
+    created_at      = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at      = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    filter_columns    = ("user_id", "type")
+    range_columns     = ("created_at",)
+    serialize_columns = ("id", "user_id", "plate_number", "model", "type")
+    updatable_columns = ("user_id", "plate_number", "model", "type")
 
     def to_dict(self):
         return {
@@ -70,18 +89,32 @@ class Appointment(db.Model):
     appointment_date    = db.Column(db.DateTime, nullable=False)
     status              = db.Column(db.String(50), default='Pending')
     payment_status      = db.Column(db.String(50), default='Unpaid') # To be confirmed by staff
-    created_at          = db.Column(db.DateTime, nullable=False)
-    updated_at          = db.Column(db.DateTime, nullable=False)
+    version             = db.Column(db.Integer, nullable=False, default=1, server_default='1', onupdate=db.literal_column('version') + 1) # optimistic concurrency, see common.py
+    created_at          = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at          = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        db.Index('ix_appointment_status_appointment_date', 'status', 'appointment_date'),
+        db.Index('ix_appointment_staff_id_appointment_date', 'staff_id', 'appointment_date'),
+        db.Index('ix_appointment_appointment_date', 'appointment_date'),
+    )
+
+    filter_columns    = ("user_id", "staff_id", "vehicle_id", "service_type", "status", "payment_status")
+    range_columns     = ("appointment_date", "created_at")
+    serialize_columns = ("id", "user_id", "staff_id", "vehicle_id", "service_type", "appointment_date", "status", "payment_status", "version")
+    updatable_columns = ("staff_id", "vehicle_id", "service_type", "appointment_date", "status", "payment_status")
 
     def to_dict(self):
         return {
             "id"                : self.id,
             "user_id"           : self.user_id,
+            "staff_id"          : self.staff_id,
             "vehicle_id"        : self.vehicle_id,
             "service_type"      : self.service_type,
             "appointment_date"  : self.appointment_date.isoformat(),
             "status"            : self.status,
-            "payment_status"    : self.payment_status
+            "payment_status"    : self.payment_status,
+            "version"           : self.version
         }
 
 class Payment(db.Model):
@@ -92,8 +125,18 @@ class Payment(db.Model):
     payment_status      = db.Column(db.String(50), default='Pending') # To be confirmed by app if actual payment was processed
     transaction_date    = db.Column(db.DateTime, nullable=False)
     receipt_filename    = db.Column(db.String(255), nullable=True)  # New column for storing the filename of the receipt image
-    created_at          = db.Column(db.DateTime, nullable=False)
-    updated_at          = db.Column(db.DateTime, nullable=False)
+    version             = db.Column(db.Integer, nullable=False, default=1, server_default='1', onupdate=db.literal_column('version') + 1) # optimistic concurrency, see common.py
+    created_at          = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at          = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        db.Index('ix_payment_transaction_date', 'transaction_date'),
+    )
+
+    filter_columns    = ("appointment_id", "payment_method", "payment_status")
+    range_columns     = ("transaction_date", "created_at")
+    serialize_columns = ("id", "appointment_id", "amount", "payment_method", "payment_status", "transaction_date", "receipt_filename", "version")
+    updatable_columns = ("amount", "payment_method", "payment_status", "transaction_date", "receipt_filename")
 
     def to_dict(self):
         return {
@@ -104,19 +147,37 @@ class Payment(db.Model):
             "payment_status"    : self.payment_status,
             "transaction_date"  : self.transaction_date.isoformat(),
             "receipt_filename"  : self.receipt_filename,
-            "receipt_url"       : f"/uploads/receipts/{self.receipt_filename}" if self.receipt_filename else None
+            "receipt_url"       : f"/uploads/receipts/{self.receipt_filename}" if self.receipt_filename else None,
+            "version"           : self.version
         }
 
 class Notification(db.Model):
-    id          = db.Column(db.Integer, primary_key=True)
-    user_id     = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    message     = db.Column(db.String(255), nullable=False)
-    status      = db.Column(db.String(50), default='Unread')
-    created_at  = db.Column(db.DateTime, nullable=False)
-    updated_at  = db.Column(db.DateTime, nullable=False)
+    id              = db.Column(db.Integer, primary_key=True)
+    user_id         = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    message         = db.Column(db.String(255), nullable=False)
+    status          = db.Column(db.String(50), default='Unread')
+    # Delivery outbox, see data/repositories/outbox.py
+    delivery_status = db.Column(db.String(20), nullable=False, default='Pending', server_default='Pending') # 'Pending', 'Sending', 'Sent', 'Failed', 'Skipped'
+    attempts        = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_attempt_at = db.Column(db.DateTime, nullable=True, default=datetime.now)
+    claimed_at      = db.Column(db.DateTime, nullable=True)
+    sent_at         = db.Column(db.DateTime, nullable=True)
+    last_error      = db.Column(db.String(255), nullable=True)
+    created_at      = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at      = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
 
     user = db.relationship('User', backref=db.backref('notifications', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_notification_user_id_status', 'user_id', 'status'),
+        db.Index('ix_notification_delivery_status_next_attempt_at', 'delivery_status', 'next_attempt_at'),
+    )
+
+    filter_columns    = ("user_id", "status")
+    range_columns     = ("created_at",)
+    serialize_columns = ("id", "user_id", "message", "status", "created_at")
+    updatable_columns = ("message", "status")
+
     def to_dict(self):
         return {
             "id"        : self.id,
@@ -132,11 +193,16 @@ class Loyalty(db.Model):
     points_earned   = db.Column(db.Integer, default=0)
     points_spent    = db.Column(db.Integer, default=0)
     reward_status   = db.Column(db.String(50), default='Available')
-    created_at      = db.Column(db.DateTime, nullable=False)
-    updated_at      = db.Column(db.DateTime, nullable=False)
+    created_at      = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at      = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
 
     user = db.relationship('User', backref=db.backref('loyalties', lazy=True))
 
+    filter_columns    = ("user_id", "reward_status")
+    range_columns     = ("created_at",)
+    serialize_columns = ("id", "user_id", "points_earned", "points_spent", "reward_status", "updated_at")
+    updatable_columns = ("points_earned", "points_spent", "reward_status")
+
     def to_dict(self):
         return {
             "id"            : self.id,
@@ -147,14 +213,38 @@ class Loyalty(db.Model):
             "updated_at"    : self.updated_at.isoformat()
         }
 
+class LoyaltyBalance(db.Model):
+    # Per-user totals of the Loyalty ledger, maintained in the same
+    # transaction as ledger writes (data/repositories/loyalty.py).
+    user_id         = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, autoincrement=False)
+    points_earned   = db.Column(db.Integer, nullable=False, default=0)
+    points_spent    = db.Column(db.Integer, nullable=False, default=0)
+    entries         = db.Column(db.Integer, nullable=False, default=0)
+    updated_at      = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    def to_dict(self):
+        return {
+            "user_id"       : self.user_id,
+            "points_earned" : self.points_earned,
+            "points_spent"  : self.points_spent,
+            "balance"       : self.points_earned - self.points_spent,
+            "entries"       : self.entries,
+            "updated_at"    : self.updated_at.isoformat()
+        }
+
 class Service(db.Model):
     id          = db.Column(db.Integer, primary_key=True)
     name        = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(255), nullable=False)
     price       = db.Column(db.Float, nullable=False)
     duration    = db.Column(db.Integer, nullable=False)  # Duration in minutes
-    created_at  = db.Column(db.DateTime, nullable=False)
-    updated_at  = db.Column(db.DateTime, nullable=False)
+    created_at  = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at  = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    filter_columns    = ("name",)
+    range_columns     = ("created_at",)
+    serialize_columns = ("id", "name", "description", "price", "duration")
+    updatable_columns = ("name", "description", "price", "duration")
 
     def to_dict(self):
         return {
@@ -168,17 +258,31 @@ class Service(db.Model):
 class Queue(db.Model):
     id              = db.Column(db.Integer, primary_key=True)
     appointment_id  = db.Column(db.Integer, db.ForeignKey('appointment.id'), nullable=False)
-    position        = db.Column(db.Integer, nullable=False)
-    status          = db.Column(db.String(50), default='Waiting') 
-    created_at      = db.Column(db.DateTime, nullable=False)
-    updated_at      = db.Column(db.DateTime, nullable=False)
+    position        = db.Column(db.Integer, nullable=False) # place in line when enqueued
+    status          = db.Column(db.String(50), default='Waiting') # 'Waiting', 'Serving', 'Done', 'Cancelled'
+    sort_rank       = db.Column(db.BigInteger, nullable=False, default=0, server_default='0') # sparse rank, see queueing.py
+    served_at       = db.Column(db.DateTime, nullable=True) # set by /api/queue/next
+    version         = db.Column(db.Integer, nullable=False, default=1, server_default='1', onupdate=db.literal_column('version') + 1) # optimistic concurrency, see common.py
+    created_at      = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at      = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        db.Index('ix_queue_status_position', 'status', 'position'),
+        db.Index('ix_queue_status_sort_rank', 'status', 'sort_rank'),
+    )
+
+    filter_columns    = ("appointment_id", "status")
+    range_columns     = ("created_at",)
+    serialize_columns = ("id", "appointment_id", "position", "status", "version")
+    updatable_columns = ("status",) # order changes go through /api/queue/<id>/move
 
     def to_dict(self):
         return {
             "id"            : self.id,
             "appointment_id": self.appointment_id,
             "position"      : self.position,
-            "status"        : self.status
+            "status"        : self.status,
+            "version"       : self.version
         }
 
 class Staff(db.Model):
@@ -187,16 +291,23 @@ class Staff(db.Model):
     role        = db.Column(db.String(50), nullable=False) # 'Admin', 'Cashier', 'Manager', 'Washer', 'Cleaner'
     phone       = db.Column(db.String(20), nullable=True)
     email       = db.Column(db.String(100), nullable=True)
-    created_at  = db.Column(db.DateTime, nullable=False)
-    updated_at  = db.Column(db.DateTime, nullable=False)
+    on_shift    = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true()) # off shift: no new assignments
+    created_at  = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at  = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    filter_columns    = ("role", "on_shift")
+    range_columns     = ("created_at",)
+    serialize_columns = ("id", "name", "role", "email", "phone", "on_shift")
+    updatable_columns = ("name", "role", "phone", "email", "on_shift")
 
     def to_dict(self):
         return {
-            "id"    : self.id,
-            "name"  : self.name,
-            "role"  : self.role,
-            "email" : self.email,
-            "phone" : self.phone
+            "id"        : self.id,
+            "name"      : self.name,
+            "role"      : self.role,
+            "email"     : self.email,
+            "phone"     : self.phone,
+            "on_shift"  : self.on_shift
         }
 
 class Feedback(db.Model):
@@ -205,12 +316,17 @@ class Feedback(db.Model):
     appointment_id  = db.Column(db.Integer, db.ForeignKey('appointment.id'), nullable=False)
     rating          = db.Column(db.Integer, nullable=False)
     comment         = db.Column(db.String(255))
-    created_at      = db.Column(db.DateTime, nullable=False)
-    updated_at      = db.Column(db.DateTime, nullable=False)
+    created_at      = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at      = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
 
     user        = db.relationship('User', backref=db.backref('feedback', lazy=True))
     appointment = db.relationship('Appointment', backref=db.backref('feedback', lazy=True))
 
+    filter_columns    = ("user_id", "appointment_id", "rating")
+    range_columns     = ("created_at",)
+    serialize_columns = ("id", "user_id", "appointment_id", "rating", "comment")
+    updatable_columns = ("rating", "comment")
+
     def to_dict(self):
         return {
             "id"            : self.id,
@@ -220,7 +336,42 @@ class Feedback(db.Model):
             "comment"       : self.comment
         }
 
-# ============================================================================================
-@login_manager.user_loader
-def load_user(id):
-    return User.query.get(int(id))
+class FeedbackAggregate(db.Model):
+    # Daily rating totals per (staff, service type), maintained by the
+    # Feedback write hooks (data/repositories/ratings.py).
+    bucket_date     = db.Column(db.Date, primary_key=True)
+    staff_id        = db.Column(db.Integer, db.ForeignKey('staff.id'), primary_key=True, autoincrement=False)
+    service_type    = db.Column(db.String(100), primary_key=True)
+    count           = db.Column(db.Integer, nullable=False, default=0)
+    total           = db.Column(db.Integer, nullable=False, default=0)
+    r1              = db.Column(db.Integer, nullable=False, default=0)
+    r2              = db.Column(db.Integer, nullable=False, default=0)
+    r3              = db.Column(db.Integer, nullable=False, default=0)
+    r4              = db.Column(db.Integer, nullable=False, default=0)
+    r5              = db.Column(db.Integer, nullable=False, default=0)
+    updated_at      = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+class CompletionStat(db.Model):
+    # Rolling service time statistics, see data/repositories/eta.py. scope is
+    # 'service' (key = service type, mean in minutes) or 'staff' (key = staff
+    # id, mean = actual / expected duration).
+    id              = db.Column(db.Integer, primary_key=True)
+    scope           = db.Column(db.String(20), nullable=False)
+    key             = db.Column(db.String(100), nullable=False)
+    samples         = db.Column(db.Integer, nullable=False, default=0)
+    mean            = db.Column(db.Float, nullable=False)
+    updated_at      = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'key', name='uq_completion_stat_scope_key'),
+    )
+
+    def to_dict(self):
+        return {
+            "scope"     : self.scope,
+            "key"       : self.key,
+            "samples"   : self.samples,
+            "mean"      : self.mean
+        }
+
+# Flask-Login's user loader is data.repositories.principals.load_user.
@@ -1,181 +1,335 @@
 # from data.repositories.common   import CommonRepo as common
-from data.repositories  import common
+from data.repositories  import common, scheduling, queueing, events, eta, outbox, loyalty, ratings, reports, exports, imports, credentials, principals, assignment
 from data               import db
-from random             import randint, choice
+from random             import Random, randrange
 from faker              import Faker
+from datetime           import datetime, timedelta
+from sqlalchemy         import func
+from string             import ascii_uppercase
+from concurrent.futures import ProcessPoolExecutor
+from contextlib         import contextmanager
+import hashlib
+import multiprocessing
+
+# ============================================================================================
+# FACTORY ROW GENERATORS
+#
+# Rows are generated in chunks with explicit ids, so the ids of every table
+# generated in a run are known ranges and dependent tables pick foreign keys
+# from them without re-querying. Each chunk has its own Random / Faker seeded
+# from (seed, table, chunk index); the same seed and chunk size always produce
+# the same rows, whether chunks are generated in-process or in a pool.
+
+FACTORY_EPOCH       = datetime(2025, 1, 1)
+FACTORY_PASSWORD    = 'password'
+SERVICE_TYPES       = ['Full Wash', 'Exterior Wash', 'Interior Clean', 'Detailing']
+
+_fake = None
+
+def _faker():
+    global _fake
+    if _fake is None:
+        _fake = Faker()
+    return _fake
+
+def _timestamp(rng):
+    return FACTORY_EPOCH + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+def seeded_password_hash(seed, password=FACTORY_PASSWORD, iterations=150000):
+    # Same format as werkzeug's generate_password_hash, but with a salt derived
+    # from the seed so the output stays deterministic. Hashed once per run.
+    salt = hashlib.sha256(f"factory:{seed}".encode()).hexdigest()[:16]
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), iterations).hex()
+    return f"pbkdf2:sha256:{iterations}${salt}${digest}"
+
+def _user(fake, rng, id, refs, context):
+    created_at = _timestamp(rng)
+    return {
+        "id"            : id,
+        "name"          : fake.name(),
+        "email"         : f"{fake.user_name()}.{id}@example.com",
+        "phone"         : f"09{id:09d}",
+        "password_hash" : context["password_hash"],
+        "role"          : rng.choice(['customer', 'guest']),
+        "created_at"    : created_at,
+        "updated_at"    : created_at,
+    }
+
+def _vehicle(fake, rng, id, refs, context):
+    created_at = _timestamp(rng)
+    return {
+        "id"            : id,
+        "user_id"       : rng.choice(refs["user"]),
+        "plate_number"  : f"{''.join(rng.choices(ascii_uppercase, k=3))} {id}",
+        "model"         : fake.word(),
+        "type"          : rng.choice(['Sedan', 'SUV', 'Truck', 'Van']),
+        "created_at"    : created_at,
+        "updated_at"    : created_at,
+    }
+
+def _staff(fake, rng, id, refs, context):
+    created_at = _timestamp(rng)
+    # Every run starts its staff with one Admin and one Manager.
+    fixed_roles = {context["first_id"]: 'Admin', context["first_id"] + 1: 'Manager'}
+    return {
+        "id"            : id,
+        "name"          : fake.name(),
+        "email"         : fake.email(),
+        "role"          : fixed_roles.get(id) or rng.choice(['Cashier', 'Washer', 'Cleaner']),
+        "created_at"    : created_at,
+        "updated_at"    : created_at,
+    }
+
+def _service(fake, rng, id, refs, context):
+    created_at = _timestamp(rng)
+    return {
+        "id"            : id,
+        "name"          : rng.choice(SERVICE_TYPES),
+        "description"   : fake.sentence(),
+        "price"         : rng.randint(20, 100),
+        "duration"      : rng.choice([30, 45, 60, 90]),
+        "created_at"    : created_at,
+        "updated_at"    : created_at,
+    }
+
+def _appointment(fake, rng, id, refs, context):
+    appointment_date = _timestamp(rng)
+    return {
+        "id"                : id,
+        "user_id"           : rng.choice(refs["user"]),
+        "staff_id"          : rng.choice(refs["staff"]),
+        "vehicle_id"        : rng.choice(refs["vehicle"]),
+        "service_type"      : rng.choice(SERVICE_TYPES),
+        "appointment_date"  : appointment_date,
+        "status"            : rng.choice(['Pending', 'Completed', 'Cancelled']),
+        "payment_status"    : rng.choice(['Paid', 'Unpaid']),
+        "created_at"        : appointment_date,
+        "updated_at"        : appointment_date,
+    }
+
+def _payment(fake, rng, id, refs, context):
+    transaction_date = _timestamp(rng)
+    return {
+        "id"                : id,
+        "appointment_id"    : rng.choice(refs["appointment"]),
+        "amount"            : rng.randint(50, 150),
+        "payment_method"    : rng.choice(['Cash', 'Card', 'Online']),
+        "payment_status"    : rng.choice(['Pending', 'Paid']),
+        "transaction_date"  : transaction_date,
+        "created_at"        : transaction_date,
+        "updated_at"        : transaction_date,
+    }
+
+def _notification(fake, rng, id, refs, context):
+    created_at = _timestamp(rng)
+    return {
+        "id"            : id,
+        "user_id"       : rng.choice(refs["user"]),
+        "message"       : fake.sentence(),
+        "status"        : rng.choice(["Unread", "Read"]),
+        "delivery_status": 'Skipped', # dummy rows are never delivered
+        "created_at"    : created_at,
+        "updated_at"    : created_at,
+    }
+
+def _loyalty(fake, rng, id, refs, context):
+    created_at = _timestamp(rng)
+    return {
+        "id"            : id,
+        "user_id"       : rng.choice(refs["user"]),
+        "points_earned" : rng.randint(10, 50),
+        "points_spent"  : rng.randint(0, 20),
+        "created_at"    : created_at,
+        "updated_at"    : created_at,
+    }
+
+def _queue(fake, rng, id, refs, context):
+    created_at = _timestamp(rng)
+    return {
+        "id"            : id,
+        "appointment_id": rng.choice(refs["appointment"]),
+        "position"      : rng.randint(1, 20),
+        "sort_rank"     : id * queueing.RANK_STEP,
+        "created_at"    : created_at,
+        "updated_at"    : created_at,
+    }
+
+def _feedback(fake, rng, id, refs, context):
+    created_at = _timestamp(rng)
+    return {
+        "id"            : id,
+        "user_id"       : rng.choice(refs["user"]),
+        "appointment_id": rng.choice(refs["appointment"]),
+        "rating"        : rng.randint(1, 5),
+        "comment"       : fake.sentence(),
+        "created_at"    : created_at,
+        "updated_at"    : created_at,
+    }
+
+# Generation order, row generator and the tables each one draws foreign keys from.
+FACTORY_TABLES = {
+    "user"          : (_user,           ()),
+    "vehicle"       : (_vehicle,        ("user",)),
+    "staff"         : (_staff,          ()),
+    "service"       : (_service,        ()),
+    "appointment"   : (_appointment,    ("user", "staff", "vehicle")),
+    "payment"       : (_payment,        ("appointment",)),
+    "notification"  : (_notification,   ("user",)),
+    "loyalty"       : (_loyalty,        ("user",)),
+    "queue"         : (_queue,          ("appointment",)),
+    "feedback"      : (_feedback,       ("user", "appointment")),
+}
+
+def _generate_chunk(task):
+    name, seed, chunk_index, first_id, count, refs, context = task
+    rng = Random(f"{seed}:{name}:{chunk_index}")
+    fake = _faker()
+    fake.seed_instance(rng.getrandbits(64))
+    generate = FACTORY_TABLES[name][0]
+    return [generate(fake, rng, id, refs, context) for id in range(first_id, first_id + count)]
+
+@contextmanager
+def _process_pool(processes):
+    # Workers are forked so they inherit the loaded app modules; where fork is
+    # unavailable (Windows) chunks are generated in-process.
+    if not processes or processes < 2 or 'fork' not in multiprocessing.get_all_start_methods():
+        yield None
+        return
+    with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('fork')) as pool:
+        yield pool
+
+def _generate_chunks(pool, tasks, window):
+    if pool is None:
+        for task in tasks:
+            yield _generate_chunk(task)
+        return
+    # Keep only a bounded number of chunks in flight so generated rows never
+    # pile up faster than they are inserted.
+    pending = []
+    for task in tasks:
+        pending.append(pool.submit(_generate_chunk, task))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
 
 class Repository:
 
     def __init__(self):
-        self.fake = Faker()
         self.cm_util = common
+        self.sched_util = scheduling
+        self.queue_util = queueing
+        self.events_util = events
+        self.eta_util = eta
+        self.outbox_util = outbox
+        self.loyalty_util = loyalty
+        self.ratings_util = ratings
+        self.reports_util = reports
+        self.exports_util = exports
+        self.imports_util = imports
+        self.credentials_util = credentials
+        self.principals_util = principals
+        self.assignment_util = assignment
 
     def get_common_util(self):
         return self.cm_util
 
+    def get_scheduling_util(self):
+        return self.sched_util
+
+    def get_queue_util(self):
+        return self.queue_util
+
+    def get_events_util(self):
+        return self.events_util
+
+    def get_eta_util(self):
+        return self.eta_util
+
+    def get_outbox_util(self):
+        return self.outbox_util
+
+    def get_loyalty_util(self):
+        return self.loyalty_util
+
+    def get_ratings_util(self):
+        return self.ratings_util
+
+    def get_reports_util(self):
+        return self.reports_util
+
+    def get_exports_util(self):
+        return self.exports_util
+
+    def get_imports_util(self):
+        return self.imports_util
+
+    def get_credentials_util(self):
+        return self.credentials_util
+
+    def get_principals_util(self):
+        return self.principals_util
+
+    def get_assignment_util(self):
+        return self.assignment_util
+
     # FACTORY / DUMMY
-    def create_dummy_users(self):
-        users = []
-        for _ in range(10):
-            user = self.cm_util.User(
-                name=self.fake.name(),
-                email=self.fake.email(),
-                phone=self.fake.phone_number(),
-                password=self.fake.password(),
-                role=choice(['customer', 'guest']),
-            )
-            users.append(user) 
-        db.session.bulk_save_objects(users)
-        db.session.commit()
-
-    def create_dummy_vehicles(self):
-        vehicles = []
-        users = self.cm_util.User.query.all()  # Get all users from the database
-        for _ in range(10):
-            vehicle = self.cm_util.Vehicle(
-                user_id=choice(users).id,
-                plate_number=self.fake.license_plate(),
-                model=self.fake.word(),
-                type=choice(['Sedan', 'SUV', 'Truck', 'Van'])
-            )
-            vehicles.append(vehicle)
-        db.session.bulk_save_objects(vehicles)
-        db.session.commit()
-
-    def create_dummy_appointments(self):
-        appointments = []
-        vehicles = self.cm_util.Vehicle.query.all()
-        users = self.cm_util.User.query.all()
-        staff = self.cm_util.Staff.query.all()
-        for _ in range(10):
-            appointment = self.cm_util.Appointment(
-                user_id=choice(users).id,
-                staff_id=choice(staff).id,
-                vehicle_id=choice(vehicles).id,
-                service_type=choice(['Full Wash', 'Exterior Wash', 'Interior Clean', 'Detailing']),
-                appointment_date=self.fake.date_time_this_year(),
-                status=choice(['Pending', 'Completed', 'Cancelled']),
-                payment_status=choice(['Paid', 'Unpaid'])
-            )
-            appointments.append(appointment)
-        db.session.bulk_save_objects(appointments)
-        db.session.commit()
-
-    def create_dummy_payments(self):
-        payments = []
-        appointments = self.cm_util.Appointment.query.all()
-        for _ in range(10):
-            payment = self.cm_util.Payment(
-                appointment_id=choice(appointments).id,
-                amount=randint(50, 150),
-                payment_method=choice(['Cash', 'Card', 'Online']),
-                payment_status=choice(['Pending', 'Paid']),
-                transaction_date=self.fake.date_time_this_year()
-            )
-            payments.append(payment)
-        db.session.bulk_save_objects(payments)
-        db.session.commit()
-
-    def create_dummy_notifications(self):
-        notifications = []
-        users = self.cm_util.User.query.all()
-        for _ in range(10):
-            notification = self.cm_util.Notification(
-                user_id=choice(users).id,
-                message=self.fake.sentence(),
-                status=choice(["Unread", "Read"]),
-                created_at=self.fake.date_time_this_year()
-            )
-            notifications.append(notification)
-        db.session.bulk_save_objects(notifications)
-        db.session.commit()
-
-    def create_dummy_loyalties(self):
-        loyalties = []
-        users = self.cm_util.User.query.all()
-        for _ in range(10):
-            loyalty = self.cm_util.Loyalty(
-                user_id=choice(users).id,
-                points_earned=randint(10, 50),
-                points_spent=randint(0, 20),
-                updated_at=self.fake.date_time_this_year() 
-            )
-            loyalties.append(loyalty) 
-        db.session.bulk_save_objects(loyalties)
-        db.session.commit()
-
-    def create_dummy_services(self):
-        services = []
-        for _ in range(10):
-            service = self.cm_util.Service(
-                name=choice(['Full Wash', 'Exterior Wash', 'Interior Clean', 'Detailing']),
-                description=self.fake.sentence(),
-                price=randint(20, 100)
-            )
-            services.append(service)
-        db.session.bulk_save_objects(services)
-        db.session.commit()
-
-    def create_dummy_queues(self):
-        queues = []
-        appointments = self.cm_util.Appointment.query.all()
-        for _ in range(10):
-            queue = self.cm_util.Queue(
-                appointment_id=choice(appointments).id,
-                position=randint(1, 20),
-            )
-            queues.append(queue)
-        db.session.bulk_save_objects(queues)
-        db.session.commit()
-
-    def create_dummy_staff(self):
-        staff = []
-        staff_member = self.cm_util.Staff(
-            name=self.fake.name(),
-            email=self.fake.email(),
-            role='Admin',
-        ) 
-        staff.append(staff_member)
-        staff_member = self.cm_util.Staff(
-            name=self.fake.name(),
-            email=self.fake.email(),
-            role='Manager',
-        ) 
-        staff.append(staff_member)
-        for _ in range(10):
-            staff_member = self.cm_util.Staff(
-                name=self.fake.name(),
-                email=self.fake.email(),
-                role=choice(['Cashier', 'Washer', 'Cleaner']),
-            ) 
-            staff.append(staff_member)
-        db.session.bulk_save_objects(staff)
-        db.session.commit()
-
-    def create_dummy_feedbacks(self):
-        feedbacks = []
-        users = self.cm_util.User.query.all()
-        appointments = self.cm_util.Appointment.query.all()
-        for _ in range(10):
-            feedback = self.cm_util.Feedback(
-                user_id=choice(users).id,
-                appointment_id=choice(appointments).id,
-                rating=randint(1, 5),
-                comment=self.fake.sentence(),
-                created_at=self.fake.date_time_this_year()
-            )
-            feedbacks.append(feedback)
-        db.session.bulk_save_objects(feedbacks)
-        db.session.commit()
-
-    def start_factory(self):
-        self.create_dummy_users()
-        self.create_dummy_vehicles()
-        self.create_dummy_staff()
-        self.create_dummy_appointments()
-        self.create_dummy_payments()
-        self.create_dummy_notifications()
-        self.create_dummy_loyalties()
-        self.create_dummy_services()
-        self.create_dummy_queues()
-        self.create_dummy_feedbacks()
\ No newline at end of file
+    def factory_models(self):
+        return {
+            "user"          : self.cm_util.User,
+            "vehicle"       : self.cm_util.Vehicle,
+            "staff"         : self.cm_util.Staff,
+            "service"       : self.cm_util.Service,
+            "appointment"   : self.cm_util.Appointment,
+            "payment"       : self.cm_util.Payment,
+            "notification"  : self.cm_util.Notification,
+            "loyalty"       : self.cm_util.Loyalty,
+            "queue"         : self.cm_util.Queue,
+            "feedback"      : self.cm_util.Feedback,
+        }
+
+    def create_dummy_rows(self, name, count, seed, refs, chunk_size=5000, pool=None, context=None):
+        model = self.factory_models()[name]
+        first_id = (db.session.query(func.max(model.id)).scalar() or 0) + 1
+        context = dict(context or {}, first_id=first_id)
+        table_refs = {ref: refs[ref] for ref in FACTORY_TABLES[name][1]}
+        tasks = (
+            (name, seed, index, first_id + start, min(chunk_size, count - start), table_refs, context)
+            for index, start in enumerate(range(0, count, chunk_size))
+        )
+        for rows in _generate_chunks(pool, tasks, window=2 * (pool._max_workers if pool else 1)):
+            # executemany; mysqlclient sends it as multi-row INSERT statements.
+            db.session.execute(model.__table__.insert(), rows)
+            db.session.commit()
+        return range(first_id, first_id + count)
+
+    def existing_ids(self, name):
+        model = self.factory_models()[name]
+        ids = [row.id for row in db.session.query(model.id)]
+        if not ids:
+            raise ValueError(f"Factory needs existing {name} rows or a {name} count")
+        return ids
+
+    def start_factory(self, n=10, seed=None, chunk_size=5000, processes=None):
+        """
+        Seed every table. n is a row count for all tables or a dict of
+        per-table counts (tables left out are not generated; their existing
+        rows are used for foreign keys).
+        """
+        counts = n if isinstance(n, dict) else {name: n for name in FACTORY_TABLES}
+        seed = randrange(2 ** 32) if seed is None else seed
+        context = {"password_hash": seeded_password_hash(seed)}
+        refs = {}
+        with _process_pool(processes) as pool:
+            for name, (_, dependencies) in FACTORY_TABLES.items():
+                for dependency in dependencies:
+                    if dependency not in refs:
+                        refs[dependency] = self.existing_ids(dependency)
+                if counts.get(name):
+                    refs[name] = self.create_dummy_rows(name, counts[name], seed, refs, chunk_size, pool, context)
+        # Factory rows bypass the write hooks that maintain summary tables.
+        if counts.get("loyalty"):
+            self.loyalty_util.reconcile()
+        if counts.get("feedback"):
+            self.ratings_util.backfill()
+        return {"seed": seed, "rows": {name: counts.get(name, 0) for name in FACTORY_TABLES}}
@@ -0,0 +1,235 @@
+from data           import db
+from data.models    import Appointment, Staff
+from data.repositories import common, scheduling
+from flask          import current_app, g
+from sqlalchemy     import bindparam, func
+from datetime       import datetime, timedelta
+from heapq          import heapify, heappop, heappush
+from threading      import Lock
+import time
+
+# STAFF ASSIGNMENT
+# Appointments created without a staff_id get the on-shift staff member of a
+# qualified role (ASSIGN_SERVICE_ROLES, else SCHEDULE_STAFF_ROLES) with the
+# earliest projected finish time who is free for the slot. The projection
+# runs a washer's open bookings back to back from the first one (or from now)
+# using Service.duration, so every booking adds load, whatever its slot. Each role has a min-heap of (finish, staff_id)
+# with lazy deletion, so picking a washer and recording the new finish time
+# is O(log n).
+#
+# Heaps are per process. Assigning locks every staff row of the candidate
+# roles (SELECT ... FOR UPDATE, in id order) until the write commits and
+# works on a request-private copy of the heaps in `g`. Only the commit
+# listener publishes the 'staff-load' bus generation (other workers reload
+# their heaps with one grouped query) and installs the copy as this worker's
+# heaps, so a rolled back request leaves no phantom load behind. Heaps only
+# rank candidates; overlaps are ruled out by the locked scheduling indexes,
+# so a worker that assigns just before seeing a generation bump picks a less
+# balanced washer at worst.
+#
+# Setting a staff member's on_shift to false moves their future open
+# appointments to other staff through the same heaps, inside the Staff update
+# transaction: if moving them fails, the staff member stays on shift.
+
+LOAD_NAME   = 'staff-load'
+CLOSED      = ('Completed', 'Cancelled')
+
+class RoleHeap:
+
+    def __init__(self, finishes):
+        self.finishes = dict(finishes)
+        self.heap = [(finish, staff_id) for staff_id, finish in self.finishes.items()]
+        heapify(self.heap)
+
+    def peek(self):
+        # Entries whose finish time was superseded are dropped on the way.
+        while self.heap and self.finishes.get(self.heap[0][1]) != self.heap[0][0]:
+            heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+    def pop(self):
+        entry = self.peek()
+        if entry is not None:
+            heappop(self.heap)
+        return entry
+
+    def push(self, staff_id, finish):
+        self.finishes[staff_id] = finish
+        heappush(self.heap, (finish, staff_id))
+
+class AssignmentEngine:
+
+    def __init__(self):
+        self.lock = Lock()
+        self.heaps = {}
+        self.generation = None
+        self.loaded_at = 0
+
+    def bus(self):
+        return common.read_cache().bus
+
+    def roles(self, service_type):
+        return tuple(current_app.config['ASSIGN_SERVICE_ROLES'].get(service_type) or current_app.config['SCHEDULE_STAFF_ROLES'])
+
+    def load(self):
+        # Heaps of the on-shift staff per role, built from the database.
+        now = datetime.now()
+        staff = dict(db.session.query(Staff.id, Staff.role)
+                     .filter(Staff.role.in_(current_app.config['SCHEDULE_STAFF_ROLES']), Staff.on_shift == db.true()))
+        finishes = {staff_id: now for staff_id in staff}
+        # Bookings that started up to one (longest) service ago may still be running.
+        longest = max([current_app.config['SCHEDULE_DEFAULT_DURATION'], *scheduling.engine.durations().values()])
+        since = now - timedelta(minutes=longest)
+        rows = db.session.query(Appointment.staff_id, Appointment.service_type, func.min(Appointment.appointment_date), func.count()) \
+            .filter(Appointment.staff_id.in_(list(staff))) \
+            .filter(Appointment.status.notin_(CLOSED)) \
+            .filter(Appointment.appointment_date >= since) \
+            .group_by(Appointment.staff_id, Appointment.service_type)
+        starts, busy = {}, {}
+        for staff_id, service_type, start, count in rows:
+            starts[staff_id] = min(starts.get(staff_id, start), start)
+            busy[staff_id] = busy.get(staff_id, timedelta(0)) + scheduling.engine.duration(service_type) * count
+        for staff_id, minutes in busy.items():
+            finishes[staff_id] = max(now, starts[staff_id]) + minutes
+        heaps = {}
+        for staff_id, role in staff.items():
+            heaps.setdefault(role, {})[staff_id] = finishes[staff_id]
+        return {role: RoleHeap(role_finishes) for role, role_finishes in heaps.items()}
+
+    def fresh_heaps(self):
+        generation = self.bus().generation(LOAD_NAME)
+        if generation != self.generation or time.monotonic() - self.loaded_at > current_app.config['ASSIGN_HEAP_TTL']:
+            self.heaps = self.load()
+            self.generation = generation
+            self.loaded_at = time.monotonic()
+        return self.heaps
+
+    def request_heaps(self):
+        # This request's copy, see the module comment.
+        if 'assignment_heaps' not in g:
+            with self.lock:
+                heaps = self.fresh_heaps()
+                g.assignment_generation = self.generation
+                g.assignment_heaps = {role: RoleHeap(heap.finishes) for role, heap in heaps.items()}
+        return g.assignment_heaps
+
+    def lock_roles(self, roles):
+        # Held until commit/rollback, see guard_booking.
+        locked = g.setdefault('assignment_locked', set())
+        missing = [role for role in roles if role not in locked]
+        if missing:
+            db.session.query(Staff.id).filter(Staff.role.in_(missing)).order_by(Staff.id).with_for_update().all()
+            locked.update(missing)
+
+    def day_indexes(self, staff_ids, day):
+        # The role rows are locked, so these are the same request-private
+        # indexes guard_booking would lock and reload; it reuses them.
+        return scheduling.engine.locked_indexes(staff_ids, day)
+
+    def choose(self, service_type, start, exclude=()):
+        roles = self.roles(service_type)
+        self.lock_roles(roles)
+        duration = scheduling.engine.duration(service_type)
+        end = start + duration
+        heaps = {role: heap for role, heap in self.request_heaps().items() if role in roles}
+        candidates = [staff_id for heap in heaps.values() for staff_id in heap.finishes]
+        # The previous day's bookings may run past midnight.
+        indexes = [self.day_indexes(candidates, day) for day in scheduling.engine.span_days(start, end)]
+        popped, chosen = [], None
+        while chosen is None:
+            entries = [(heap.peek(), role) for role, heap in heaps.items()]
+            entries = [(entry, role) for entry, role in entries if entry is not None]
+            if not entries:
+                break
+            (finish, staff_id), role = min(entries)
+            heaps[role].pop()
+            popped.append((role, staff_id, finish))
+            if staff_id not in exclude and all(index[staff_id].is_free(start, end) for index in indexes):
+                chosen = staff_id
+        for role, staff_id, finish in popped:
+            heaps[role].push(staff_id, max(finish, start) + duration if staff_id == chosen else finish)
+        return chosen
+
+    def assign(self, data):
+        # before_create hook for Appointment, registered ahead of guard_booking.
+        start = data.get('appointment_date')
+        if data.get('staff_id') is not None or data.get('status') in CLOSED or not isinstance(start, datetime):
+            return None
+        staff_id = self.choose(data.get('service_type'), start)
+        if staff_id is None:
+            roles = '/'.join(self.roles(data.get('service_type')))
+            return {"error": f"No {roles} is free at {start.isoformat()}"}, 409
+        data['staff_id'] = staff_id
+        g.staff_assigned = g.get('staff_assigned', 0) + 1
+        return None
+
+    def changed(self, model, action, rows):
+        # Write listener for Appointment, see common.after_commit.
+        heaps, generation = g.pop('assignment_heaps', None), g.pop('assignment_generation', None)
+        assigned = g.pop('staff_assigned', 0)
+        if action == 'update' and not any({"staff_id", "status", "appointment_date", "service_type"} & set(row) for row in rows):
+            return
+        published = self.bus().generation(LOAD_NAME)
+        self.bus().publish(LOAD_NAME)
+        # The copy holds exactly what was committed only if every row was
+        # assigned through it and nobody else published meanwhile.
+        if action == 'create' and heaps is not None and assigned == len(rows):
+            with self.lock:
+                if published == generation == self.generation:
+                    self.heaps = heaps
+                    self.generation = self.bus().generation(LOAD_NAME)
+
+    def rebalance(self, staff_id, exclude):
+        # Moves staff_id's future open appointments to other on-shift staff
+        # (not in exclude) without committing; returns (moved, unassigned):
+        # [{"id", "staff_id"}] and a list of appointment ids.
+        appointments = db.session.query(Appointment.id, Appointment.service_type, Appointment.appointment_date) \
+            .filter(Appointment.staff_id == staff_id) \
+            .filter(Appointment.status.notin_(CLOSED)) \
+            .filter(Appointment.appointment_date >= datetime.now()) \
+            .order_by(Appointment.appointment_date).all()
+        moved, unassigned = [], []
+        for row in appointments:
+            chosen = self.choose(row.service_type, row.appointment_date, exclude=exclude)
+            if chosen is None:
+                unassigned.append(row.id)
+                continue
+            start = row.appointment_date
+            scheduling.engine.locked_indexes([chosen], start.date())[chosen] \
+                .add(start, start + scheduling.engine.duration(row.service_type), row.id)
+            moved.append({"id": row.id, "staff_id": chosen})
+        if moved:
+            table = Appointment.__table__
+            db.session.execute(table.update().where(table.c.id == bindparam('b_id')).values(
+                staff_id=bindparam('b_staff_id'), updated_at=datetime.now()),
+                [{"b_id": row["id"], "b_staff_id": row["staff_id"]} for row in moved])
+        return moved, unassigned
+
+    def going_off_shift(self, rows):
+        # before_update hook for Staff, see common.add_hook.
+        leaving = {row["id"] for row in rows if row.get("on_shift") is False}
+        if not leaving:
+            return None
+        # Start from the database; the copy is dropped after the commit (see
+        # shift_changed), as it still counts the leaving staff as on shift.
+        g.assignment_heaps = self.load()
+        g.assignment_generation = None
+        moved = g.setdefault('assignment_moved', [])
+        for staff_id in sorted(leaving):
+            staff_moved, unassigned = self.rebalance(staff_id, leaving)
+            moved.extend(staff_moved)
+            current_app.logger.info(f"Staff {staff_id} off shift: {len(staff_moved)} appointments moved, unassigned {unassigned}")
+        return None
+
+    def shift_changed(self, model, action, rows):
+        # Write listener for Staff, see common.after_commit.
+        if action != 'update' or not any("on_shift" in row for row in rows):
+            return
+        g.pop('assignment_heaps', None)
+        g.pop('assignment_generation', None)
+        self.bus().publish(LOAD_NAME)
+        moved = g.pop('assignment_moved', [])
+        if moved:
+            common.after_commit(Appointment, 'update', moved)
+
+engine = AssignmentEngine()
@@ -0,0 +1,96 @@
+from collections    import OrderedDict
+from threading      import Lock
+import os
+import time
+
+# READ-THROUGH CACHE
+# Entries are grouped by name (the model name for CRUD reads). Each name has
+# its own TTL and LRU size bound. Writes call invalidate(name), which drops the
+# local entries and bumps the name's generation on the invalidation bus; other
+# workers compare generations on every read and ignore stale entries.
+
+class LocalInvalidationBus:
+    """
+    In-process stand-in for the cross-worker bus (single worker, tests)
+    """
+    shared = False
+
+    def __init__(self):
+        self.generations = {}
+
+    def generation(self, name):
+        return self.generations.get(name, 0)
+
+    def publish(self, name):
+        self.generations[name] = self.generation(name) + 1
+
+class FileInvalidationBus:
+    """
+    Cross-worker bus for workers sharing a host (e.g. gunicorn workers).
+    Publishing appends a byte to a per-name file; the generation is the
+    file's (mtime, size), so checking it costs one stat() call.
+    """
+    shared = True
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.gen")
+
+    def generation(self, name):
+        try:
+            stat = os.stat(self._path(name))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def publish(self, name):
+        with open(self._path(name), 'ab') as f:
+            f.write(b'.')
+
+class ReadThroughCache:
+
+    def __init__(self, bus=None):
+        self.bus = bus or LocalInvalidationBus()
+        self.lock = Lock()
+        self.entries = {}
+        self.counters = {}
+
+    def _counters(self, name):
+        return self.counters.setdefault(name, {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0})
+
+    def get(self, name, key, load, ttl=60, max_entries=256):
+        generation = self.bus.generation(name)
+        now = time.monotonic()
+        with self.lock:
+            entries = self.entries.setdefault(name, OrderedDict())
+            entry = entries.get(key)
+            if entry and entry[0] > now and entry[1] == generation:
+                entries.move_to_end(key)
+                self._counters(name)["hits"] += 1
+                return entry[2]
+            self._counters(name)["misses"] += 1
+        value = load()
+        with self.lock:
+            entries = self.entries.setdefault(name, OrderedDict())
+            entries[key] = (now + ttl, generation, value)
+            entries.move_to_end(key)
+            while len(entries) > max_entries:
+                entries.popitem(last=False)
+                self._counters(name)["evictions"] += 1
+        return value
+
+    def invalidate(self, name):
+        self.bus.publish(name)
+        with self.lock:
+            self.entries.pop(name, None)
+            self._counters(name)["invalidations"] += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                name: dict(counters, size=len(self.entries.get(name, ())))
+                for name, counters in self.counters.items()
+            }
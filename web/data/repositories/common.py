@@ -1,6 +1,19 @@
 from data           import db
 from data.models    import User, Vehicle, Appointment, Payment, Notification, Loyalty, Service, Queue, Staff, Feedback
-from flask          import jsonify
+from data.repositories.cache import ReadThroughCache, FileInvalidationBus
+from flask          import jsonify, current_app, json, Response, stream_with_context, abort, request
+from datetime       import date, datetime, timedelta
+from sqlalchemy     import and_, bindparam, case
+from sqlalchemy.dialects import mysql, postgresql
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.security import generate_password_hash
+from concurrent.futures import ProcessPoolExecutor
+from threading      import Lock
+import base64
+import hashlib
+import multiprocessing
+import re
+import time
 
 # class CommonRepo:
 
@@ -11,33 +24,760 @@ def validate_fields(data, required_fields):
         return {"error": f"Missing fields: {', '.join(missing_fields)}"}, 400
     return None
 
+# Pagination Helpers
+# List endpoints are keyset paginated on the primary key. The cursor handed
+# back to clients is opaque; it currently wraps the last id of the page.
+def encode_cursor(last_id):
+    payload = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    if cursor.isdigit():
+        return int(cursor)
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def parse_page_args(args):
+    max_size = current_app.config['API_MAX_PAGE_SIZE']
+    limit = args.get('limit', current_app.config['API_PAGE_SIZE'])
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return None, None, ({"error": "limit must be an integer"}, 400)
+    if limit < 1:
+        return None, None, ({"error": "limit must be positive"}, 400)
+    after = args.get('after')
+    if after:
+        after = decode_cursor(after)
+        if after is None:
+            return None, None, ({"error": "Invalid cursor"}, 400)
+    return min(limit, max_size), after, None
+
+# Projection Helpers
+# Reads select individual columns instead of whole entities. Without ?fields=
+# the row is handed to the model's own to_dict (rows expose columns as
+# attributes); with ?fields= only the requested columns are selected.
+def parse_fields(model, args):
+    fields = args.get('fields')
+    if not fields:
+        return None, None
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in model.serialize_columns]
+    if unknown:
+        return None, ({"error": f"Unknown fields: {', '.join(unknown)}"}, 400)
+    # The id is always returned; pagination cursors are built from it.
+    return ["id"] + [field for field in requested if field != "id"], None
+
+def projected_query(model, fields, validators=False):
+    columns = list(fields or model.serialize_columns)
+    if validators and 'updated_at' not in columns:
+        # updated_at feeds the ETag / Last-Modified validators.
+        columns.append('updated_at')
+    if validators and versioned(model) and 'version' not in columns:
+        columns.append('version')
+    return db.session.query(*[getattr(model, column) for column in columns])
+
+def serialize_row(model, row, fields):
+    if fields is None:
+        return model.to_dict(row)
+    data = {}
+    for field in fields:
+        value = getattr(row, field)
+        data[field] = value.isoformat() if isinstance(value, (date, datetime)) else value
+    return data
+
+# Conditional GET Helpers
+# ETags are derived from the ids and updated_at values (versions, where the
+# model has them) of the rows being returned, plus the query arguments and
+# the next page cursor, so a matching If-None-Match or If-Modified-Since is
+# answered with 304 before anything is serialized.
+#
+# Collections send no Last-Modified: the newest updated_at of a page does not
+# move when a row is deleted or leaves the filter, so If-Modified-Since would
+# answer 304 for a changed list. Their ETag covers the row ids and does.
+#
+# DATETIME columns may only keep whole seconds (MySQL), so two writes within
+# the same second can leave updated_at, and with it Last-Modified and
+# updated_at based ETags, unchanged. Responses whose newest row changed less
+# than a second ago therefore carry no such validators; version based ETags
+# are exact and always sent.
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+def not_modified(etag, last_modified):
+    if request.if_none_match:
+        return etag is not None and request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+def conditional_response(etag, last_modified, build, exact=False, collection=False):
+    if last_modified and last_modified >= datetime.now().replace(microsecond=0) - timedelta(seconds=1):
+        last_modified = None
+        etag = etag if exact else None
+    if collection:
+        last_modified = None
+    if not_modified(etag, last_modified):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    if etag:
+        response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+# Optimistic Concurrency
+# Models with a version column (Appointment, Payment, Queue) bump it in every
+# UPDATE (its onupdate is version + 1), and single-record reads of them send
+# ETag "v<version>" (plus a suffix for ?fields= projections). An update that
+# names the version it was based on, in If-Match or as "version" in the body,
+# runs as UPDATE ... WHERE id = :id AND version = :version; if another write
+# got there first nothing matches and the answer is 409 with the current
+# version. No row is locked. With API_REQUIRE_IF_MATCH, updates of these
+# models without either are refused with 428.
+VERSION_ETAG = re.compile(r'^(?:W/)?"?v(\d+)(?:-[0-9a-f]+)?"?$')
+
+def versioned(model):
+    return 'version' in model.__table__.columns
+
+def version_etag(version, fields=None):
+    return f"v{version}-{make_etag(fields)[:8]}" if fields else f"v{version}"
+
+def expected_version(model, data):
+    # Pops "version" from data; returns (version or None, error).
+    version = data.pop('version', None)
+    header = request.headers.get('If-Match', '').strip()
+    if header and header != '*':
+        match = VERSION_ETAG.match(header)
+        if match is None:
+            return None, ({"error": "If-Match must be a single ETag from a read of this record"}, 412)
+        if version is not None and version != int(match.group(1)):
+            return None, ({"error": "If-Match and version disagree"}, 400)
+        version = int(match.group(1))
+    if version is None:
+        if current_app.config['API_REQUIRE_IF_MATCH'] and not header:
+            return None, ({"error": f"{model.__name__} updates need If-Match or a version"}, 428)
+        return None, None
+    if isinstance(version, bool) or not isinstance(version, int):
+        return None, ({"error": "version must be an integer"}, 400)
+    return version, None
+
+def current_versions(model, ids):
+    return dict(db.session.query(model.id, model.version).filter(model.id.in_(ids)))
+
+# Read Cache
+# Models listed in CACHE_MODELS have their read results (payload plus
+# validators) cached; every write to such a model invalidates it.
+_read_cache = None
+
+def read_cache():
+    global _read_cache
+    if _read_cache is None:
+        directory = current_app.config['CACHE_INVALIDATION_DIR']
+        _read_cache = ReadThroughCache(FileInvalidationBus(directory) if directory else None)
+    return _read_cache
+
+def cached_read(model, key, load):
+    settings = current_app.config['CACHE_MODELS'].get(model.__name__)
+    if not settings:
+        return load()
+
+    def materialize():
+        etag, last_modified, build = load()
+        payload = build()
+        return etag, last_modified, lambda: payload
+
+    return read_cache().get(model.__name__, key, materialize, **settings)
+
+def invalidate_cache(model):
+    if model.__name__ in current_app.config['CACHE_MODELS']:
+        read_cache().invalidate(model.__name__)
+
+def cache_stats():
+    return jsonify(read_cache().stats())
+
+# Filter Helpers
+def coerce_value(column, value):
+    if isinstance(column.type, db.DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, db.Boolean):
+        if value.lower() not in ('1', '0', 'true', 'false'):
+            raise ValueError(f"{column.key} must be true or false")
+        return value.lower() in ('1', 'true')
+    return column.type.python_type(value)
+
+def coerce_integer(key, value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{key} must be an integer")
+    try:
+        number = int(value) if isinstance(value, str) else value
+    except ValueError:
+        raise ValueError(f"{key} must be an integer") from None
+    if number != int(number):
+        raise ValueError(f"{key} must be an integer")
+    return int(number)
+
+def coerce_columns(model, data):
+    # JSON carries datetimes as ISO strings; DateTime columns need datetime
+    # objects. Integer columns may arrive as strings (JSON, CSV imports) and
+    # write hooks do arithmetic on them, so they are converted here too.
+    columns = model.__table__.columns
+    values = {}
+    for key, value in data.items():
+        column = columns.get(key)
+        if column is not None and value is not None:
+            if isinstance(value, str) and isinstance(column.type, db.DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column.type, db.Integer):
+                value = coerce_integer(key, value)
+        values[key] = value
+    return values
+
+def parse_filters(model, args):
+    criteria = []
+    for name in model.filter_columns:
+        if name not in args:
+            continue
+        column = getattr(model, name).property.columns[0]
+        try:
+            values = [coerce_value(column, value) for value in args[name].split(',')]
+        except ValueError:
+            return None, ({"error": f"Invalid value for {name}"}, 400)
+        attribute = getattr(model, name)
+        criteria.append(attribute == values[0] if len(values) == 1 else attribute.in_(values))
+    bounds = {f"{name}_{side}": (name, side) for name in model.range_columns for side in ('from', 'to')}
+    bounds['from'] = (model.range_columns[0], 'from')
+    bounds['to'] = (model.range_columns[0], 'to')
+    for key, (name, side) in bounds.items():
+        if not args.get(key):
+            continue
+        try:
+            value = datetime.fromisoformat(args[key])
+        except ValueError:
+            return None, ({"error": f"Invalid date for {key}"}, 400)
+        # Ranges are half-open: from is inclusive, to is exclusive.
+        attribute = getattr(model, name)
+        criteria.append(attribute >= value if side == 'from' else attribute < value)
+    return criteria, None
+
+# Write Hooks
+# Hooks registered per (model, event) run inside the write transaction, before
+# the commit, and reject the write by returning an error response tuple.
+#   before_create(row)   column values of one new row, may adjust them in place
+#   before_insert(rows)  the rows about to be inserted (per chunk for bulk writes)
+#   before_update(rows)  id plus new column values, before the UPDATE runs
+#   before_delete(ids)   ids about to be deleted, before the DELETE runs
+_hooks = {}
+
+def add_hook(model, event, hook):
+    _hooks.setdefault((model, event), []).append(hook)
+
+def run_hooks(model, event, *args):
+    for hook in _hooks.get((model, event), ()):
+        result = hook(*args)
+        if result is not None:
+            return result
+    return None
+
+# Write Listeners
+# Listeners run after a successful commit with the action ('create', 'update'
+# or 'delete') and the affected rows as dicts of column values (updates carry
+# the id plus the changed columns; bulk creates carry no ids). A failing
+# listener is logged and never fails the request.
+_listeners = {}
+
+def add_listener(model, listener):
+    _listeners.setdefault(model, []).append(listener)
+
+def after_commit(model, action, rows):
+    invalidate_cache(model)
+    for listener in _listeners.get(model, ()):
+        try:
+            listener(model, action, rows)
+        except Exception:
+            current_app.logger.exception(f"{model.__name__} {action} listener failed")
+
+def changed_columns(model, data):
+    return {key: value for key, value in data.items() if key in model.__table__.columns}
+
+# Counter Helpers
+# Adds increments to summary rows keyed by key_columns, creating the rows that
+# don't exist yet. MySQL and PostgreSQL do it in one upsert statement per
+# batch; other databases update each key and insert the ones that matched
+# nothing. rows are dicts of the key columns plus the increments.
+def upsert_increment(model, key_columns, rows):
+    table = model.__table__
+    now = datetime.now()
+    dialect = db.engine.dialect.name
+    for keys, group in group_by_keys(rows):
+        counters = [key for key in keys if key not in key_columns]
+        if dialect in ('mysql', 'postgresql'):
+            insert = (mysql if dialect == 'mysql' else postgresql).insert(table)
+            new = insert.inserted if dialect == 'mysql' else insert.excluded
+            values = {key: table.c[key] + new[key] for key in counters}
+            if 'updated_at' in table.c:
+                values['updated_at'] = now
+            if dialect == 'mysql':
+                statement = insert.on_duplicate_key_update(values)
+            else:
+                statement = insert.on_conflict_do_update(index_elements=list(key_columns), set_=values)
+            db.session.execute(statement, group)
+            continue
+        for row in group:
+            values = {key: table.c[key] + row[key] for key in counters}
+            if 'updated_at' in table.c:
+                values['updated_at'] = now
+            where = and_(*(table.c[key] == row[key] for key in key_columns))
+            if not db.session.execute(table.update().where(where).values(values)).rowcount:
+                db.session.execute(table.insert().values(row))
+
+# Password Hashing
+# Bulk writes hash User.password values on a process pool (the KDF holds the
+# GIL, threads wouldn't help) instead of one by one through the model's
+# setter on the request thread. Batches smaller than PASSWORD_HASH_POOL_MIN
+# are hashed inline.
+_hash_pool = None
+_hash_lock = Lock()
+hash_counters = {"hashed": 0, "pooled": 0, "seconds": 0.0}
+
+def hash_pool():
+    global _hash_pool
+    with _hash_lock:
+        if _hash_pool is None:
+            # forkserver children don't inherit the web worker's threads and sockets.
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else None)
+            _hash_pool = ProcessPoolExecutor(current_app.config['PASSWORD_HASH_PROCESSES'], mp_context=context)
+        return _hash_pool
+
+def hash_passwords(model, items):
+    # Replaces "password" with "password_hash" in the given dicts, in place.
+    if not isinstance(getattr(model, 'password', None), property) or 'password_hash' not in model.__table__.columns:
+        return
+    items = [item for item in items if isinstance(item.get('password'), str)]
+    if not items:
+        return
+    started = time.perf_counter()
+    passwords = [item.pop('password') for item in items]
+    processes = current_app.config['PASSWORD_HASH_PROCESSES']
+    if processes > 1 and len(passwords) >= current_app.config['PASSWORD_HASH_POOL_MIN']:
+        chunk_size = max(1, len(passwords) // (processes * 4))
+        hashes = list(hash_pool().map(generate_password_hash, passwords, chunksize=chunk_size))
+        hash_counters["pooled"] += len(passwords)
+    else:
+        hashes = [generate_password_hash(password) for password in passwords]
+    for item, password_hash in zip(items, hashes):
+        item['password_hash'] = password_hash
+    hash_counters["hashed"] += len(passwords)
+    hash_counters["seconds"] += time.perf_counter() - started
+
 # CRUD Helpers
 def create_record(model, data, required_fields):
     validation_error = validate_fields(data, required_fields)
     if validation_error:
         return validation_error
+    try:
+        data = coerce_columns(model, data)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    hook_error = run_hooks(model, 'before_create', data) or run_hooks(model, 'before_insert', [data])
+    if hook_error:
+        db.session.rollback()
+        return hook_error
     record = model(**data)
     db.session.add(record)
     db.session.commit()
+    after_commit(model, 'create', [dict(data, id=record.id)])
     return jsonify({"message": f"{model.__name__} created successfully"})
 
-def read_records(model):
-    records = model.query.all()
-    return jsonify([record.to_dict() for record in records])
+def read_records(model, args=None):
+    args = args or {}
+    limit, after, page_error = parse_page_args(args)
+    if page_error:
+        return page_error
+    fields, fields_error = parse_fields(model, args)
+    if fields_error:
+        return fields_error
+    criteria, filter_error = parse_filters(model, args)
+    if filter_error:
+        return filter_error
+    query = projected_query(model, fields, validators=True).filter(*criteria).order_by(model.id)
+    if after is not None:
+        query = query.filter(model.id > after)
+
+    def load():
+        # One extra row tells us whether another page exists without a COUNT.
+        rows = query.limit(limit + 1).all()
+        next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+        rows = rows[:limit]
+        validators = [(row.id, row.updated_at, row.version) if versioned(model) else (row.id, row.updated_at) for row in rows]
+        etag = make_etag(model.__name__, sorted(args.items()), validators, next_cursor)
+        last_modified = max((row.updated_at for row in rows), default=None)
+        return etag, last_modified, lambda: {
+            "data"          : [serialize_row(model, row, fields) for row in rows],
+            "next_cursor"   : next_cursor
+        }
+
+    etag, last_modified, build = cached_read(model, ('list', tuple(sorted(args.items()))), load)
+    return conditional_response(etag, last_modified, build, exact=versioned(model), collection=True)
 
-def read_record(model, id):
-    record = model.query.get_or_404(id)
-    return jsonify(record.to_dict())
+def stream_records(model, args=None):
+    # NDJSON export of the whole table (or everything after ?after=). Rows are
+    # pulled through a server-side cursor in fixed-size batches and written out
+    # batch by batch, so memory stays flat regardless of table size.
+    args = args or {}
+    after = args.get('after')
+    if after:
+        after = decode_cursor(after)
+        if after is None:
+            return {"error": "Invalid cursor"}, 400
+    fields, fields_error = parse_fields(model, args)
+    if fields_error:
+        return fields_error
+    criteria, filter_error = parse_filters(model, args)
+    if filter_error:
+        return filter_error
+    batch_size = current_app.config['API_STREAM_BATCH_SIZE']
+    query = projected_query(model, fields).filter(*criteria).order_by(model.id)
+    if after is not None:
+        query = query.filter(model.id > after)
+
+    def generate():
+        lines = []
+        for row in query.yield_per(batch_size):
+            lines.append(json.dumps(serialize_row(model, row, fields)))
+            if len(lines) >= batch_size:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def read_record(model, id, args=None):
+    fields, fields_error = parse_fields(model, args or {})
+    if fields_error:
+        return fields_error
+
+    def load():
+        row = projected_query(model, fields, validators=True).filter(model.id == id).first()
+        if row is None:
+            abort(404)
+        etag = version_etag(row.version, fields) if versioned(model) else make_etag(model.__name__, id, fields, row.updated_at)
+        return etag, row.updated_at, lambda: serialize_row(model, row, fields)
+
+    etag, last_modified, build = cached_read(model, ('one', id, tuple(fields or ())), load)
+    return conditional_response(etag, last_modified, build, exact=versioned(model))
+
+def validate_update(model, data):
+    if not isinstance(data, dict) or not data:
+        return {"error": "Nothing to update"}, 400
+    blocked = [key for key in data if key not in model.updatable_columns]
+    if blocked:
+        return {"error": f"Fields not updatable: {', '.join(blocked)}"}, 400
+    return None
 
 def update_record(model, id, data):
-    record = model.query.get_or_404(id)
-    for key, value in data.items():
-        setattr(record, key, value)
+    version = None
+    if versioned(model) and isinstance(data, dict):
+        data = dict(data)
+        version, version_error = expected_version(model, data)
+        if version_error:
+            return version_error
+    validation_error = validate_update(model, data)
+    if validation_error:
+        return validation_error
+    if getattr(model, 'orm_writes', False):
+        record = model.query.get_or_404(id)
+        hook_error = run_hooks(model, 'before_update', [dict(changed_columns(model, data), id=id)])
+        if hook_error:
+            db.session.rollback()
+            return hook_error
+        for key, value in data.items():
+            setattr(record, key, value)
+        db.session.commit()
+        after_commit(model, 'update', [dict(changed_columns(model, data), id=id)])
+        return jsonify({"message": f"{model.__name__} updated successfully"})
+    try:
+        values = column_values(model, data)
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}, 400
+    hook_error = run_hooks(model, 'before_update', [dict(values, id=id)])
+    if hook_error:
+        db.session.rollback()
+        return hook_error
+    # Single UPDATE ... WHERE id = :id [AND version = :version]; the matched
+    # row count decides the 404 / 409.
+    query = model.query.filter(model.id == id)
+    if version is not None:
+        query = query.filter(model.version == version)
+    if not query.update(values, synchronize_session=False):
+        db.session.rollback()
+        current = current_versions(model, [id]).get(id) if version is not None else None
+        if current is None:
+            abort(404)
+        return {"error": f"{model.__name__} {id} was changed by another request (version {current}, expected {version})",
+                "version": current}, 409
     db.session.commit()
-    return jsonify({"message": f"{model.__name__} updated successfully"})
+    after_commit(model, 'update', [dict(values, id=id)])
+    if version is None:
+        return jsonify({"message": f"{model.__name__} updated successfully"})
+    response = jsonify({"message": f"{model.__name__} updated successfully", "version": version + 1})
+    response.set_etag(version_etag(version + 1))
+    return response
 
 def delete_record(model, id):
-    record = model.query.get_or_404(id)
-    db.session.delete(record)
+    if getattr(model, 'orm_writes', False):
+        record = model.query.get_or_404(id)
+        hook_error = run_hooks(model, 'before_delete', [id])
+        if hook_error:
+            db.session.rollback()
+            return hook_error
+        db.session.delete(record)
+        db.session.commit()
+        after_commit(model, 'delete', [{"id": id}])
+        return jsonify({"message": f"{model.__name__} deleted successfully"})
+    hook_error = run_hooks(model, 'before_delete', [id])
+    if hook_error:
+        db.session.rollback()
+        return hook_error
+    if not model.query.filter(model.id == id).delete(synchronize_session=False):
+        db.session.rollback()
+        abort(404)
     db.session.commit()
+    after_commit(model, 'delete', [{"id": id}])
     return jsonify({"message": f"{model.__name__} deleted successfully"})
+
+
+# Bulk Helpers
+# Bulk writes validate every item up front, then run chunked executemany
+# statements inside a single transaction (mysqlclient rewrites executemany
+# INSERTs into multi-row INSERTs). Results are reported per item.
+#
+# There is no multi-row form of UPDATE, and executemany sends one statement
+# per row, so bulk updates write each chunk with
+#   UPDATE t SET col = CASE id WHEN :id THEN :value ... ELSE col END, ...
+#   WHERE id IN (...) [AND version = CASE id WHEN :id THEN :version ... END]
+# split only as far as the database's bind parameter limit requires.
+MAX_BIND_PARAMS = {"mysql": 65535, "postgresql": 65535}   # others: SQLite's old default
+def parse_bulk_items(items):
+    if not isinstance(items, list) or not items:
+        return ({"error": "Expected a non-empty list of items"}, 400)
+    if len(items) > current_app.config['API_BULK_MAX_ITEMS']:
+        return ({"error": f"At most {current_app.config['API_BULK_MAX_ITEMS']} items per request"}, 400)
+    return None
+
+def parse_chunk_size(args):
+    try:
+        chunk_size = int(args.get('chunk_size', current_app.config['API_BULK_CHUNK_SIZE']))
+    except (TypeError, ValueError):
+        return None
+    return max(1, min(chunk_size, current_app.config['API_BULK_MAX_CHUNK_SIZE']))
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def group_by_keys(rows):
+    # executemany needs every row in a statement to bind the same columns.
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return groups.items()
+
+def case_update(table, rows):
+    # rows are (id, values, version or None); see Bulk Helpers.
+    columns = sorted({key for _, values, _ in rows for key in values})
+    statement = table.update().where(table.c.id.in_([id for id, _, _ in rows])).values({
+        key: case({id: bindparam(None, values[key], type_=table.c[key].type) for id, values, _ in rows if key in values},
+                  value=table.c.id, else_=table.c[key])
+        for key in columns
+    })
+    versions = {id: version for id, _, version in rows if version is not None}
+    if versions:
+        statement = statement.where(table.c.version == case(versions, value=table.c.id, else_=table.c.version))
+    return statement
+
+def case_updates(table, rows):
+    # Yields (statement, row count, versioned) within the bind parameter limit.
+    limit = MAX_BIND_PARAMS.get(db.engine.dialect.name, 999)
+    width = 3 + 2 * len({key for _, values, _ in rows for key in values})
+    for batch in chunked(rows, max(1, limit // width)):
+        yield case_update(table, batch), len(batch), any(version is not None for _, _, version in batch)
+
+def column_values(model, item):
+    columns = model.__table__.columns
+    unknown = [key for key in item if key not in columns and not isinstance(getattr(model, key, None), property)]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    values = {key: value for key, value in item.items() if key in columns}
+    synthetic = {key: value for key, value in item.items() if key not in columns}
+    if synthetic:
+        # Let the model's property setters (e.g. User.password) derive columns.
+        record = model(**synthetic)
+        for column in columns:
+            if column.key not in values and getattr(record, column.key) is not None:
+                values[column.key] = getattr(record, column.key)
+    return coerce_columns(model, values)
+
+def existing_ids(model, ids):
+    return {row.id for row in db.session.query(model.id).filter(model.id.in_(ids))}
+
+def bulk_create_records(model, items, required_fields, args=None):
+    items_error = parse_bulk_items(items)
+    if items_error:
+        return items_error
+    chunk_size = parse_chunk_size(args or {})
+    if chunk_size is None:
+        return {"error": "chunk_size must be an integer"}, 400
+    valid, rows, results = [], [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({"index": index, "error": "Item must be an object"})
+            continue
+        validation_error = validate_fields(item, required_fields)
+        if validation_error:
+            results.append({"index": index, "error": validation_error[0]["error"]})
+            continue
+        valid.append((index, item))
+    hash_passwords(model, [item for _, item in valid])
+    for index, item in valid:
+        try:
+            row = column_values(model, item)
+        except (TypeError, ValueError) as e:
+            results.append({"index": index, "error": str(e)})
+            continue
+        hook_error = run_hooks(model, 'before_create', row)
+        if hook_error:
+            results.append({"index": index, "error": hook_error[0]["error"]})
+            continue
+        rows.append(row)
+    if results:
+        db.session.rollback()
+        results.sort(key=lambda result: result["index"])
+        return jsonify({"error": "Validation failed, nothing was written", "results": results}), 400
+    try:
+        for chunk in chunked(rows, chunk_size):
+            hook_error = run_hooks(model, 'before_insert', chunk)
+            if hook_error:
+                db.session.rollback()
+                return hook_error
+            for _, group in group_by_keys(chunk):
+                db.session.execute(model.__table__.insert(), group)
+        db.session.commit()
+        after_commit(model, 'create', rows)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return {"error": str(e.orig if hasattr(e, 'orig') else e)}, 409
+    return jsonify({
+        "message"   : f"{len(rows)} {model.__name__} records created successfully",
+        "results"   : [{"index": index, "status": "created"} for index in range(len(rows))]
+    })
+
+def bulk_update_records(model, items, args=None):
+    items_error = parse_bulk_items(items)
+    if items_error:
+        return items_error
+    chunk_size = parse_chunk_size(args or {})
+    if chunk_size is None:
+        return {"error": "chunk_size must be an integer"}, 400
+    valid, rows, errors, seen = [], [], [], set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+            errors.append({"index": index, "error": "Item must be an object with an integer id"})
+            continue
+        if item['id'] in seen:
+            # A second update of the same row would look like a version conflict.
+            errors.append({"index": index, "error": f"Duplicate id {item['id']}"})
+            continue
+        seen.add(item['id'])
+        changes = {key: value for key, value in item.items() if key != 'id'}
+        version = changes.pop('version', None) if versioned(model) else None
+        if version is not None and (isinstance(version, bool) or not isinstance(version, int)):
+            errors.append({"index": index, "error": "version must be an integer"})
+            continue
+        validation_error = validate_update(model, changes)
+        if validation_error:
+            errors.append({"index": index, "error": validation_error[0]["error"]})
+            continue
+        valid.append((index, item['id'], changes, version))
+    hash_passwords(model, [changes for _, _, changes, _ in valid])
+    for index, id, changes, version in valid:
+        try:
+            rows.append((index, id, column_values(model, changes), version))
+        except (TypeError, ValueError) as e:
+            errors.append({"index": index, "error": str(e)})
+    if errors:
+        errors.sort(key=lambda error: error["index"])
+        return jsonify({"error": "Validation failed, nothing was written", "results": errors}), 400
+    table = model.__table__
+    results, updated, expected, short = [], [], {}, False
+    try:
+        for chunk in chunked(rows, chunk_size):
+            found = existing_ids(model, [id for _, id, _, _ in chunk])
+            writes, chunk_rows = [], []
+            for index, id, values, version in chunk:
+                if id not in found:
+                    results.append({"index": index, "id": id, "status": "not_found"})
+                    continue
+                results.append({"index": index, "id": id, "status": "updated"})
+                chunk_rows.append(dict(values, id=id))
+                writes.append((id, values, version))
+                if version is not None:
+                    # Matched on version, see Optimistic Concurrency.
+                    expected[id] = (index, version)
+            hook_error = run_hooks(model, 'before_update', chunk_rows) if chunk_rows else None
+            if hook_error:
+                db.session.rollback()
+                return hook_error
+            updated.extend(chunk_rows)
+            for statement, count, versioned_rows in case_updates(table, writes):
+                result = db.session.execute(statement)
+                short = short or (versioned_rows and result.rowcount < count)
+        if short:
+            # Some row had moved on; write nothing and report which.
+            db.session.rollback()
+            current = current_versions(model, list(expected))
+            conflicts = sorted(({"index": index, "id": id, "status": "conflict", "version": current.get(id), "expected": version}
+                                for id, (index, version) in expected.items() if current.get(id) != version),
+                               key=lambda conflict: conflict["index"])
+            return jsonify({"error": "Version conflict, nothing was written", "results": conflicts}), 409
+        db.session.commit()
+        after_commit(model, 'update', updated)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return {"error": str(e.orig if hasattr(e, 'orig') else e)}, 409
+    return jsonify({"message": f"{model.__name__} bulk update finished", "results": results})
+
+def bulk_delete_records(model, ids, args=None):
+    items_error = parse_bulk_items(ids)
+    if items_error:
+        return items_error
+    if not all(isinstance(id, int) for id in ids):
+        return {"error": "Expected a list of integer ids"}, 400
+    chunk_size = parse_chunk_size(args or {})
+    if chunk_size is None:
+        return {"error": "chunk_size must be an integer"}, 400
+    table = model.__table__
+    results, deleted = [], []
+    try:
+        for chunk in chunked(ids, chunk_size):
+            found = existing_ids(model, chunk)
+            results.extend({"id": id, "status": "deleted" if id in found else "not_found"} for id in chunk)
+            if found:
+                hook_error = run_hooks(model, 'before_delete', sorted(found))
+                if hook_error:
+                    db.session.rollback()
+                    return hook_error
+                db.session.execute(table.delete().where(table.c.id.in_(found)))
+                deleted.extend({"id": id} for id in found)
+        db.session.commit()
+        after_commit(model, 'delete', deleted)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return {"error": str(e.orig if hasattr(e, 'orig') else e)}, 409
+    return jsonify({"message": f"{model.__name__} bulk delete finished", "results": results})
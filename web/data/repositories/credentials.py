@@ -0,0 +1,107 @@
+from data.models    import User
+from data.repositories import common
+from flask          import current_app, jsonify
+from threading      import Lock
+import hashlib
+import hmac
+import os
+import time
+
+# API CREDENTIALS
+# Basic auth runs on every API call, and checking a user's password costs a
+# full KDF. Successful checks are kept in the read-through cache under
+# 'credentials' for AUTH_CACHE_TTL seconds (AUTH_CACHE_ENTRIES most recent),
+# keyed by HMAC-SHA256 of the credentials with a random per-process key: the
+# password itself is never stored and the keys are useless outside this
+# process. Failed checks are never cached. Any User update or delete
+# invalidates the whole name on every worker.
+#
+# Only the integration account (API_USERNAME / API_PASSWORD) may use the API,
+# plus Users whose role is listed in API_USER_ROLES (empty by default); other
+# users' credentials are refused without being checked.
+
+NAME = 'credentials'
+
+class InvalidCredentials(Exception):
+    pass
+
+class CredentialCache:
+
+    def __init__(self):
+        self.key = os.urandom(32)
+        self.lock = Lock()
+        self.counters = {"requests": 0, "cpu_seconds": 0.0, "verifications": 0, "verify_cpu_seconds": 0.0, "failures": 0}
+
+    def digest(self, username, password):
+        message = f"{len(username)}:{username}:{password}".encode()
+        return hmac.new(self.key, message, hashlib.sha256).digest()
+
+    def check(self, username, password):
+        # Uncached path; CPU time of this thread only, so concurrent requests
+        # don't inflate each other's numbers.
+        started = time.thread_time()
+        try:
+            if hmac.compare_digest(username.encode(), current_app.config['API_USERNAME'].encode()) and \
+                    hmac.compare_digest(password.encode(), current_app.config['API_PASSWORD'].encode()):
+                return True
+            roles = current_app.config['API_USER_ROLES']
+            if not roles:
+                return False
+            user = User.query.filter(User.email == username, User.role.in_(roles)).first()
+            return user is not None and user.verify_password(password)
+        finally:
+            elapsed = time.thread_time() - started
+            with self.lock:
+                self.counters["verifications"] += 1
+                self.counters["verify_cpu_seconds"] += elapsed
+
+    def verify(self, username, password):
+        started = time.thread_time()
+        try:
+            return self.lookup(username, password)
+        finally:
+            elapsed = time.thread_time() - started
+            with self.lock:
+                self.counters["requests"] += 1
+                self.counters["cpu_seconds"] += elapsed
+
+    def lookup(self, username, password):
+        def load():
+            if not self.check(username, password):
+                with self.lock:
+                    self.counters["failures"] += 1
+                raise InvalidCredentials()
+            return True
+        try:
+            return common.read_cache().get(NAME, self.digest(username, password), load,
+                                           ttl=current_app.config['AUTH_CACHE_TTL'],
+                                           max_entries=current_app.config['AUTH_CACHE_ENTRIES'])
+        except InvalidCredentials:
+            return False
+
+    def changed(self, model, action, rows):
+        # Write listener for User, see common.after_commit.
+        if action in ('update', 'delete'):
+            common.read_cache().invalidate(NAME)
+
+cache = CredentialCache()
+
+# Request helpers used by application/api.py
+def authenticate(username, password):
+    if not username or not password:
+        return False
+    return cache.verify(username, password)
+
+def stats():
+    with cache.lock:
+        counters = dict(cache.counters)
+    lookups = common.read_cache().stats().get(NAME, {})
+    return jsonify({
+        "requests"          : counters["requests"],
+        "cpu_seconds"       : round(counters["cpu_seconds"], 4),
+        "verifications"     : counters["verifications"],
+        "verify_cpu_seconds": round(counters["verify_cpu_seconds"], 4),
+        "failures"          : counters["failures"],
+        "cache"             : lookups,
+        "password_hashing"  : dict(common.hash_counters, seconds=round(common.hash_counters["seconds"], 4)),
+    })
@@ -0,0 +1,183 @@
+from data           import db
+from data.models    import Appointment, CompletionStat, Queue
+from data.repositories import common, queueing, scheduling
+from flask          import current_app, g, jsonify
+from sqlalchemy     import case, func
+from sqlalchemy.exc import IntegrityError
+from datetime       import datetime
+from threading      import Lock
+import time
+
+# QUEUE WAIT ESTIMATES
+# Service times are learned from Appointment status changes: when an
+# appointment becomes 'Completed', the time since its queue entry was served
+# (or since its appointment_date when it never went through the queue) is one
+# sample. Only real transitions count: a before_update hook locks the rows
+# being set to 'Completed' and keeps those that weren't already, so re-sent
+# updates add nothing. Each sample updates two rolling means in completion_stat with a
+# single UPDATE: the service type's duration in minutes and the staff
+# member's speed factor (actual / expected). Nothing is recomputed from
+# history.
+#
+# The wait table for the current line (serving entries, then waiting ones in
+# order) is a prefix sum of expected durations divided by the number of
+# washers, computed with one query and kept until the line or the statistics
+# change ('queue-order' / 'eta-stats' bus generations) or ETA_TABLE_TTL
+# passes, as serving cars' remaining time shrinks.
+
+STATS_NAME = 'eta-stats'
+
+def ewma_update(model, scope, key, value, alpha):
+    # Running mean for the first 1/alpha samples, exponential after that.
+    weight = case([(model.samples + 1 < 1 / alpha, 1.0 / (model.samples + 1))], else_=alpha)
+    return model.query.filter(model.scope == scope, model.key == key).update({
+        model.mean      : model.mean + (value - model.mean) * weight,
+        model.samples   : model.samples + 1,
+        model.updated_at: datetime.now(),
+    }, synchronize_session=False)
+
+def record_sample(scope, key, value, alpha):
+    if not ewma_update(CompletionStat, scope, key, value, alpha):
+        try:
+            db.session.add(CompletionStat(scope=scope, key=key, samples=1, mean=value))
+            db.session.commit()
+            return
+        except IntegrityError:
+            # Another worker inserted the first sample meanwhile.
+            db.session.rollback()
+            ewma_update(CompletionStat, scope, key, value, alpha)
+    db.session.commit()
+
+class WaitEstimator:
+
+    def __init__(self):
+        self.lock = Lock()
+        self.stats_entry = None
+        self.table_entry = None
+
+    def bus(self):
+        return common.read_cache().bus
+
+    def stats(self):
+        generation = self.bus().generation(STATS_NAME)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.stats_entry
+        if entry and entry[1] == generation and now - entry[0] < current_app.config['ETA_STATS_TTL']:
+            return entry[2]
+        stats = {(row.scope, row.key): row.mean for row in db.session.query(CompletionStat.scope, CompletionStat.key, CompletionStat.mean)}
+        with self.lock:
+            self.stats_entry = (now, generation, stats)
+        return stats
+
+    def service_minutes(self, service_type, stats):
+        mean = stats.get(('service', service_type))
+        if mean is None:
+            mean = scheduling.engine.durations().get(service_type) or current_app.config['SCHEDULE_DEFAULT_DURATION']
+        return mean
+
+    def expected_minutes(self, service_type, staff_id, stats):
+        factor = stats.get(('staff', str(staff_id)), 1.0) if staff_id is not None else 1.0
+        return self.service_minutes(service_type, stats) * factor
+
+    def completing(self, rows):
+        # before_update hook for Appointment; FOR UPDATE so concurrent
+        # requests completing the same appointment see each other's write.
+        ids = [row["id"] for row in rows if row.get("status") == 'Completed']
+        if ids:
+            transitions = [id for id, in db.session.query(Appointment.id)
+                           .filter(Appointment.id.in_(ids), func.coalesce(Appointment.status, '') != 'Completed').with_for_update()]
+            g.setdefault('eta_completed', set()).update(transitions)
+        return None
+
+    def completed(self, model, action, rows):
+        # Write listener for Appointment, see common.after_commit.
+        transitions = g.pop('eta_completed', set())
+        ids = [row["id"] for row in rows if row.get("id") in transitions]
+        if action != 'update' or not ids:
+            return
+        config = current_app.config
+        stats = self.stats()
+        now = datetime.now()
+        appointments = db.session.query(
+                Appointment.id, Appointment.service_type, Appointment.staff_id, Appointment.appointment_date,
+                db.func.max(Queue.served_at).label('served_at')) \
+            .outerjoin(Queue, Queue.appointment_id == Appointment.id) \
+            .filter(Appointment.id.in_(ids)) \
+            .group_by(Appointment.id, Appointment.service_type, Appointment.staff_id, Appointment.appointment_date)
+        recorded = 0
+        for row in appointments:
+            minutes = (now - (row.served_at or row.appointment_date)).total_seconds() / 60
+            if not 0 < minutes <= config['ETA_MAX_SAMPLE_MINUTES']:
+                continue
+            alpha = config['ETA_EWMA_ALPHA']
+            if row.staff_id is not None:
+                # Speed relative to the service mean with this sample folded
+                # in, so one slow car isn't counted against both means.
+                mean = stats.get(('service', row.service_type))
+                factor = minutes / (mean + alpha * (minutes - mean)) if mean else 1.0
+                record_sample('staff', str(row.staff_id), factor, alpha)
+            record_sample('service', row.service_type, minutes, alpha)
+            recorded += 1
+        if recorded:
+            self.bus().publish(STATS_NAME)
+
+    def table(self):
+        generations = (self.bus().generation(queueing.ORDER_NAME), self.bus().generation(STATS_NAME))
+        now = time.monotonic()
+        with self.lock:
+            entry = self.table_entry
+        if entry and entry[1] == generations and now - entry[0] < current_app.config['ETA_TABLE_TTL']:
+            return entry[2]
+        table = self.compute()
+        with self.lock:
+            self.table_entry = (now, generations, table)
+        return table
+
+    def compute(self):
+        stats = self.stats()
+        servers = current_app.config['ETA_SERVERS'] or len(scheduling.engine.qualified_staff()) or 1
+        rows = db.session.query(
+                Queue.id, Queue.status, Queue.served_at, Appointment.service_type, Appointment.staff_id) \
+            .outerjoin(Appointment, Appointment.id == Queue.appointment_id) \
+            .filter(Queue.status.in_((queueing.SERVING, queueing.WAITING))) \
+            .order_by(case([(Queue.status == queueing.SERVING, 0)], else_=1), Queue.sort_rank, Queue.id)
+        now = datetime.now()
+        ahead, entries = 0.0, []
+        for row in rows:
+            minutes = self.expected_minutes(row.service_type, row.staff_id, stats)
+            if row.status == queueing.SERVING:
+                elapsed = (now - row.served_at).total_seconds() / 60 if row.served_at else 0
+                ahead += max(minutes - elapsed, 0)
+                continue
+            entries.append({
+                "id"                : row.id,
+                "position"          : len(entries) + 1,
+                "wait_minutes"      : round(ahead / servers, 1),
+                "service_minutes"   : round(minutes, 1),
+            })
+            ahead += minutes
+        return {
+            "generated_at"  : now.isoformat(),
+            "servers"       : servers,
+            "entries"       : entries,
+            "by_id"         : {entry["id"]: entry for entry in entries},
+        }
+
+estimator = WaitEstimator()
+
+# Request helpers used by application/api.py
+def queue_eta(args):
+    table = estimator.table()
+    entries = table["entries"]
+    position = args.get('position', type=int)
+    if position is not None:
+        entries = entries[position - 1:position] if position > 0 else []
+    return jsonify({"generated_at": table["generated_at"], "servers": table["servers"], "data": entries})
+
+def entry_eta(id):
+    table = estimator.table()
+    entry = table["by_id"].get(id)
+    if entry is None:
+        return {"error": f"Queue entry {id} is not waiting"}, 404
+    return jsonify(dict(entry, generated_at=table["generated_at"], servers=table["servers"]))
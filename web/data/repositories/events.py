@@ -0,0 +1,274 @@
+from flask          import current_app, json, Response
+from werkzeug.utils import import_string
+from collections    import deque
+from threading      import Lock, Thread
+import os
+import queue
+import time
+import uuid
+
+# CHANGE EVENTS (Server-Sent Events)
+# Committed Queue / Appointment writes are published as deltas on a channel
+# named after the model ('queue', 'appointment'). The Broker fans each event
+# out to the streams subscribed in this worker; how events reach the broker is
+# up to the backend, which also numbers them. FileBackend (the default) appends
+# every event to one log file that all workers on the host tail, so each
+# worker sees every write and event ids (the event's offset in the log) mean
+# the same thing everywhere. LocalBackend delivers in-process only (single
+# worker, tests). Other backends (Redis pub/sub, Postgres LISTEN, ...)
+# implement the same methods and are selected with EVENTS_BACKEND.
+#
+# Event ids are "<epoch>-<sequence>". The epoch names the sequence: the log
+# file (a new one after rotation) or, for LocalBackend, the process. A
+# Last-Event-ID from another epoch can't be replayed and gets a 'reset'.
+#
+# Every subscriber has a bounded queue. A client that stops reading fills it
+# and is evicted instead of growing memory or holding up the publisher; it
+# reconnects with Last-Event-ID and catches up from the replay ring. Streams
+# also end after EVENTS_MAX_STREAM_SECONDS so no connection holds a worker
+# thread indefinitely.
+
+class LocalBackend:
+
+    def __init__(self, config=None):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.sequence = 0
+
+    def start(self, deliver):
+        self.deliver = deliver
+        return self.epoch, 0
+
+    def publish(self, channel, payload):
+        self.sequence += 1
+        self.deliver(channel, payload, self.epoch, self.sequence)
+
+class FileBackend:
+    """
+    Cross-worker backend for workers sharing a host. Publishing appends one
+    line to EVENTS_LOG_DIR/events.log under an exclusive flock; a thread in
+    every worker tails the file every EVENTS_POLL_SECONDS. The first line of
+    each log holds its random epoch; the log is rotated past
+    EVENTS_LOG_MAX_BYTES, which starts a new one. Needs flock, so POSIX
+    only; elsewhere EVENTS_BACKEND defaults to LocalBackend.
+    """
+    HEADER = '#epoch'
+
+    def __init__(self, config):
+        os.makedirs(config['EVENTS_LOG_DIR'], exist_ok=True)
+        self.path = os.path.join(config['EVENTS_LOG_DIR'], 'events.log')
+        self.poll = config['EVENTS_POLL_SECONDS']
+        self.max_bytes = config['EVENTS_LOG_MAX_BYTES']
+
+    def append(self, channel=None, payload=None):
+        # Returns the open, locked log (rotation-safe) after writing the
+        # header if it's new; with a channel, also writes the event.
+        import fcntl
+        while True:
+            handle = open(self.path, 'ab')
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(handle.fileno()).st_ino:
+                break
+            # Rotated while we waited for the lock.
+            handle.close()
+        with handle:
+            if handle.tell() == 0:
+                handle.write((json.dumps([self.HEADER, uuid.uuid4().hex[:12]]) + '\n').encode())
+            if channel is not None:
+                handle.write((json.dumps([channel, payload]) + '\n').encode())
+            handle.flush()
+            if handle.tell() > self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+
+    def open(self):
+        self.append()
+        self.handle = open(self.path, 'rb')
+        header = self.handle.readline()
+        self.offset = len(header)
+        self.epoch = json.loads(header)[1]
+
+    def start(self, deliver):
+        self.deliver = deliver
+        self.open()
+        # Only events published from now on; older ones are another worker's past.
+        self.offset = self.handle.seek(0, os.SEEK_END)
+        Thread(target=self.tail, name='events-tail', daemon=True).start()
+        return self.epoch, self.offset
+
+    def publish(self, channel, payload):
+        self.append(channel, payload)
+
+    def read(self):
+        self.handle.seek(self.offset)
+        for line in self.handle:
+            if not line.endswith(b'\n'):
+                break
+            self.offset += len(line)
+            channel, payload = json.loads(line)
+            self.deliver(channel, payload, self.epoch, self.offset)
+
+    def tail(self):
+        while True:
+            try:
+                self.read()
+                try:
+                    rotated = os.stat(self.path).st_ino != os.fstat(self.handle.fileno()).st_ino
+                except FileNotFoundError:
+                    rotated = True
+                if rotated:
+                    # Publishers hold the lock while rotating, so nothing more
+                    # lands in the old file once we've read it to the end.
+                    self.read()
+                    self.handle.close()
+                    self.open()
+            except Exception:
+                time.sleep(1)
+            time.sleep(self.poll)
+
+class Subscriber:
+
+    def __init__(self, channels, size):
+        self.channels = channels
+        self.queue = queue.Queue(size)
+        self.evicted = False
+
+class Broker:
+
+    def __init__(self, backend, queue_size=100, replay_size=1000, max_subscribers=500):
+        self.lock = Lock()
+        self.subscribers = set()
+        self.replay = deque(maxlen=replay_size)
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.counters = {"published": 0, "delivered": 0, "evicted": 0, "rejected": 0}
+        self.backend = backend
+        # Events after `floor` in this epoch are all in the replay ring.
+        self.epoch, self.floor = self.backend.start(self.deliver)
+        self.sequence = self.floor
+
+    def publish(self, channel, payload):
+        self.backend.publish(channel, json.dumps(payload))
+
+    def deliver(self, channel, data, epoch, sequence):
+        # Called by the backend for every event, in publish order.
+        with self.lock:
+            if epoch != self.epoch:
+                self.epoch, self.floor = epoch, 0
+                self.replay.clear()
+            if len(self.replay) == self.replay.maxlen:
+                self.floor = self.replay[0][0]
+            self.sequence = sequence
+            event = (sequence, channel, data)
+            self.replay.append(event)
+            self.counters["published"] += 1
+            for subscriber in list(self.subscribers):
+                if channel not in subscriber.channels:
+                    continue
+                try:
+                    subscriber.queue.put_nowait(event)
+                    self.counters["delivered"] += 1
+                except queue.Full:
+                    subscriber.evicted = True
+                    self.subscribers.discard(subscriber)
+                    self.counters["evicted"] += 1
+
+    def subscribe(self, channels, last_event_id=None):
+        # last_event_id is (epoch, sequence). Returns (subscriber, backlog);
+        # backlog is None when the id fell out of the replay ring or belongs
+        # to another epoch.
+        with self.lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                self.counters["rejected"] += 1
+                return None, None
+            subscriber = Subscriber(channels, self.queue_size)
+            self.subscribers.add(subscriber)
+            if last_event_id is None:
+                return subscriber, []
+            epoch, sequence = last_event_id
+            if epoch != self.epoch or not self.floor <= sequence <= self.sequence:
+                return subscriber, None
+            backlog = [event for event in self.replay if event[0] > sequence and event[1] in channels]
+            return subscriber, backlog
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, subscribers=len(self.subscribers), epoch=self.epoch, sequence=self.sequence)
+
+_broker = None
+
+def broker():
+    global _broker
+    if _broker is None:
+        config = current_app.config
+        _broker = Broker(
+            import_string(config['EVENTS_BACKEND'])(config),
+            queue_size=config['EVENTS_CLIENT_QUEUE_SIZE'],
+            replay_size=config['EVENTS_REPLAY_SIZE'],
+            max_subscribers=config['EVENTS_MAX_SUBSCRIBERS'],
+        )
+    return _broker
+
+def publish_change(model, action, rows):
+    # Write listener, see common.after_commit.
+    broker().publish(model.__name__.lower(), {"action": action, "rows": rows})
+
+def format_event(epoch, sequence, channel, data):
+    return f"id: {epoch}-{sequence}\nevent: {channel}\ndata: {data}\n\n"
+
+def parse_event_id(value):
+    epoch, _, sequence = value.rpartition('-')
+    return epoch, int(sequence)
+
+def stream(hub, subscriber, backlog, heartbeat, lifetime, retry):
+    # Runs after the request context is gone; everything it needs is passed in.
+    deadline = time.monotonic() + lifetime
+    try:
+        yield f"retry: {retry}\n\n"
+        if backlog is None:
+            # Missed events can't be replayed; the client re-fetches state.
+            yield format_event(hub.epoch, hub.sequence, 'reset', '{}')
+        for event in backlog or ():
+            yield format_event(hub.epoch, *event)
+        while not subscriber.evicted and time.monotonic() < deadline:
+            try:
+                event = subscriber.queue.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+            yield format_event(hub.epoch, *event)
+    finally:
+        hub.unsubscribe(subscriber)
+
+# Request helpers used by application/api.py
+def events(args, headers):
+    config = current_app.config
+    known = config['EVENTS_CHANNELS']
+    channels = set(filter(None, args.get('channels', ','.join(known)).split(',')))
+    unknown = channels - set(known)
+    if unknown or not channels:
+        return {"error": f"Unknown channels: {', '.join(sorted(unknown)) or '(none)'}; expected {', '.join(known)}"}, 400
+    last_event_id = headers.get('Last-Event-ID') or args.get('last_event_id')
+    try:
+        last_event_id = parse_event_id(last_event_id) if last_event_id else None
+    except ValueError:
+        return {"error": "Last-Event-ID must be an event id from this stream"}, 400
+    hub = broker()
+    subscriber, backlog = hub.subscribe(channels, last_event_id)
+    if subscriber is None:
+        return {"error": "Too many event streams, retry later"}, 503, {"Retry-After": "5"}
+    body = stream(hub, subscriber, backlog, config['EVENTS_HEARTBEAT_SECONDS'],
+                  config['EVENTS_MAX_STREAM_SECONDS'], config['EVENTS_RETRY_MS'])
+    return Response(body, mimetype='text/event-stream', headers={
+        "Cache-Control"     : "no-cache",
+        "X-Accel-Buffering" : "no",
+    })
+
+def stats():
+    return broker().stats()
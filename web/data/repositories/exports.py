@@ -0,0 +1,277 @@
+from data           import db
+from data.models    import Appointment, Payment, Staff, User, Vehicle
+from flask          import Response, current_app, json, jsonify, stream_with_context, url_for
+from sqlalchemy     import func, select
+from concurrent.futures import ThreadPoolExecutor
+from datetime       import date, datetime, timedelta
+from threading      import Lock
+import csv
+import io
+import os
+import re
+import time
+import uuid
+import xlsxwriter
+
+# EXPORTS
+# Exports run one Core select on their own connection with stream_results
+# (a server-side cursor on MySQL / PostgreSQL) and read it in
+# EXPORT_FETCH_SIZE batches, so only one batch is in memory at a time.
+# CSV is written batch by batch into a chunked response. XLSX is written with
+# XlsxWriter's constant_memory mode to a file (the format is a zip and can't
+# be sent before it is finished) and then streamed from disk.
+#
+# Exports above EXPORT_SYNC_MAX_ROWS rows (or with ?async=1) run as background
+# jobs on a small thread pool instead of holding the request: the response is
+# 202 with a status URL, and the finished file is served from EXPORT_DIR. Job
+# state lives next to the file as <job>.json, so any worker sharing the
+# directory can answer status and download requests.
+
+FORMATS     = {"csv": "text/csv", "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}
+XLSX_ROWS   = 1048576       # rows per worksheet, header included
+JOB_ID      = re.compile(r'^[0-9a-f]{32}$')
+
+def appointments_query(start, end, args):
+    appointments, users, vehicles, staff = Appointment.__table__, User.__table__, Vehicle.__table__, Staff.__table__
+    query = select([
+            appointments.c.id, appointments.c.appointment_date, appointments.c.status, appointments.c.payment_status,
+            appointments.c.service_type, users.c.name, users.c.email, users.c.phone, vehicles.c.plate_number,
+            staff.c.name, appointments.c.created_at]) \
+        .select_from(appointments
+            .join(users, users.c.id == appointments.c.user_id)
+            .outerjoin(vehicles, vehicles.c.id == appointments.c.vehicle_id)
+            .outerjoin(staff, staff.c.id == appointments.c.staff_id)) \
+        .where(appointments.c.appointment_date >= start) \
+        .where(appointments.c.appointment_date < end)
+    if args.get('status'):
+        query = query.where(appointments.c.status.in_(args['status'].split(',')))
+    return query.order_by(appointments.c.appointment_date, appointments.c.id)
+
+def payments_query(start, end, args):
+    payments, appointments, users = Payment.__table__, Appointment.__table__, User.__table__
+    query = select([
+            payments.c.id, payments.c.transaction_date, payments.c.amount, payments.c.payment_method,
+            payments.c.payment_status, payments.c.appointment_id, appointments.c.service_type,
+            users.c.name, users.c.email]) \
+        .select_from(payments
+            .outerjoin(appointments, appointments.c.id == payments.c.appointment_id)
+            .outerjoin(users, users.c.id == appointments.c.user_id)) \
+        .where(payments.c.transaction_date >= start) \
+        .where(payments.c.transaction_date < end)
+    if args.get('status'):
+        query = query.where(payments.c.payment_status.in_(args['status'].split(',')))
+    return query.order_by(payments.c.transaction_date, payments.c.id)
+
+EXPORTS = {
+    "appointments"  : (appointments_query, ["id", "appointment_date", "status", "payment_status", "service_type",
+                                            "customer", "email", "phone", "plate_number", "staff", "created_at"]),
+    "payments"      : (payments_query, ["id", "transaction_date", "amount", "payment_method", "payment_status",
+                                        "appointment_id", "service_type", "customer", "email"]),
+}
+
+def batches(statement, batch_size):
+    connection = db.engine.connect().execution_options(stream_results=True)
+    try:
+        result = connection.execute(statement)
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        connection.close()
+
+def csv_chunks(statement, columns, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches(statement, batch_size):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def write_xlsx(path, statement, columns, batch_size):
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory'       : True,
+        'tmpdir'                : os.path.dirname(path),
+        'default_date_format'   : 'yyyy-mm-dd hh:mm:ss',
+    })
+    bold = workbook.add_format({'bold': True})
+    sheet, row_number, written = None, XLSX_ROWS, 0
+    try:
+        for rows in batches(statement, batch_size):
+            for row in rows:
+                if row_number == XLSX_ROWS:
+                    sheet = workbook.add_worksheet(f"Sheet{len(workbook.worksheets()) + 1}")
+                    sheet.write_row(0, 0, columns, bold)
+                    row_number = 1
+                sheet.write_row(row_number, 0, row)
+                row_number += 1
+            written += len(rows)
+        if sheet is None:
+            workbook.add_worksheet().write_row(0, 0, columns, bold)
+    finally:
+        workbook.close()
+    return written
+
+def file_chunks(path, chunk_size=1 << 16, remove=False):
+    try:
+        with open(path, 'rb') as handle:
+            while True:
+                chunk = handle.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if remove:
+            os.remove(path)
+
+def attachment(chunks, filename, mimetype):
+    return Response(chunks, mimetype=mimetype, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+# BACKGROUND JOBS
+
+_pool = None
+_pool_lock = Lock()
+
+def pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(current_app.config['EXPORT_WORKERS'], thread_name_prefix='export')
+        return _pool
+
+def export_dir():
+    directory = current_app.config['EXPORT_DIR']
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def job_path(job_id, suffix):
+    return os.path.join(export_dir(), f"{job_id}.{suffix}")
+
+def save_job(job):
+    path = job_path(job["id"], 'json')
+    with open(path + '.tmp', 'w') as handle:
+        json.dump(job, handle)
+    os.replace(path + '.tmp', path)
+
+def load_job(job_id):
+    if not JOB_ID.match(job_id):
+        return None
+    try:
+        with open(job_path(job_id, 'json')) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+def remove_expired():
+    expired = time.time() - current_app.config['EXPORT_RETENTION']
+    for entry in os.scandir(export_dir()):
+        if entry.is_file() and entry.stat().st_mtime < expired:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+def run_job(app, job, statement, columns):
+    with app.app_context():
+        job.update(status='running', started_at=datetime.now().isoformat())
+        save_job(job)
+        path = job_path(job["id"], job["format"])
+        partial = path + '.part'
+        batch_size = app.config['EXPORT_FETCH_SIZE']
+        try:
+            if job["format"] == 'xlsx':
+                rows = write_xlsx(partial, statement, columns, batch_size)
+            else:
+                rows = 0
+                with open(partial, 'w', newline='') as handle:
+                    writer = csv.writer(handle)
+                    writer.writerow(columns)
+                    for batch in batches(statement, batch_size):
+                        writer.writerows(batch)
+                        rows += len(batch)
+            os.replace(partial, path)
+            job.update(status='done', rows=rows, size=os.path.getsize(path), finished_at=datetime.now().isoformat())
+        except Exception as e:
+            app.logger.exception("Export %s failed", job["id"])
+            if os.path.exists(partial):
+                os.remove(partial)
+            job.update(status='failed', error=f"{type(e).__name__}: {e}", finished_at=datetime.now().isoformat())
+        save_job(job)
+
+def job_response(job):
+    data = dict(job, status_url=url_for('export_job', job_id=job["id"]))
+    if job["status"] == 'done':
+        data["download_url"] = url_for('export_download', job_id=job["id"])
+    return data
+
+# Request helpers used by application/api.py
+def parse_range(args):
+    # Dates (YYYY-MM-DD, inclusive); no bounds by default.
+    try:
+        start = date.fromisoformat(args['from']) if args.get('from') else date.min
+        end = date.fromisoformat(args['to']) if args.get('to') else date.max - timedelta(days=1)
+    except ValueError:
+        return None, None
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+def export(name, args):
+    if name not in EXPORTS:
+        return {"error": f"Unknown export {name}; expected {', '.join(EXPORTS)}"}, 404
+    file_format = args.get('format', 'csv')
+    if file_format not in FORMATS:
+        return {"error": f"format must be one of {', '.join(FORMATS)}"}, 400
+    start, end = parse_range(args)
+    if start is None or end <= start:
+        return {"error": "from and to must be dates (YYYY-MM-DD), from <= to"}, 400
+    build, columns = EXPORTS[name]
+    statement = build(start, end, args)
+    config = current_app.config
+    filename = f"{name}-{datetime.now():%Y%m%d-%H%M%S}.{file_format}"
+
+    background = args.get('async') in ('1', 'true')
+    if not background:
+        rows = db.session.execute(select([func.count()]).select_from(statement.order_by(None).alias())).scalar()
+        background = rows > config['EXPORT_SYNC_MAX_ROWS']
+    if background:
+        remove_expired()
+        job = {
+            "id"            : uuid.uuid4().hex,
+            "export"        : name,
+            "format"        : file_format,
+            "filename"      : filename,
+            "status"        : 'queued',
+            "created_at"    : datetime.now().isoformat(),
+        }
+        save_job(job)
+        pool().submit(run_job, current_app._get_current_object(), dict(job), statement, columns)
+        return job_response(job), 202
+
+    if file_format == 'csv':
+        return attachment(stream_with_context(csv_chunks(statement, columns, config['EXPORT_FETCH_SIZE'])), filename, FORMATS['csv'])
+    path = os.path.join(export_dir(), f"{uuid.uuid4().hex}.xlsx")
+    write_xlsx(path, statement, columns, config['EXPORT_FETCH_SIZE'])
+    return attachment(file_chunks(path, remove=True), filename, FORMATS['xlsx'])
+
+def job_status(job_id):
+    job = load_job(job_id)
+    if job is None:
+        return {"error": f"Export job {job_id} not found"}, 404
+    return jsonify(job_response(job))
+
+def download(job_id):
+    job = load_job(job_id)
+    if job is None:
+        return {"error": f"Export job {job_id} not found"}, 404
+    if job["status"] != 'done':
+        return {"error": f"Export job {job_id} is {job['status']}"}, 409
+    path = job_path(job_id, job["format"])
+    if not os.path.exists(path):
+        return {"error": f"Export job {job_id} has expired"}, 410
+    response = attachment(file_chunks(path), job["filename"], FORMATS[job["format"]])
+    response.headers["Content-Length"] = str(os.path.getsize(path))
+    return response
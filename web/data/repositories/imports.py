@@ -0,0 +1,228 @@
+from data           import db
+from data.models    import User, Vehicle, Service
+from data.repositories import common
+from flask          import current_app, jsonify
+from sqlalchemy     import func
+from sqlalchemy.exc import SQLAlchemyError
+from itertools      import islice
+from openpyxl.utils.exceptions import InvalidFileException
+from zipfile        import BadZipFile
+import csv
+import io
+import openpyxl
+
+# IMPORTS
+# Uploaded CSV / XLSX files are read row by row (csv.DictReader on the upload
+# stream, openpyxl in read_only mode), validated and written in chunks of
+# ?chunk_size rows: one executemany INSERT per chunk (multi-row INSERTs with
+# mysqlclient) and one commit per chunk, so a failure loses at most the chunk
+# in flight. Rows whose natural key (User.email, Vehicle.plate_number,
+# Service.name; compared case-insensitively, like MySQL's default collation)
+# already exists are skipped. The response reports the last row read and
+# committed_row, the last row whose chunk has been committed (or reported as
+# failed); re-running the same file from ?start_row=committed_row + 1, or
+# from the top, resumes without inserting anything twice. Errors are
+# reported per row (1-based, header excluded) and never abort the import.
+#
+# Vehicles may name their owner by user_id, user_email or user_phone; email /
+# phone lookups come from one in-memory map of all users built per import.
+
+NATURAL_KEYS = {
+    User    : "email",
+    Vehicle : "plate_number",
+    Service : "name",
+}
+
+def csv_rows(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        yield row
+
+def xlsx_rows(stream):
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        for values in rows:
+            if any(value is not None for value in values):
+                yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+READERS = {
+    "csv"   : csv_rows,
+    "xlsx"  : xlsx_rows,
+}
+
+def natural_key(value):
+    return str(value).strip().lower() if value is not None else None
+
+def clean(row):
+    # Header names are case-insensitive; empty cells count as missing.
+    values = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        if value not in (None, ''):
+            values[key.strip().lower()] = value
+    return values
+
+class UserLookup:
+    """
+    email / phone -> user id, loaded once per import on first use.
+    """
+    def __init__(self):
+        self.by_email = None
+        self.by_phone = None
+
+    def load(self):
+        self.by_email, self.by_phone = {}, {}
+        for id, email, phone in db.session.query(User.id, User.email, User.phone):
+            self.by_email[email.lower()] = id
+            self.by_phone[phone] = id
+
+    def resolve(self, row):
+        if "user_id" in row or not {"user_email", "user_phone"} & set(row):
+            return
+        if self.by_email is None:
+            self.load()
+        email, phone = row.pop("user_email", None), row.pop("user_phone", None)
+        user_id = self.by_email.get(str(email).lower()) if email else self.by_phone.get(str(phone))
+        if user_id is None:
+            raise ValueError(f"No user with {'email ' + str(email) if email else 'phone ' + str(phone)}")
+        row["user_id"] = user_id
+
+class Importer:
+
+    def __init__(self, model, required_fields, chunk_size):
+        self.model = model
+        self.required_fields = required_fields
+        self.chunk_size = chunk_size
+        self.key = NATURAL_KEYS[model]
+        self.users = UserLookup()
+        self.counts = {"created": 0, "skipped": 0, "failed": 0}
+        self.errors = []
+        self.last_row = self.committed_row = 0
+
+    def fail(self, number, error):
+        self.counts["failed"] += 1
+        if len(self.errors) < current_app.config['IMPORT_MAX_ERRORS']:
+            self.errors.append({"row": number, "error": error})
+
+    def validate(self, row):
+        row = clean(row)
+        if self.model is Vehicle:
+            self.users.resolve(row)
+        validation_error = common.validate_fields(row, self.required_fields)
+        if validation_error:
+            raise ValueError(validation_error[0]["error"])
+        return row
+
+    def prepare(self, numbered):
+        # Column values for a chunk, passwords hashed together on the pool.
+        common.hash_passwords(self.model, [row for _, row in numbered])
+        prepared = []
+        for number, row in numbered:
+            try:
+                row = common.column_values(self.model, row)
+            except (TypeError, ValueError) as e:
+                self.fail(number, str(e))
+                continue
+            hook_error = common.run_hooks(self.model, 'before_create', row)
+            if hook_error:
+                self.fail(number, hook_error[0]["error"])
+                continue
+            prepared.append((number, row))
+        return prepared
+
+    def existing_keys(self, keys):
+        # keys are natural_key()s. MySQL's default collation ignores case
+        # already (and keeps the unique index usable); elsewhere compare lower().
+        column = getattr(self.model, self.key)
+        match = column.in_(keys) if db.engine.dialect.name == 'mysql' else func.lower(column).in_(keys)
+        return {natural_key(value) for value, in db.session.query(column).filter(match)}
+
+    def insert(self, rows):
+        hook_error = common.run_hooks(self.model, 'before_insert', rows)
+        if hook_error:
+            raise ValueError(hook_error[0]["error"])
+        for _, group in common.group_by_keys(rows):
+            db.session.execute(self.model.__table__.insert(), group)
+
+    def write(self, numbered):
+        # Already imported rows are dropped before any password is hashed.
+        existing = self.existing_keys({natural_key(row[self.key]) for _, row in numbered if self.key in row})
+        rows, seen = [], set()
+        for number, row in numbered:
+            key = natural_key(row.get(self.key))
+            if key in existing or key in seen:
+                self.counts["skipped"] += 1
+                continue
+            seen.add(key)
+            rows.append((number, row))
+        rows = self.prepare(rows)
+        if not rows:
+            return
+        try:
+            self.insert([row for _, row in rows])
+            db.session.commit()
+        except (SQLAlchemyError, ValueError):
+            # Something in the chunk conflicts (e.g. a duplicate phone); retry
+            # row by row so only the offending rows are reported.
+            db.session.rollback()
+            written = []
+            for number, row in rows:
+                try:
+                    self.insert([row])
+                    db.session.commit()
+                    written.append(row)
+                except (SQLAlchemyError, ValueError) as e:
+                    db.session.rollback()
+                    self.fail(number, str(getattr(e, 'orig', None) or e))
+            rows = [(None, row) for row in written]
+        self.counts["created"] += len(rows)
+        common.after_commit(self.model, 'create', [row for _, row in rows])
+
+    def run(self, records, start_row=1):
+        self.last_row = self.committed_row = start_row - 1
+        numbered = []
+        for number, record in enumerate(islice(records, start_row - 1, None), start_row):
+            self.last_row = number
+            try:
+                numbered.append((number, self.validate(record)))
+            except (TypeError, ValueError) as e:
+                self.fail(number, str(e))
+            if len(numbered) >= self.chunk_size:
+                self.write(numbered)
+                numbered = []
+                self.committed_row = number
+        if numbered:
+            self.write(numbered)
+        self.committed_row = self.last_row
+        db.session.rollback()
+
+# Request helpers used by application/api.py
+def import_records(model, upload, required_fields, args):
+    if model not in NATURAL_KEYS:
+        return {"error": f"{model.__name__} can't be imported"}, 404
+    if upload is None or not upload.filename:
+        return {"error": "Expected a CSV or XLSX file in the 'file' field"}, 400
+    file_format = args.get('format') or upload.filename.rsplit('.', 1)[-1].lower()
+    if file_format not in READERS:
+        return {"error": f"format must be one of {', '.join(READERS)}"}, 400
+    chunk_size = common.parse_chunk_size(args)
+    start_row = args.get('start_row', 1, type=int)
+    if chunk_size is None or start_row is None or start_row < 1:
+        return {"error": "chunk_size and start_row must be positive integers"}, 400
+    importer = Importer(model, required_fields, chunk_size)
+    try:
+        importer.run(READERS[file_format](upload.stream), start_row)
+    except (csv.Error, UnicodeDecodeError, OSError, BadZipFile, InvalidFileException) as e:
+        # Unreadable file; rows up to committed_row are committed.
+        db.session.rollback()
+        return jsonify(dict(importer.counts, error=f"Could not read file: {e}", last_row=importer.last_row,
+                            committed_row=importer.committed_row, errors=importer.errors)), 400
+    return jsonify(dict(importer.counts, last_row=importer.last_row, committed_row=importer.committed_row,
+                        errors=importer.errors))
@@ -0,0 +1,81 @@
+from data           import db
+from data.models    import Loyalty, LoyaltyBalance, User
+from data.repositories import common
+from flask          import jsonify
+from sqlalchemy     import func, literal, select
+from datetime       import datetime
+
+# LOYALTY BALANCES
+# Loyalty rows are a ledger; loyalty_balance holds each user's totals. Write
+# hooks turn every ledger insert / update / delete into per-user deltas and
+# apply them with one upsert per batch, inside the ledger write's own
+# transaction, so the two never disagree after a commit. reconcile() rebuilds
+# the whole table from the ledger with one grouped INSERT ... SELECT.
+
+def add_delta(deltas, user_id, earned, spent, entries):
+    total = deltas.setdefault(user_id, [0, 0, 0])
+    total[0] += earned or 0
+    total[1] += spent or 0
+    total[2] += entries
+
+def apply_deltas(deltas):
+    common.upsert_increment(LoyaltyBalance, ("user_id",), [
+        {"user_id": user_id, "points_earned": earned, "points_spent": spent, "entries": entries}
+        for user_id, (earned, spent, entries) in sorted(deltas.items())
+        if user_id is not None and (earned, spent, entries) != (0, 0, 0)
+    ])
+
+# Write hooks for Loyalty, see common.add_hook.
+def inserted(rows):
+    deltas = {}
+    for row in rows:
+        add_delta(deltas, row.get("user_id"), row.get("points_earned"), row.get("points_spent"), 1)
+    apply_deltas(deltas)
+
+def ledger_rows(ids):
+    # Locked until commit, so concurrent edits of the same entries serialize.
+    return db.session.query(Loyalty.id, Loyalty.user_id, Loyalty.points_earned, Loyalty.points_spent) \
+        .filter(Loyalty.id.in_(ids)).with_for_update()
+
+def updated(rows):
+    changes = {row["id"]: row for row in rows if {"user_id", "points_earned", "points_spent"} & set(row)}
+    if not changes:
+        return
+    deltas = {}
+    for old in ledger_rows(list(changes)):
+        new = changes[old.id]
+        add_delta(deltas, old.user_id, -(old.points_earned or 0), -(old.points_spent or 0), -1)
+        add_delta(deltas, new.get("user_id", old.user_id),
+                  new.get("points_earned", old.points_earned), new.get("points_spent", old.points_spent), 1)
+    apply_deltas(deltas)
+
+def deleted(ids):
+    deltas = {}
+    for old in ledger_rows(ids):
+        add_delta(deltas, old.user_id, -(old.points_earned or 0), -(old.points_spent or 0), -1)
+    apply_deltas(deltas)
+
+def reconcile():
+    ledger = Loyalty.__table__
+    totals = select([
+        ledger.c.user_id,
+        func.coalesce(func.sum(ledger.c.points_earned), 0),
+        func.coalesce(func.sum(ledger.c.points_spent), 0),
+        func.count(),
+        literal(datetime.now()),
+    ]).group_by(ledger.c.user_id)
+    balances = LoyaltyBalance.__table__
+    db.session.execute(balances.delete())
+    db.session.execute(balances.insert().from_select(
+        ["user_id", "points_earned", "points_spent", "entries", "updated_at"], totals))
+    db.session.commit()
+    return db.session.query(func.count(LoyaltyBalance.user_id)).scalar()
+
+# Request helpers used by application/api.py
+def balance(user_id):
+    record = LoyaltyBalance.query.get(user_id)
+    if record is not None:
+        return jsonify(record.to_dict())
+    if db.session.query(User.id).filter(User.id == user_id).first() is None:
+        return {"error": f"User {user_id} not found"}, 404
+    return jsonify({"user_id": user_id, "points_earned": 0, "points_spent": 0, "balance": 0, "entries": 0, "updated_at": None})
@@ -0,0 +1,274 @@
+from data           import db
+from data.models    import Notification, User
+from flask          import current_app
+from sqlalchemy     import bindparam
+from werkzeug.utils import import_string
+from abc            import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime       import datetime, timedelta
+from email.message  import EmailMessage
+from threading      import Event, Lock, Thread
+import random
+import smtplib
+import time
+
+# NOTIFICATION OUTBOX
+# Request handlers only insert Notification rows (delivery_status 'Pending'),
+# in the same transaction as the write that causes them.
+# OutboxWorker claims due rows in batches (SELECT ... FOR UPDATE SKIP LOCKED,
+# then one UPDATE to 'Sending'), sends them through the configured transport
+# on a bounded thread pool and records the outcome with one bulk UPDATE per
+# outcome. Failed sends are retried with exponential backoff until
+# NOTIFY_MAX_ATTEMPTS; rows left in 'Sending' by a crashed worker are put
+# back after NOTIFY_CLAIM_TIMEOUT seconds (or marked Failed once they are out
+# of attempts). Rows whose user has been deleted are marked Failed when claimed.
+#
+# NOTIFY_TRANSPORT has no production default: without it the worker refuses
+# to start rather than mark rows Sent that were never delivered. Under
+# TESTING it falls back to FakeTransport.
+
+PENDING     = 'Pending'
+SENDING     = 'Sending'
+SENT        = 'Sent'
+FAILED      = 'Failed'
+
+class TransportError(Exception):
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+class Transport(ABC):
+    """
+    Delivers one message dict (id, user_id, name, phone, email, message).
+    Raises TransportError; retryable=False marks the notification Failed
+    without further attempts.
+    """
+    def __init__(self, config):
+        self.config = config
+
+    @abstractmethod
+    def send(self, message):
+        pass
+
+class FakeTransport(Transport):
+    """
+    Local stand-in: keeps delivered messages in memory, with optional latency
+    and failure rate (NOTIFY_FAKE_LATENCY seconds, NOTIFY_FAKE_FAIL_RATE).
+    """
+    def __init__(self, config):
+        super().__init__(config)
+        self.lock = Lock()
+        self.sent = []
+
+    def send(self, message):
+        time.sleep(self.config.get('NOTIFY_FAKE_LATENCY', 0))
+        if random.random() < self.config.get('NOTIFY_FAKE_FAIL_RATE', 0):
+            raise TransportError("Fake transport failure")
+        with self.lock:
+            self.sent.append(message)
+
+class TwilioSMSTransport(Transport):
+
+    def __init__(self, config):
+        super().__init__(config)
+        from twilio.rest import Client
+        self.client = Client(config['TWILIO_ACCOUNT_SID'], config['TWILIO_AUTH_TOKEN'])
+
+    def send(self, message):
+        from twilio.base.exceptions import TwilioRestException
+        if not message["phone"]:
+            raise TransportError("User has no phone number", retryable=False)
+        try:
+            self.client.messages.create(to=message["phone"], from_=self.config['TWILIO_FROM_NUMBER'], body=message["message"])
+        except TwilioRestException as e:
+            # 4xx other than rate limiting won't succeed on retry.
+            raise TransportError(str(e), retryable=e.status == 429 or e.status >= 500)
+
+class SMTPTransport(Transport):
+
+    def send(self, message):
+        if not message["email"]:
+            raise TransportError("User has no email address", retryable=False)
+        email = EmailMessage()
+        email['From'] = self.config['SMTP_FROM']
+        email['To'] = message["email"]
+        email['Subject'] = self.config['SMTP_SUBJECT']
+        email.set_content(message["message"])
+        try:
+            with smtplib.SMTP(self.config['SMTP_HOST'], self.config['SMTP_PORT'], timeout=self.config['NOTIFY_SEND_TIMEOUT']) as smtp:
+                if self.config['SMTP_USE_TLS']:
+                    smtp.starttls()
+                if self.config['SMTP_USERNAME']:
+                    smtp.login(self.config['SMTP_USERNAME'], self.config['SMTP_PASSWORD'])
+                smtp.send_message(email)
+        except smtplib.SMTPRecipientsRefused as e:
+            raise TransportError(str(e), retryable=False)
+        except (smtplib.SMTPException, OSError) as e:
+            raise TransportError(str(e))
+
+def load_transport(config):
+    name = config['NOTIFY_TRANSPORT']
+    if not name:
+        if not config['TESTING']:
+            raise RuntimeError("NOTIFY_TRANSPORT is not set (e.g. data.repositories.outbox.SMTPTransport)")
+        name = 'data.repositories.outbox.FakeTransport'
+    return import_string(name)(config)
+
+def backoff(attempts, base, cap):
+    # Exponential with full jitter: 0 .. min(cap, base * 2^(attempts - 1)) seconds.
+    return random.uniform(0, min(cap, base * 2 ** (attempts - 1)))
+
+class OutboxWorker:
+
+    def __init__(self, app, transport=None):
+        self.app = app
+        self.config = app.config
+        self.transport = transport or load_transport(self.config)
+        self.pool = ThreadPoolExecutor(self.config['NOTIFY_CONCURRENCY'], thread_name_prefix='outbox-send')
+        self.stopping = Event()
+        self.counters = {"claimed": 0, "sent": 0, "retried": 0, "failed": 0, "reclaimed": 0}
+
+    def reclaim(self):
+        # Claims older than NOTIFY_CLAIM_TIMEOUT belong to a worker that died mid-batch.
+        expired = datetime.now() - timedelta(seconds=self.config['NOTIFY_CLAIM_TIMEOUT'])
+        stale = Notification.query.filter(Notification.delivery_status == SENDING, Notification.claimed_at < expired)
+        failed = stale.filter(Notification.attempts >= self.config['NOTIFY_MAX_ATTEMPTS']) \
+            .update({Notification.delivery_status: FAILED, Notification.last_error: "Claim expired, no attempts left"}, synchronize_session=False)
+        reclaimed = stale.filter(Notification.attempts < self.config['NOTIFY_MAX_ATTEMPTS']) \
+            .update({Notification.delivery_status: PENDING, Notification.next_attempt_at: datetime.now()}, synchronize_session=False)
+        db.session.commit()
+        self.counters["reclaimed"] += reclaimed
+        self.counters["failed"] += failed
+        return reclaimed
+
+    def claim(self):
+        now = datetime.now()
+        ids = [row.id for row in db.session.query(Notification.id)
+               .filter(Notification.delivery_status == PENDING, Notification.next_attempt_at <= now)
+               .order_by(Notification.next_attempt_at)
+               .limit(self.config['NOTIFY_BATCH_SIZE'])
+               .with_for_update(skip_locked=self.config['NOTIFY_SKIP_LOCKED'])]
+        if not ids:
+            db.session.rollback()
+            return []
+        Notification.query.filter(Notification.id.in_(ids)).update({
+            Notification.delivery_status: SENDING,
+            Notification.claimed_at     : now,
+            Notification.attempts       : Notification.attempts + 1,
+        }, synchronize_session=False)
+        db.session.commit()
+        rows = db.session.query(
+                Notification.id, Notification.user_id, Notification.message, Notification.attempts,
+                User.id.label('recipient'), User.name, User.phone, User.email) \
+            .outerjoin(User, User.id == Notification.user_id) \
+            .filter(Notification.id.in_(ids)).all()
+        orphans = [row.id for row in rows if row.recipient is None]
+        if orphans:
+            # The user was deleted; there is nobody to deliver to.
+            Notification.query.filter(Notification.id.in_(orphans)) \
+                .update({Notification.delivery_status: FAILED, Notification.last_error: "User not found"}, synchronize_session=False)
+            db.session.commit()
+            self.counters["failed"] += len(orphans)
+        batch = [row._asdict() for row in rows if row.recipient is not None]
+        for message in batch:
+            del message["recipient"]
+        db.session.rollback()
+        self.counters["claimed"] += len(batch)
+        return batch
+
+    def attempt(self, message):
+        try:
+            self.transport.send(message)
+            return message, None
+        except TransportError as e:
+            return message, e
+        except Exception as e:
+            return message, TransportError(f"{type(e).__name__}: {e}")
+
+    def record(self, results):
+        now = datetime.now()
+        sent = [message["id"] for message, error in results if error is None]
+        retry, failed = [], []
+        for message, error in results:
+            if error is None:
+                continue
+            if error.retryable and message["attempts"] < self.config['NOTIFY_MAX_ATTEMPTS']:
+                delay = backoff(message["attempts"], self.config['NOTIFY_BACKOFF_BASE'], self.config['NOTIFY_BACKOFF_MAX'])
+                retry.append({"b_id": message["id"], "b_next_attempt_at": now + timedelta(seconds=delay), "b_last_error": str(error)[:255]})
+            else:
+                failed.append({"b_id": message["id"], "b_last_error": str(error)[:255]})
+        table = Notification.__table__
+        if sent:
+            Notification.query.filter(Notification.id.in_(sent)) \
+                .update({Notification.delivery_status: SENT, Notification.sent_at: now, Notification.last_error: None}, synchronize_session=False)
+        if retry:
+            db.session.execute(table.update().where(table.c.id == bindparam('b_id')).values(
+                delivery_status=PENDING, next_attempt_at=bindparam('b_next_attempt_at'), last_error=bindparam('b_last_error')), retry)
+        if failed:
+            db.session.execute(table.update().where(table.c.id == bindparam('b_id')).values(
+                delivery_status=FAILED, last_error=bindparam('b_last_error')), failed)
+        db.session.commit()
+        self.counters["sent"] += len(sent)
+        self.counters["retried"] += len(retry)
+        self.counters["failed"] += len(failed)
+
+    def run_once(self):
+        # One batch; returns the number of notifications handled.
+        with self.app.app_context():
+            batch = self.claim()
+            if batch:
+                self.record(list(self.pool.map(self.attempt, batch)))
+            return len(batch)
+
+    def run(self):
+        next_reclaim = 0
+        while not self.stopping.is_set():
+            try:
+                if time.monotonic() >= next_reclaim:
+                    with self.app.app_context():
+                        self.reclaim()
+                    next_reclaim = time.monotonic() + self.config['NOTIFY_CLAIM_TIMEOUT']
+                if not self.run_once():
+                    self.stopping.wait(self.config['NOTIFY_POLL_INTERVAL'])
+            except Exception:
+                self.app.logger.exception("Outbox batch failed")
+                self.stopping.wait(self.config['NOTIFY_POLL_INTERVAL'])
+
+    def start(self):
+        thread = Thread(target=self.run, name='outbox-worker', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.stopping.set()
+        self.pool.shutdown(wait=True)
+
+# before_insert hook for Appointment, see common.add_hook. Bookings only
+# queue a notification row, committed (or rolled back) together with the
+# appointment; delivery happens in the worker.
+def booking_notifications(rows):
+    if not current_app.config['NOTIFY_ON_BOOKING']:
+        return None
+    template = current_app.config['NOTIFY_BOOKING_MESSAGE']
+    now = datetime.now()
+    notifications = [
+        {
+            "user_id"           : row["user_id"],
+            "message"           : template.format(**row)[:255],
+            "status"            : 'Unread',
+            "delivery_status"   : PENDING,
+            "attempts"          : 0,
+            "next_attempt_at"   : now,
+            "created_at"        : now,
+            "updated_at"        : now,
+        }
+        for row in rows if row.get("user_id") is not None and row.get("status", 'Pending') != 'Cancelled'
+    ]
+    if notifications:
+        db.session.execute(Notification.__table__.insert(), notifications)
+    return None
+
+def stats():
+    counts = dict(db.session.query(Notification.delivery_status, db.func.count(Notification.id)).group_by(Notification.delivery_status))
+    return {"delivery_status": counts}
@@ -0,0 +1,59 @@
+from data           import login_manager
+from data.models    import User
+from data.repositories import common
+from flask          import current_app
+from flask_login    import UserMixin
+
+# USER PRINCIPALS
+# Flask-Login's user loader runs on every request that touches current_user.
+# Instead of a User row it returns a UserPrincipal, an immutable snapshot of
+# id, role and name, cached per process in the read-through cache under
+# 'principals' (PRINCIPAL_CACHE_TTL seconds, PRINCIPAL_CACHE_ENTRIES most
+# recent). Any User update or delete invalidates the name on every worker;
+# unknown ids are not cached. Views that need more than id / role / name load
+# the User row themselves.
+
+NAME = 'principals'
+
+class UserNotFound(Exception):
+    pass
+
+class UserPrincipal(UserMixin):
+
+    __slots__ = ('id', 'role', 'name')
+
+    def __init__(self, id, role, name):
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'role', role)
+        object.__setattr__(self, 'name', name)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"UserPrincipal(id={self.id!r}, role={self.role!r}, name={self.name!r})"
+
+def principal(id):
+    def load():
+        row = User.query.with_entities(User.id, User.role, User.name).filter(User.id == id).first()
+        if row is None:
+            raise UserNotFound()
+        return UserPrincipal(row.id, row.role, row.name)
+    try:
+        return common.read_cache().get(NAME, id, load,
+                                       ttl=current_app.config['PRINCIPAL_CACHE_TTL'],
+                                       max_entries=current_app.config['PRINCIPAL_CACHE_ENTRIES'])
+    except UserNotFound:
+        return None
+
+@login_manager.user_loader
+def load_user(id):
+    try:
+        return principal(int(id))
+    except (TypeError, ValueError):
+        return None
+
+# Write listener for User, see common.after_commit.
+def changed(model, action, rows):
+    if action in ('update', 'delete'):
+        common.read_cache().invalidate(NAME)
@@ -0,0 +1,269 @@
+from data           import db
+from data.models    import Appointment, Queue
+from data.repositories import common
+from flask          import current_app, g, jsonify
+from sqlalchemy     import bindparam, case, func
+from bisect         import bisect_left
+from datetime       import datetime
+from threading      import Lock
+import time
+
+# QUEUE ORDER
+# The line is ordered by (sort_rank, id) over 'Waiting' rows. Ranks are sparse
+# (RANK_STEP apart when appended), so moving a car writes one row: its new
+# rank is the midpoint of its new neighbours. Only when two neighbours have
+# no integer left between them is the line renumbered, in one executemany.
+#
+# Every write is a single conditional statement, so concurrent workers never
+# need a shared lock for enqueue / serve / cancel: ties on rank are broken by
+# id, and "serve next" claims the head with UPDATE ... WHERE status='Waiting'
+# and retries when another worker got there first. Moves and renumbering lock
+# the rows they read (SELECT ... FOR UPDATE).
+#
+# Each worker keeps the waiting line in memory (QueueOrder) for O(log n)
+# position lookups. Committed Queue writes bump the 'queue-order' generation
+# on the cache invalidation bus, which makes every worker reload it. Without
+# a shared bus other workers' writes would go unnoticed, so the line is then
+# reloaded on every call.
+
+RANK_STEP   = 1 << 20
+WAITING     = 'Waiting'
+SERVING     = 'Serving'
+DONE        = 'Done'
+CANCELLED   = 'Cancelled'
+ORDER_NAME  = 'queue-order'
+
+class QueueOrder:
+
+    def __init__(self, keys=()):
+        self.keys = sorted(keys)
+        self.by_id = {id: (rank, id) for rank, id in self.keys}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def position(self, id):
+        key = self.by_id.get(id)
+        if key is None:
+            return None
+        return bisect_left(self.keys, key) + 1
+
+def rank_between(previous, following):
+    if previous is None and following is None:
+        return RANK_STEP
+    if previous is None:
+        return following - RANK_STEP
+    if following is None:
+        return previous + RANK_STEP
+    if following - previous >= 2:
+        return (previous + following) // 2
+    return None
+
+class QueueEngine:
+
+    def __init__(self):
+        self.lock = Lock()
+        self.entry = None
+
+    def bus(self):
+        return common.read_cache().bus
+
+    def order(self):
+        # The generation is read before loading, so a write committed while
+        # loading shows up as a newer generation on the next call.
+        generation = self.bus().generation(ORDER_NAME)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entry
+        if entry and entry[1] == generation and now - entry[0] < current_app.config['QUEUE_ORDER_TTL'] and self.bus().shared:
+            return entry[2]
+        rows = db.session.query(Queue.sort_rank, Queue.id).filter(Queue.status == WAITING)
+        order = QueueOrder((row.sort_rank, row.id) for row in rows)
+        with self.lock:
+            self.entry = (now, generation, order)
+        return order
+
+    def changed(self, model, action, rows):
+        # Write listener for Queue, see common.after_commit.
+        self.bus().publish(ORDER_NAME)
+        with self.lock:
+            self.entry = None
+
+    def tail(self):
+        # Highest rank and length of the line; one range read on ix_queue_status_sort_rank.
+        rank, count = db.session.query(func.max(Queue.sort_rank), func.count(Queue.id)) \
+            .filter(Queue.status == WAITING).one()
+        return rank or 0, count
+
+    def assign_rank(self, data):
+        # before_create hook: new entries join the back of the line. Later
+        # items of the same (bulk) request queue up behind this one.
+        if data.setdefault('status', WAITING) != WAITING:
+            data.setdefault('position', 0)
+            return None
+        rank, count = g.get('queue_tail') or self.tail()
+        g.queue_tail = (rank + RANK_STEP, count + 1)
+        data['sort_rank'], data['position'] = g.queue_tail
+        return None
+
+    def enqueue(self, appointment_id):
+        if db.session.query(Appointment.id).filter(Appointment.id == appointment_id).first() is None:
+            return {"error": f"Appointment {appointment_id} not found"}, 404
+        active = db.session.query(Queue.id) \
+            .filter(Queue.appointment_id == appointment_id, Queue.status.in_((WAITING, SERVING))).first()
+        if active is not None:
+            return {"error": f"Appointment {appointment_id} is already queued as {active.id}"}, 409
+        data = {"appointment_id": appointment_id}
+        self.assign_rank(data)
+        record = Queue(**data)
+        db.session.add(record)
+        db.session.commit()
+        common.after_commit(Queue, 'create', [dict(data, id=record.id)])
+        return {"id": record.id, "appointment_id": appointment_id, "position": data['position']}
+
+    def serve_next(self):
+        for _ in range(current_app.config['QUEUE_DEQUEUE_RETRIES']):
+            head = db.session.query(Queue.id, Queue.appointment_id).filter(Queue.status == WAITING) \
+                .order_by(Queue.sort_rank, Queue.id).first()
+            if head is None:
+                db.session.rollback()
+                return {"error": "Queue is empty"}, 404
+            served_at = datetime.now()
+            claimed = Queue.query.filter(Queue.id == head.id, Queue.status == WAITING) \
+                .update({Queue.status: SERVING, Queue.served_at: served_at}, synchronize_session=False)
+            # Ends the transaction either way, so a retry reads a fresh snapshot.
+            db.session.commit()
+            if claimed:
+                common.after_commit(Queue, 'update', [{"id": head.id, "status": SERVING, "served_at": served_at}])
+                return {"id": head.id, "appointment_id": head.appointment_id, "status": SERVING}
+        return {"error": "Queue is busy, try again"}, 409
+
+    def transition(self, id, status, allowed):
+        if Queue.query.filter(Queue.id == id, Queue.status.in_(allowed)).update({Queue.status: status}, synchronize_session=False):
+            db.session.commit()
+            common.after_commit(Queue, 'update', [{"id": id, "status": status}])
+            return {"id": id, "status": status}
+        db.session.rollback()
+        current = db.session.query(Queue.status).filter(Queue.id == id).first()
+        if current is None:
+            return {"error": f"Queue entry {id} not found"}, 404
+        return {"error": f"Queue entry {id} is {current.status}, expected {' or '.join(allowed)}"}, 409
+
+    def neighbours(self, id, position):
+        # Ranks of the entries that end up before and after `id` at `position`.
+        rows = db.session.query(Queue.sort_rank).filter(Queue.status == WAITING, Queue.id != id) \
+            .order_by(Queue.sort_rank, Queue.id) \
+            .offset(max(position - 2, 0)).limit(1 if position == 1 else 2) \
+            .with_for_update().all()
+        if position == 1:
+            return None, rows[0].sort_rank if rows else None
+        if not rows:
+            # Past the end of the line.
+            rank, count = self.tail()
+            return (rank if count > 1 else None), None
+        return rows[0].sort_rank, rows[1].sort_rank if len(rows) > 1 else None
+
+    def renumber(self):
+        # Keeps the current highest rank, so entries appended concurrently
+        # with the old tail still sort behind everyone.
+        ids = [row.id for row in db.session.query(Queue.id).filter(Queue.status == WAITING)
+               .order_by(Queue.sort_rank, Queue.id).with_for_update()]
+        top, _ = self.tail()
+        table = Queue.__table__
+        # Nobody's place in line changes, so the entries keep their version.
+        statement = table.update().where(table.c.id == bindparam('b_id')) \
+            .values(sort_rank=bindparam('b_sort_rank'), version=table.c.version)
+        db.session.execute(statement, [
+            {"b_id": id, "b_sort_rank": top - (len(ids) - 1 - index) * RANK_STEP}
+            for index, id in enumerate(ids)
+        ])
+
+    def move(self, id, position):
+        entry = db.session.query(Queue.id).filter(Queue.id == id, Queue.status == WAITING).with_for_update().first()
+        if entry is None:
+            db.session.rollback()
+            return {"error": f"Queue entry {id} is not waiting"}, 404
+        rank = rank_between(*self.neighbours(id, position))
+        if rank is None:
+            self.renumber()
+            rank = rank_between(*self.neighbours(id, position))
+        Queue.query.filter(Queue.id == id).update({Queue.sort_rank: rank}, synchronize_session=False)
+        db.session.commit()
+        common.after_commit(Queue, 'update', [{"id": id, "sort_rank": rank}])
+        return {"id": id, "position": self.order().position(id)}
+
+    def position(self, id):
+        order = self.order()
+        position = order.position(id)
+        if position is not None:
+            return {"id": id, "status": WAITING, "position": position, "waiting": len(order)}
+        current = db.session.query(Queue.status).filter(Queue.id == id).first()
+        if current is None:
+            return {"error": f"Queue entry {id} not found"}, 404
+        return {"id": id, "status": current.status, "position": None, "waiting": len(order)}
+
+    def current(self, limit):
+        # Serving entries first, then the waiting line; one query.
+        rows = db.session.query(
+                Queue.id, Queue.appointment_id, Queue.status, Queue.created_at,
+                Appointment.user_id, Appointment.vehicle_id, Appointment.staff_id,
+                Appointment.service_type, Appointment.appointment_date) \
+            .outerjoin(Appointment, Appointment.id == Queue.appointment_id) \
+            .filter(Queue.status.in_((SERVING, WAITING))) \
+            .order_by(case([(Queue.status == SERVING, 0)], else_=1), Queue.sort_rank, Queue.id) \
+            .limit(limit)
+        entries, position = [], 0
+        for row in rows:
+            if row.status == WAITING:
+                position += 1
+            entries.append({
+                "id"                : row.id,
+                "appointment_id"    : row.appointment_id,
+                "status"            : row.status,
+                "position"          : position if row.status == WAITING else None,
+                "user_id"           : row.user_id,
+                "vehicle_id"        : row.vehicle_id,
+                "staff_id"          : row.staff_id,
+                "service_type"      : row.service_type,
+                "appointment_date"  : row.appointment_date.isoformat() if row.appointment_date else None,
+                "queued_at"         : row.created_at.isoformat(),
+            })
+        return entries
+
+engine = QueueEngine()
+
+# Request helpers used by application/api.py
+def current(args):
+    limit = args.get('limit', current_app.config['API_MAX_PAGE_SIZE'], type=int)
+    if limit < 1:
+        return {"error": "limit must be a positive integer"}, 400
+    return jsonify({"data": engine.current(min(limit, current_app.config['API_MAX_PAGE_SIZE']))})
+
+def enqueue(data):
+    if not isinstance(data, dict) or not isinstance(data.get('appointment_id'), int):
+        return {"error": "appointment_id is required"}, 400
+    result = engine.enqueue(data['appointment_id'])
+    return result if isinstance(result, tuple) else (jsonify(result), 201)
+
+def serve_next():
+    result = engine.serve_next()
+    return result if isinstance(result, tuple) else jsonify(result)
+
+def move(id, data):
+    position = data.get('position') if isinstance(data, dict) else None
+    if not isinstance(position, int) or position < 1:
+        return {"error": "position (1-based integer) is required"}, 400
+    result = engine.move(id, position)
+    return result if isinstance(result, tuple) else jsonify(result)
+
+def cancel(id):
+    result = engine.transition(id, CANCELLED, (WAITING, SERVING))
+    return result if isinstance(result, tuple) else jsonify(result)
+
+def done(id):
+    result = engine.transition(id, DONE, (SERVING,))
+    return result if isinstance(result, tuple) else jsonify(result)
+
+def position(id):
+    result = engine.position(id)
+    return result if isinstance(result, tuple) else jsonify(result)
@@ -0,0 +1,160 @@
+from data           import db
+from data.models    import Appointment, Feedback, FeedbackAggregate
+from data.repositories import common
+from flask          import jsonify
+from sqlalchemy     import case, func, literal, select
+from datetime       import date, datetime, timedelta
+
+# RATING AGGREGATES
+# feedback_aggregate keeps, per (day, staff, service type), the number of
+# ratings, their sum and a 1-5 histogram. Feedback write hooks apply +/- deltas
+# with one upsert per batch inside the feedback write's transaction; range
+# queries add the day buckets up in SQL. A rating is attributed to its
+# appointment's staff and service type at the time it is written;
+# `flask feedback-backfill` rebuilds buckets from the Feedback table.
+
+RATINGS     = (1, 2, 3, 4, 5)
+KEYS        = ("bucket_date", "staff_id", "service_type")
+GROUPS      = {"day": "bucket_date", "staff": "staff_id", "service": "service_type"}
+
+def add_delta(deltas, key, rating, sign):
+    counts = deltas.setdefault(key, dict({"count": 0, "total": 0}, **{f"r{r}": 0 for r in RATINGS}))
+    counts["count"] += sign
+    counts["total"] += sign * rating
+    counts[f"r{rating}"] += sign
+
+def apply_deltas(deltas):
+    common.upsert_increment(FeedbackAggregate, KEYS, [
+        dict(zip(KEYS, key), **counts) for key, counts in sorted(deltas.items()) if any(counts.values())
+    ])
+
+def rating_error(rows):
+    for row in rows:
+        if "rating" in row and row["rating"] not in RATINGS:
+            return {"error": f"rating must be one of {', '.join(map(str, RATINGS))}"}, 400
+    return None
+
+def appointment_keys(ids):
+    rows = db.session.query(Appointment.id, Appointment.staff_id, Appointment.service_type) \
+        .filter(Appointment.id.in_([id for id in ids if id is not None]))
+    return {row.id: (row.staff_id, row.service_type) for row in rows}
+
+# Write hooks for Feedback, see common.add_hook.
+def validate(row):
+    return rating_error([row])
+
+def inserted(rows):
+    appointments = appointment_keys({row.get("appointment_id") for row in rows})
+    now = datetime.now()
+    deltas = {}
+    for row in rows:
+        target = appointments.get(row.get("appointment_id"))
+        if target is not None and row.get("rating") in RATINGS:
+            add_delta(deltas, ((row.get("created_at") or now).date(),) + target, row["rating"], 1)
+    apply_deltas(deltas)
+
+def feedback_rows(ids):
+    # Locked until commit, so concurrent edits of the same feedback serialize.
+    return db.session.query(
+            Feedback.id, Feedback.rating, Feedback.created_at, Feedback.appointment_id,
+            Appointment.staff_id, Appointment.service_type) \
+        .join(Appointment, Appointment.id == Feedback.appointment_id) \
+        .filter(Feedback.id.in_(ids)).with_for_update()
+
+def updated(rows):
+    error = rating_error(rows)
+    if error:
+        return error
+    changes = {row["id"]: row for row in rows if {"rating", "appointment_id", "created_at"} & set(row)}
+    if not changes:
+        return None
+    appointments = appointment_keys({row["appointment_id"] for row in changes.values() if "appointment_id" in row})
+    deltas = {}
+    for old in feedback_rows(list(changes)):
+        new = changes[old.id]
+        if old.rating in RATINGS:
+            add_delta(deltas, (old.created_at.date(), old.staff_id, old.service_type), old.rating, -1)
+        target = appointments.get(new["appointment_id"]) if "appointment_id" in new else (old.staff_id, old.service_type)
+        rating = new.get("rating", old.rating)
+        if target is not None and rating in RATINGS:
+            add_delta(deltas, (new.get("created_at", old.created_at).date(),) + target, rating, 1)
+    apply_deltas(deltas)
+    return None
+
+def deleted(ids):
+    deltas = {}
+    for old in feedback_rows(ids):
+        if old.rating in RATINGS:
+            add_delta(deltas, (old.created_at.date(), old.staff_id, old.service_type), old.rating, -1)
+    apply_deltas(deltas)
+
+def backfill(start=None, end=None):
+    # Rebuilds the buckets for [start, end] (dates, inclusive; all when None)
+    # with one grouped INSERT ... SELECT.
+    feedback, appointment = Feedback.__table__, Appointment.__table__
+    day = func.date(feedback.c.created_at)
+    totals = select(
+        [day, appointment.c.staff_id, appointment.c.service_type, func.count(), func.sum(feedback.c.rating)] +
+        [func.sum(case([(feedback.c.rating == rating, 1)], else_=0)) for rating in RATINGS] +
+        [literal(datetime.now())]
+    ).select_from(feedback.join(appointment, appointment.c.id == feedback.c.appointment_id)) \
+     .where(feedback.c.rating.in_(RATINGS)) \
+     .group_by(day, appointment.c.staff_id, appointment.c.service_type)
+    buckets = FeedbackAggregate.__table__
+    clear = buckets.delete()
+    if start is not None:
+        totals = totals.where(feedback.c.created_at >= datetime.combine(start, datetime.min.time()))
+        clear = clear.where(buckets.c.bucket_date >= start)
+    if end is not None:
+        totals = totals.where(feedback.c.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        clear = clear.where(buckets.c.bucket_date <= end)
+    db.session.execute(clear)
+    db.session.execute(buckets.insert().from_select(
+        list(KEYS) + ["count", "total"] + [f"r{rating}" for rating in RATINGS] + ["updated_at"], totals))
+    db.session.commit()
+    return db.session.query(func.count()).select_from(FeedbackAggregate).scalar()
+
+# Request helpers used by application/api.py
+def parse_date(args, key, default):
+    try:
+        return date.fromisoformat(args[key]) if args.get(key) else default
+    except ValueError:
+        return None
+
+def rating_stats(args):
+    end = parse_date(args, 'to', date.today())
+    start = parse_date(args, 'from', end - timedelta(days=29) if end else None)
+    if start is None or end is None or end < start:
+        return {"error": "from and to must be dates (YYYY-MM-DD), from <= to"}, 400
+    group_by = [group for group in args.get('group_by', '').split(',') if group]
+    unknown = [group for group in group_by if group not in GROUPS]
+    if unknown:
+        return {"error": f"Unknown group_by: {', '.join(unknown)}; expected {', '.join(GROUPS)}"}, 400
+    columns = [getattr(FeedbackAggregate, GROUPS[group]) for group in group_by]
+    query = db.session.query(
+            *columns,
+            func.sum(FeedbackAggregate.count).label('count'),
+            func.sum(FeedbackAggregate.total).label('total'),
+            *[func.sum(getattr(FeedbackAggregate, f"r{rating}")).label(f"r{rating}") for rating in RATINGS]) \
+        .filter(FeedbackAggregate.bucket_date >= start, FeedbackAggregate.bucket_date <= end)
+    staff_id = args.get('staff_id', type=int)
+    if staff_id is not None:
+        query = query.filter(FeedbackAggregate.staff_id == staff_id)
+    if args.get('service_type'):
+        query = query.filter(FeedbackAggregate.service_type == args['service_type'])
+    if columns:
+        query = query.group_by(*columns).order_by(*columns)
+    data = []
+    for row in query:
+        # SUM() comes back as Decimal on MySQL.
+        count = int(row.count or 0)
+        entry = {GROUPS[group]: getattr(row, GROUPS[group]) for group in group_by}
+        if 'bucket_date' in entry:
+            entry['bucket_date'] = entry['bucket_date'].isoformat()
+        entry.update({
+            "count"         : count,
+            "average"       : round(float(row.total) / count, 2) if count else None,
+            "distribution"  : {str(rating): int(getattr(row, f"r{rating}") or 0) for rating in RATINGS},
+        })
+        data.append(entry)
+    return jsonify({"from": start.isoformat(), "to": end.isoformat(), "data": data})
@@ -0,0 +1,166 @@
+from data           import db
+from data.models    import Appointment, Payment, Service, Staff
+from data.repositories import common
+from flask          import current_app, json, jsonify
+from sqlalchemy     import func, select
+from datetime       import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+
+# REPORTS
+# Each report runs one Core select (no ORM objects) that the database groups
+# down to the finest grain the report needs, e.g. (day, method, service) for
+# revenue; a month of payments becomes a few thousand rows. Those are fetched
+# in REPORTS_FETCH_SIZE batches into a DataFrame column by column and rolled
+# up with vectorized groupby / numpy operations.
+# Results are cached per (report, from, to) in the shared read-through cache
+# for REPORTS_CACHE_TTL seconds; ?refresh=1 recomputes.
+
+def load_frame(statement, columns):
+    result = db.session.execute(statement)
+    batch_size = current_app.config['REPORTS_FETCH_SIZE']
+    frames = []
+    while True:
+        rows = result.fetchmany(batch_size)
+        if not rows:
+            break
+        frames.append(pd.DataFrame(dict(zip(columns, zip(*rows)))))
+    if not frames:
+        return pd.DataFrame({column: [] for column in columns})
+    return pd.concat(frames, ignore_index=True)
+
+def records(frame):
+    # numpy scalars and timestamps to plain JSON values.
+    return json.loads(frame.to_json(orient='records', date_format='iso'))
+
+def day_bounds(start, end):
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+def day_column(frame, column):
+    # DATE() comes back as date objects (MySQL) or ISO strings (SQLite).
+    return pd.to_datetime(frame[column]).dt.strftime('%Y-%m-%d')
+
+def revenue(start, end):
+    payments, appointments = Payment.__table__, Appointment.__table__
+    low, high = day_bounds(start, end)
+    day = func.date(payments.c.transaction_date)
+    frame = load_frame(
+        select([day, payments.c.payment_method, appointments.c.service_type, func.sum(payments.c.amount), func.count()])
+        .select_from(payments.outerjoin(appointments, appointments.c.id == payments.c.appointment_id))
+        .where(payments.c.transaction_date >= low)
+        .where(payments.c.transaction_date < high)
+        .where(payments.c.payment_status == 'Paid')
+        .group_by(day, payments.c.payment_method, appointments.c.service_type),
+        ["day", "payment_method", "service_type", "amount", "payments"])
+    frame["day"] = day_column(frame, "day")
+    frame["amount"] = frame["amount"].astype(float)
+    frame["payments"] = frame["payments"].astype(int)
+
+    def by(column):
+        grouped = frame.groupby(column, sort=True)[["amount", "payments"]].sum().reset_index()
+        return records(grouped.round({"amount": 2}))
+
+    return {
+        "total"         : round(float(frame["amount"].sum()), 2),
+        "payments"      : int(frame["payments"].sum()),
+        "by_day"        : by("day"),
+        "by_method"     : by("payment_method"),
+        "by_service"    : by("service_type"),
+    }
+
+def operations(start, end):
+    appointments = Appointment.__table__
+    low, high = day_bounds(start, end)
+    day = func.date(appointments.c.appointment_date)
+    frame = load_frame(
+        select([day, appointments.c.status, appointments.c.service_type, func.count()])
+        .where(appointments.c.appointment_date >= low)
+        .where(appointments.c.appointment_date < high)
+        .group_by(day, appointments.c.status, appointments.c.service_type),
+        ["day", "status", "service_type", "appointments"])
+    frame["day"] = day_column(frame, "day")
+    frame["appointments"] = frame["appointments"].astype(int)
+    frame["completed"] = np.where(frame["status"] == 'Completed', frame["appointments"], 0)
+    frame["cancelled"] = np.where(frame["status"] == 'Cancelled', frame["appointments"], 0)
+
+    def by(column):
+        grouped = frame.groupby(column, sort=True)[["appointments", "completed", "cancelled"]].sum().reset_index()
+        grouped["completion_rate"] = (grouped["completed"] / grouped["appointments"]).round(4)
+        grouped["cancellation_rate"] = (grouped["cancelled"] / grouped["appointments"]).round(4)
+        return records(grouped)
+
+    total = int(frame["appointments"].sum())
+    return {
+        "appointments"      : total,
+        "completion_rate"   : round(float(frame["completed"].sum()) / total, 4) if total else None,
+        "cancellation_rate" : round(float(frame["cancelled"].sum()) / total, 4) if total else None,
+        "by_status"         : {status: int(count) for status, count in frame.groupby("status")["appointments"].sum().items()},
+        "by_day"            : by("day"),
+        "by_service"        : by("service_type"),
+    }
+
+def utilization(start, end):
+    appointments, services, staff = Appointment.__table__, Service.__table__, Staff.__table__
+    low, high = day_bounds(start, end)
+    roles = current_app.config['SCHEDULE_STAFF_ROLES']
+    people = load_frame(
+        select([staff.c.id, staff.c.name]).where(staff.c.role.in_(roles)),
+        ["staff_id", "name"])
+    bookings = load_frame(
+        select([appointments.c.staff_id, appointments.c.service_type, appointments.c.status, func.count()])
+        .where(appointments.c.appointment_date >= low)
+        .where(appointments.c.appointment_date < high)
+        .where(appointments.c.status != 'Cancelled')
+        .group_by(appointments.c.staff_id, appointments.c.service_type, appointments.c.status),
+        ["staff_id", "service_type", "status", "appointments"])
+    durations = load_frame(select([services.c.name, services.c.duration]), ["service_type", "duration"]) \
+        .groupby("service_type", as_index=False)["duration"].mean()
+    bookings = bookings.merge(durations, on="service_type", how="left")
+    bookings["appointments"] = bookings["appointments"].astype(int)
+    bookings["minutes"] = bookings["duration"].fillna(current_app.config['SCHEDULE_DEFAULT_DURATION']).astype(float) * bookings["appointments"]
+    bookings["completed_minutes"] = np.where(bookings["status"] == 'Completed', bookings["minutes"], 0.0)
+    booked = bookings.groupby("staff_id", as_index=False).agg(
+        appointments=("appointments", "sum"), booked_minutes=("minutes", "sum"), completed_minutes=("completed_minutes", "sum"))
+    frame = people.merge(booked, on="staff_id", how="left").fillna(
+        {"appointments": 0, "booked_minutes": 0.0, "completed_minutes": 0.0})
+    available = ((end - start).days + 1) * current_app.config['REPORTS_SHIFT_MINUTES']
+    frame["appointments"] = frame["appointments"].astype(int)
+    frame["utilization"] = (frame["booked_minutes"] / available).round(4)
+    frame = frame.sort_values(["utilization", "staff_id"], ascending=[False, True])
+    return {
+        "available_minutes" : available,
+        "utilization"       : round(float(frame["booked_minutes"].sum()) / (available * len(frame)), 4) if len(frame) else None,
+        "staff"             : records(frame),
+    }
+
+REPORTS = {
+    "revenue"       : revenue,
+    "operations"    : operations,
+    "utilization"   : utilization,
+}
+
+# Request helpers used by application/api.py
+def parse_range(args):
+    try:
+        end = date.fromisoformat(args['to']) if args.get('to') else date.today()
+        start = date.fromisoformat(args['from']) if args.get('from') else end - timedelta(days=29)
+    except ValueError:
+        return None, None
+    return start, end
+
+def report(name, args):
+    build = REPORTS.get(name)
+    if build is None:
+        return {"error": f"Unknown report {name}; expected {', '.join(REPORTS)}"}, 404
+    start, end = parse_range(args)
+    if start is None or end < start:
+        return {"error": "from and to must be dates (YYYY-MM-DD), from <= to"}, 400
+    if (end - start).days + 1 > current_app.config['REPORTS_MAX_DAYS']:
+        return {"error": f"Range is limited to {current_app.config['REPORTS_MAX_DAYS']} days"}, 400
+    key = (start.isoformat(), end.isoformat())
+    cache = common.read_cache()
+    if args.get('refresh') in ('1', 'true'):
+        cache.invalidate(f"report:{name}")
+    result = cache.get(f"report:{name}", key, lambda: dict(build(start, end), generated_at=datetime.now().isoformat()),
+                       ttl=current_app.config['REPORTS_CACHE_TTL'], max_entries=current_app.config['REPORTS_CACHE_ENTRIES'])
+    return jsonify(dict(result, report=name, **{"from": key[0], "to": key[1]}))
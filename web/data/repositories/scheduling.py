@@ -0,0 +1,303 @@
+from data           import db
+from data.models    import Appointment, Service, Staff
+from flask          import current_app, g, jsonify
+from bisect         import bisect_left, bisect_right
+from datetime       import datetime, timedelta
+from heapq          import merge
+from itertools      import islice
+from threading      import Lock
+import time
+
+# SLOT ALLOCATION
+# Bookings are kept per (staff, day) in a StaffDayIndex: bookings sorted by
+# start plus a running maximum of their end times, so "is [start, end) free"
+# is two bisects regardless of how many cars a washer has that day.
+#
+# Indexes are loaded with one query per day and cached for
+# SCHEDULE_INDEX_TTL seconds. Reads (check / free slots) use the cache;
+# bookings lock the staff row (SELECT ... FOR UPDATE) and reload the index
+# inside that transaction with a locking read, so conflicting POSTs from
+# different workers serialize on the washer and the second one is rejected.
+# (A plain SELECT would read the transaction's REPEATABLE READ snapshot,
+# which a bulk POST may have taken before the lock was granted.)
+#
+# That reloaded index, plus the bookings the request adds to it, stays in `g`
+# until the commit; only then does the listener install it in the shared
+# cache, so a rolled back request leaves no phantom bookings behind.
+#
+# Creates and updates that move a booking (staff, date, service or leaving
+# 'Cancelled') go through the same guard; an update first takes the row's
+# own booking out of the indexes. A day's index holds the bookings starting
+# that day, so checks also consult the previous day for bookings running past
+# midnight (services are shorter than a day).
+
+class StaffDayIndex:
+
+    def __init__(self, bookings=()):
+        self.bookings = sorted(bookings)
+        self.starts = [start for start, _, _ in self.bookings]
+        self.max_ends = []
+        self._rebuild_max_ends(0)
+
+    def _rebuild_max_ends(self, position):
+        del self.max_ends[position:]
+        running = self.max_ends[-1] if self.max_ends else None
+        for _, end, _ in self.bookings[position:]:
+            running = end if running is None or end > running else running
+            self.max_ends.append(running)
+
+    def is_free(self, start, end):
+        position = bisect_left(self.starts, end)
+        # Any booking starting before `end` that is still running at `start`?
+        return position == 0 or self.max_ends[position - 1] <= start
+
+    def add(self, start, end, appointment_id=None):
+        position = bisect_right(self.starts, start)
+        self.bookings.insert(position, (start, end, appointment_id))
+        self.starts.insert(position, start)
+        self._rebuild_max_ends(position)
+
+    def remove(self, appointment_id):
+        for position, booking in enumerate(self.bookings):
+            if booking[2] == appointment_id:
+                del self.bookings[position]
+                del self.starts[position]
+                self._rebuild_max_ends(position)
+                return True
+        return False
+
+    def latest_end(self):
+        return self.max_ends[-1] if self.max_ends else None
+
+    def gaps(self, window_start, window_end):
+        cursor = window_start
+        # Bookings that started before the window may still be running.
+        position = bisect_left(self.starts, window_start)
+        if position:
+            cursor = max(cursor, self.max_ends[position - 1])
+        for start, end, _ in self.bookings[position:]:
+            if start >= window_end:
+                break
+            if start > cursor:
+                yield cursor, start
+            cursor = max(cursor, end)
+        if cursor < window_end:
+            yield cursor, window_end
+
+class SchedulingEngine:
+
+    def __init__(self):
+        self.lock = Lock()
+        self.indexes = {}
+        self.service_durations = (0, {})
+
+    def durations(self):
+        loaded_at, durations = self.service_durations
+        if time.monotonic() - loaded_at > current_app.config['SCHEDULE_INDEX_TTL']:
+            durations = {name: duration for name, duration in db.session.query(Service.name, Service.duration)}
+            self.service_durations = (time.monotonic(), durations)
+        return durations
+
+    def duration(self, service_type):
+        minutes = self.durations().get(service_type) or current_app.config['SCHEDULE_DEFAULT_DURATION']
+        return timedelta(minutes=minutes)
+
+    def fetch(self, staff_ids, day, locking=False):
+        # One query for every requested washer on that day.
+        day_start = datetime.combine(day, datetime.min.time())
+        rows = db.session.query(Appointment.id, Appointment.staff_id, Appointment.appointment_date, Appointment.service_type) \
+            .filter(Appointment.staff_id.in_(staff_ids)) \
+            .filter(Appointment.appointment_date >= day_start) \
+            .filter(Appointment.appointment_date < day_start + timedelta(days=1)) \
+            .filter(Appointment.status != 'Cancelled')
+        if locking:
+            # Locking reads see the latest committed rows, not the snapshot.
+            rows = rows.with_for_update(read=True)
+        bookings = {staff_id: [] for staff_id in staff_ids}
+        for row in rows:
+            bookings[row.staff_id].append((row.appointment_date, row.appointment_date + self.duration(row.service_type), row.id))
+        return {staff_id: StaffDayIndex(staff_bookings) for staff_id, staff_bookings in bookings.items()}
+
+    def load(self, staff_ids, day):
+        indexes = self.fetch(staff_ids, day)
+        loaded_at = time.monotonic()
+        with self.lock:
+            for staff_id, index in indexes.items():
+                self.indexes[(staff_id, day)] = (loaded_at, index)
+        return indexes
+
+    def day_indexes(self, staff_ids, day):
+        ttl = current_app.config['SCHEDULE_INDEX_TTL']
+        now = time.monotonic()
+        cached, missing = {}, []
+        with self.lock:
+            for staff_id in staff_ids:
+                entry = self.indexes.get((staff_id, day))
+                if entry and now - entry[0] < ttl:
+                    cached[staff_id] = entry[1]
+                else:
+                    missing.append(staff_id)
+        if missing:
+            cached.update(self.load(missing, day))
+        return cached
+
+    def locked_indexes(self, staff_ids, day):
+        # Indexes private to this request, reloaded with a locking read; the
+        # caller holds the staff rows. Installed by changed() after the commit.
+        pending = g.setdefault('scheduling_indexes', {})
+        missing = [staff_id for staff_id in staff_ids if (staff_id, day) not in pending]
+        if missing:
+            for staff_id, index in self.fetch(missing, day, locking=True).items():
+                pending[(staff_id, day)] = index
+        return {staff_id: pending[(staff_id, day)] for staff_id in staff_ids}
+
+    def changed(self, model, action, rows):
+        # Write listener for Appointment, see common.after_commit.
+        pending = g.pop('scheduling_indexes', {})
+        if action == 'create':
+            loaded_at = time.monotonic()
+            with self.lock:
+                for key, index in pending.items():
+                    self.indexes[key] = (loaded_at, index)
+        elif action == 'delete' or any({"staff_id", "status", "appointment_date", "service_type"} & set(row) for row in rows):
+            self.invalidate()
+
+    def invalidate(self, staff_id=None, day=None):
+        with self.lock:
+            if staff_id is None:
+                self.indexes.clear()
+            else:
+                self.indexes.pop((staff_id, day), None)
+
+    def qualified_staff(self):
+        roles = current_app.config['SCHEDULE_STAFF_ROLES']
+        return [row.id for row in db.session.query(Staff.id).filter(Staff.role.in_(roles))]
+
+    def span_days(self, start, end):
+        # Days whose bookings may overlap [start, end).
+        day, last = start.date() - timedelta(days=1), (end - timedelta(microseconds=1)).date()
+        days = []
+        while day <= last:
+            days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    def is_free(self, staff_id, start, duration):
+        end = start + duration
+        return all(self.day_indexes([staff_id], day)[staff_id].is_free(start, end) for day in self.span_days(start, end))
+
+    def free_slots(self, duration, window_start, window_end, staff_ids, limit):
+        step = timedelta(minutes=current_app.config['SCHEDULE_SLOT_MINUTES'])
+
+        def staff_slots(staff_id, index, day, day_start, day_end):
+            # (start, staff_id) in start order.
+            for gap_start, gap_end in index.gaps(day_start, day_end):
+                # Align slot starts to the slot grid.
+                offset = (gap_start - datetime.combine(day, datetime.min.time())) % step
+                start = gap_start + (step - offset if offset else timedelta(0))
+                while start + duration <= gap_end:
+                    yield start, staff_id
+                    start += step
+
+        slots = []
+        day = window_start.date()
+        previous = self.day_indexes(staff_ids, day - timedelta(days=1))
+        while day <= window_end.date() and len(slots) < limit:
+            day_start = max(window_start, datetime.combine(day, datetime.min.time()))
+            day_end = min(window_end, datetime.combine(day + timedelta(days=1), datetime.min.time()))
+            indexes = self.day_indexes(staff_ids, day)
+            # Earliest slots of the day across all staff, not the first washer's;
+            # each washer starts after whatever runs over from the day before.
+            merged = merge(*[staff_slots(staff_id, index, day, max(day_start, previous[staff_id].latest_end() or day_start), day_end)
+                             for staff_id, index in indexes.items()])
+            for start, staff_id in islice(merged, limit - len(slots)):
+                slots.append({"staff_id": staff_id, "start": start.isoformat(), "end": (start + duration).isoformat()})
+            previous = indexes
+            day += timedelta(days=1)
+        return slots
+
+    def guard_booking(self, data, appointment_id=None):
+        # before_create hook for Appointment; guard_update passes the id of
+        # the appointment being moved.
+        staff_id = data.get('staff_id')
+        start = data.get('appointment_date')
+        if staff_id is None or not isinstance(start, datetime) or data.get('status') == 'Cancelled':
+            return None
+        end = start + self.duration(data.get('service_type'))
+        days = self.span_days(start, end)
+        if not any(key[0] == staff_id for key in g.get('scheduling_indexes', {})):
+            # Held until commit/rollback; the locking reload sees every
+            # booking committed by other workers before the lock was granted.
+            db.session.query(Staff.id).filter(Staff.id == staff_id).with_for_update().first()
+        indexes = {day: self.locked_indexes([staff_id], day)[staff_id] for day in days}
+        if appointment_id is not None:
+            for index in indexes.values():
+                index.remove(appointment_id)
+        if not all(index.is_free(start, end) for index in indexes.values()):
+            return {"error": f"Staff {staff_id} is already booked between {start.isoformat()} and {end.isoformat()}"}, 409
+        # Later items of the same (bulk) request must see this booking too.
+        indexes[start.date()].add(start, end, appointment_id)
+        return None
+
+    def guard_update(self, rows):
+        # before_update hook for Appointment (single and bulk updates).
+        rows = [row for row in rows if {"staff_id", "appointment_date", "service_type", "status"} & set(row)]
+        if not rows:
+            return None
+        current = {row.id: row for row in db.session.query(
+                Appointment.id, Appointment.staff_id, Appointment.appointment_date, Appointment.service_type, Appointment.status)
+            .filter(Appointment.id.in_([row["id"] for row in rows]))}
+        pending = g.setdefault('scheduling_indexes', {})
+        for row in rows:
+            old = current.get(row["id"])
+            if old is None:
+                continue
+            if set(row) <= {"id", "status"} and not (old.status == 'Cancelled' and row["status"] != 'Cancelled'):
+                continue
+            # Its old slot is free for later items of this request.
+            if (old.staff_id, old.appointment_date.date()) in pending:
+                pending[(old.staff_id, old.appointment_date.date())].remove(row["id"])
+            booking = {key: row.get(key, getattr(old, key)) for key in ("staff_id", "appointment_date", "service_type", "status")}
+            error = self.guard_booking(booking, appointment_id=row["id"])
+            if error:
+                return error
+        return None
+
+engine = SchedulingEngine()
+
+# Request helpers used by application/api.py
+def parse_datetime(args, key):
+    try:
+        return datetime.fromisoformat(args[key])
+    except (KeyError, ValueError):
+        return None
+
+def check_slot(args):
+    staff_id = args.get('staff_id', type=int)
+    start = parse_datetime(args, 'start')
+    if staff_id is None or start is None:
+        return {"error": "staff_id and start (ISO datetime) are required"}, 400
+    duration = engine.duration(args.get('service_type'))
+    return jsonify({
+        "staff_id"  : staff_id,
+        "start"     : start.isoformat(),
+        "end"       : (start + duration).isoformat(),
+        "free"      : engine.is_free(staff_id, start, duration)
+    })
+
+def free_slots(args):
+    start = parse_datetime(args, 'start')
+    end = parse_datetime(args, 'end')
+    if start is None or end is None or end <= start:
+        return {"error": "start and end (ISO datetimes, start < end) are required"}, 400
+    if end - start > timedelta(days=current_app.config['SCHEDULE_MAX_WINDOW_DAYS']):
+        return {"error": f"Window is limited to {current_app.config['SCHEDULE_MAX_WINDOW_DAYS']} days"}, 400
+    staff_id = args.get('staff_id', type=int)
+    staff_ids = [staff_id] if staff_id else engine.qualified_staff()
+    limit = min(args.get('limit', 100, type=int), 1000)
+    duration = engine.duration(args.get('service_type'))
+    return jsonify({
+        "service_type"  : args.get('service_type'),
+        "duration"      : int(duration.total_seconds() // 60),
+        "slots"         : engine.free_slots(duration, start, end, staff_ids, limit)
+    })
@@ -0,0 +1,44 @@
+"""add list filter indexes
+
+Revision ID: 0158d79bfa1c
+Revises: cf7d8eb7b36e
+Create Date: 2026-10-18 09:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0158d79bfa1c'
+down_revision = 'cf7d8eb7b36e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_status_appointment_date', ['status', 'appointment_date'], unique=False)
+
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.create_index('ix_payment_transaction_date', ['transaction_date'], unique=False)
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_user_id_status', ['user_id', 'status'], unique=False)
+
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.create_index('ix_queue_status_position', ['status', 'position'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.drop_index('ix_queue_status_position')
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_user_id_status')
+
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.drop_index('ix_payment_transaction_date')
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_status_appointment_date')
@@ -0,0 +1,34 @@
+"""add queue sort rank
+
+Revision ID: 3c9e51f0a7d2
+Revises: 7a41c2e9d5b3
+Create Date: 2026-10-18 15:12:44.503117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e51f0a7d2'
+down_revision = '7a41c2e9d5b3'
+branch_labels = None
+depends_on = None
+
+# data/repositories/queueing.py RANK_STEP
+RANK_STEP = 1 << 20
+
+
+def upgrade():
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sort_rank', sa.BigInteger(), server_default='0', nullable=False))
+        batch_op.create_index('ix_queue_status_sort_rank', ['status', 'sort_rank'], unique=False)
+
+    # Existing rows keep their order: position first, id breaks ties.
+    op.execute(f"UPDATE queue SET sort_rank = position * {RANK_STEP}")
+
+
+def downgrade():
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.drop_index('ix_queue_status_sort_rank')
+        batch_op.drop_column('sort_rank')
@@ -0,0 +1,38 @@
+"""add loyalty balance
+
+Revision ID: 5f0d8b3a21c7
+Revises: e81f4a6c90b3
+Create Date: 2026-10-18 17:31:52.608114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0d8b3a21c7'
+down_revision = 'e81f4a6c90b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('loyalty_balance',
+    sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('points_earned', sa.Integer(), nullable=False),
+    sa.Column('points_spent', sa.Integer(), nullable=False),
+    sa.Column('entries', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Initial balances; `flask loyalty-reconcile` runs the same statement.
+    op.execute(
+        "INSERT INTO loyalty_balance (user_id, points_earned, points_spent, entries, updated_at) "
+        "SELECT user_id, COALESCE(SUM(points_earned), 0), COALESCE(SUM(points_spent), 0), COUNT(*), CURRENT_TIMESTAMP "
+        "FROM loyalty GROUP BY user_id"
+    )
+
+
+def downgrade():
+    op.drop_table('loyalty_balance')
@@ -0,0 +1,26 @@
+"""add appointment staff/date index
+
+Revision ID: 7a41c2e9d5b3
+Revises: 0158d79bfa1c
+Create Date: 2026-10-18 13:40:05.118342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a41c2e9d5b3'
+down_revision = '0158d79bfa1c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_staff_id_appointment_date', ['staff_id', 'appointment_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_staff_id_appointment_date')
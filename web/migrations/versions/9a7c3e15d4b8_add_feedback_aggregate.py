@@ -0,0 +1,49 @@
+"""add feedback aggregate
+
+Revision ID: 9a7c3e15d4b8
+Revises: 5f0d8b3a21c7
+Create Date: 2026-10-18 18:05:17.342861
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a7c3e15d4b8'
+down_revision = '5f0d8b3a21c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('feedback_aggregate',
+    sa.Column('bucket_date', sa.Date(), nullable=False),
+    sa.Column('staff_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('service_type', sa.String(length=100), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('r1', sa.Integer(), nullable=False),
+    sa.Column('r2', sa.Integer(), nullable=False),
+    sa.Column('r3', sa.Integer(), nullable=False),
+    sa.Column('r4', sa.Integer(), nullable=False),
+    sa.Column('r5', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['staff_id'], ['staff.id'], ),
+    sa.PrimaryKeyConstraint('bucket_date', 'staff_id', 'service_type')
+    )
+    # Initial buckets; `flask feedback-backfill` runs the same statement.
+    op.execute(
+        "INSERT INTO feedback_aggregate (bucket_date, staff_id, service_type, count, total, r1, r2, r3, r4, r5, updated_at) "
+        "SELECT DATE(feedback.created_at), appointment.staff_id, appointment.service_type, COUNT(*), SUM(feedback.rating), "
+        "SUM(CASE WHEN feedback.rating = 1 THEN 1 ELSE 0 END), SUM(CASE WHEN feedback.rating = 2 THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN feedback.rating = 3 THEN 1 ELSE 0 END), SUM(CASE WHEN feedback.rating = 4 THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN feedback.rating = 5 THEN 1 ELSE 0 END), CURRENT_TIMESTAMP "
+        "FROM feedback JOIN appointment ON appointment.id = feedback.appointment_id "
+        "WHERE feedback.rating IN (1, 2, 3, 4, 5) "
+        "GROUP BY DATE(feedback.created_at), appointment.staff_id, appointment.service_type"
+    )
+
+
+def downgrade():
+    op.drop_table('feedback_aggregate')
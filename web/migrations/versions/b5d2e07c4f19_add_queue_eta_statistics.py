@@ -0,0 +1,38 @@
+"""add queue eta statistics
+
+Revision ID: b5d2e07c4f19
+Revises: 3c9e51f0a7d2
+Create Date: 2026-10-18 16:02:31.774920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d2e07c4f19'
+down_revision = '3c9e51f0a7d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('completion_stat',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('scope', sa.String(length=20), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.Column('mean', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('scope', 'key', name='uq_completion_stat_scope_key')
+    )
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('served_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('queue', schema=None) as batch_op:
+        batch_op.drop_column('served_at')
+
+    op.drop_table('completion_stat')
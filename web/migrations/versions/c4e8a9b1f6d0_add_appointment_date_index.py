@@ -0,0 +1,26 @@
+"""add appointment date index
+
+Revision ID: c4e8a9b1f6d0
+Revises: 9a7c3e15d4b8
+Create Date: 2026-10-18 18:41:26.090517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a9b1f6d0'
+down_revision = '9a7c3e15d4b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_appointment_date', ['appointment_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_appointment_date')
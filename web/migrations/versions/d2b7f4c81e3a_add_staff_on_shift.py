@@ -0,0 +1,26 @@
+"""add staff on_shift
+
+Revision ID: d2b7f4c81e3a
+Revises: c4e8a9b1f6d0
+Create Date: 2026-10-18 19:52:08.318642
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2b7f4c81e3a'
+down_revision = 'c4e8a9b1f6d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('staff', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('on_shift', sa.Boolean(), server_default=sa.true(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('staff', schema=None) as batch_op:
+        batch_op.drop_column('on_shift')
@@ -0,0 +1,41 @@
+"""add notification outbox columns
+
+Revision ID: e81f4a6c90b3
+Revises: b5d2e07c4f19
+Create Date: 2026-10-18 16:48:09.215377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81f4a6c90b3'
+down_revision = 'b5d2e07c4f19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('delivery_status', sa.String(length=20), server_default='Pending', nullable=False))
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('sent_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('last_error', sa.String(length=255), nullable=True))
+        batch_op.create_index('ix_notification_delivery_status_next_attempt_at', ['delivery_status', 'next_attempt_at'], unique=False)
+
+    # Rows written before the outbox existed are not delivered retroactively.
+    op.execute("UPDATE notification SET delivery_status = 'Skipped'")
+
+
+def downgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_delivery_status_next_attempt_at')
+        batch_op.drop_column('last_error')
+        batch_op.drop_column('sent_at')
+        batch_op.drop_column('claimed_at')
+        batch_op.drop_column('next_attempt_at')
+        batch_op.drop_column('attempts')
+        batch_op.drop_column('delivery_status')
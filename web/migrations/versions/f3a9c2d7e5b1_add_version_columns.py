@@ -0,0 +1,28 @@
+"""add version columns
+
+Revision ID: f3a9c2d7e5b1
+Revises: d2b7f4c81e3a
+Create Date: 2026-10-18 21:14:37.502913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c2d7e5b1'
+down_revision = 'd2b7f4c81e3a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('appointment', 'payment', 'queue'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in ('queue', 'payment', 'appointment'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('version')
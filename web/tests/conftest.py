@@ -0,0 +1,46 @@
+import base64
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATABASE = os.path.join(tempfile.mkdtemp(prefix='hifi-tests-'), 'test.sqlite')
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE}'
+
+from application    import app
+from data           import db
+from data.repositories import common, scheduling, assignment, queueing, eta
+
+app.config['TESTING'] = True
+app.config['WTF_CSRF_ENABLED'] = False
+
+def basic_auth(username, password):
+    return 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    # Per-process engines and caches would remember the previous test's rows.
+    common._read_cache = None
+    for engine in (scheduling.engine, assignment.engine, queueing.engine, eta.estimator):
+        engine.__init__()
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = basic_auth(app.config['API_USERNAME'], app.config['API_PASSWORD'])
+    yield client
+    with app.app_context():
+        db.session.remove()
+
+@pytest.fixture
+def booking(client):
+    client.post('/api/user', json={"name": "A", "email": "a@x", "phone": "1", "password": "p", "role": "customer"})
+    client.post('/api/vehicle', json={"user_id": 1, "plate_number": "P1", "model": "m", "type": "Sedan"})
+    client.post('/api/staff/bulk', json=[{"name": f"W{i}", "role": "Washer", "phone": "0", "email": f"w{i}@x"} for i in (1, 2)])
+    client.post('/api/service', json={"name": "Full Wash", "description": "d", "price": 100, "duration": 60})
+
+    def book(start, **values):
+        return dict({"user_id": 1, "vehicle_id": 1, "service_type": "Full Wash", "appointment_date": start}, **values)
+    return book
@@ -0,0 +1,46 @@
+from data           import db
+from data.models    import Appointment, Staff
+from data.repositories import assignment
+from application    import app
+from datetime       import datetime, timedelta
+import pytest
+
+def tomorrow(hour):
+    return (datetime.now() + timedelta(days=1)).replace(hour=hour, minute=0, second=0, microsecond=0).isoformat()
+
+def staff_of(id):
+    with app.app_context():
+        return db.session.query(Appointment.staff_id).filter(Appointment.id == id).scalar()
+
+def on_shift(id):
+    with app.app_context():
+        return db.session.query(Staff.on_shift).filter(Staff.id == id).scalar()
+
+def test_off_shift_moves_future_appointments(client, booking):
+    client.post('/api/appointment', json=booking(tomorrow(9), staff_id=1))
+    assert client.put('/api/staff/1', json={"on_shift": False}).status_code == 200
+    assert staff_of(1) == 2
+
+def test_failed_rebalance_keeps_staff_on_shift(client, booking, monkeypatch):
+    client.post('/api/appointment', json=booking(tomorrow(9), staff_id=1))
+
+    def fail(staff_id, exclude):
+        raise RuntimeError("rebalance failed")
+    monkeypatch.setattr(assignment.engine, 'rebalance', fail)
+    with pytest.raises(RuntimeError):
+        client.put('/api/staff/1', json={"on_shift": False})
+    with app.app_context():
+        db.session.rollback()
+    assert on_shift(1) is True
+    assert staff_of(1) == 1
+
+def test_rolled_back_assignment_leaves_no_load(client, booking):
+    response = client.post('/api/appointment/bulk', json=[booking(tomorrow(9)), {"user_id": 1}])
+    assert response.status_code == 400
+    assert client.post('/api/appointment', json=booking(tomorrow(11))).status_code == 200
+    assert staff_of(1) == 1
+
+def test_committed_assignment_adds_load(client, booking):
+    assert client.post('/api/appointment', json=booking(tomorrow(9))).status_code == 200
+    assert client.post('/api/appointment', json=booking(tomorrow(11))).status_code == 200
+    assert (staff_of(1), staff_of(2)) == (1, 2)
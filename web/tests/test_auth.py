@@ -0,0 +1,28 @@
+from application    import app
+from conftest       import basic_auth
+
+def as_user(username, password):
+    return {'Authorization': basic_auth(username, password)}
+
+def test_api_routes_require_credentials(client):
+    anonymous = app.test_client()
+    assert anonymous.get('/api/service').status_code == 401
+    assert anonymous.post('/api/service', json={"name": "Wash", "description": "d", "price": 1, "duration": 30}).status_code == 401
+    assert anonymous.get('/api/service', headers=as_user('hifi', 'wrong')).status_code == 401
+    assert client.get('/api/service').status_code == 200
+
+def test_checks_are_cached_and_counted(client):
+    # Counters are per process; compare before and after.
+    before = client.get('/api/stats/auth').json
+    for _ in range(3):
+        assert client.get('/api/service').status_code == 200
+    after = client.get('/api/stats/auth').json
+    assert after["requests"] - before["requests"] == 4
+    assert after["verifications"] - before["verifications"] <= 1
+
+def test_users_need_an_allowed_role(client, monkeypatch):
+    client.post('/api/user', json={"name": "A", "email": "a@x", "phone": "1", "password": "p", "role": "admin"})
+    anonymous = app.test_client()
+    assert anonymous.get('/api/service', headers=as_user('a@x', 'p')).status_code == 401
+    monkeypatch.setitem(app.config, 'API_USER_ROLES', ('admin',))
+    assert anonymous.get('/api/service', headers=as_user('a@x', 'p')).status_code == 200
@@ -0,0 +1,60 @@
+from data           import db
+from application    import app
+from sqlalchemy     import event
+import contextlib
+
+@contextlib.contextmanager
+def statements():
+    seen = []
+    def record(connection, cursor, statement, parameters, context, executemany):
+        seen.append((statement.split()[0], executemany))
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield seen
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+def services(client, count):
+    client.post('/api/service/bulk', json=[
+        {"name": f"S{i}", "description": "d", "price": 10, "duration": 30} for i in range(count)])
+
+def test_bulk_update_is_one_statement_per_chunk(client):
+    services(client, 5)
+    with statements() as seen:
+        response = client.patch('/api/service/bulk', json=[
+            {"id": 1, "price": 11}, {"id": 2, "duration": 45}, {"id": 3, "price": 13, "duration": 15}, {"id": 9, "price": 1}])
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json["results"]] == ["updated"] * 3 + ["not_found"]
+    assert [kind for kind, _ in seen].count('UPDATE') == 1 and not any(many for _, many in seen)
+    rows = {row["id"]: (row["price"], row["duration"]) for row in client.get('/api/service').json["data"]}
+    assert rows[1] == (11, 30) and rows[2] == (10, 45) and rows[3] == (13, 15) and rows[4] == (10, 30)
+
+def test_bulk_update_validation_failure_writes_nothing(client):
+    services(client, 2)
+    response = client.patch('/api/service/bulk', json=[{"id": 1, "price": 11}, {"id": 2, "duration": "long"}, {"price": 1}])
+    assert response.status_code == 400
+    assert [result["index"] for result in response.json["results"]] == [1, 2]
+    assert client.get('/api/service/1').json["price"] == 10
+
+def test_bulk_create_reports_invalid_items(client):
+    response = client.post('/api/service/bulk', json=[
+        {"name": "S1", "description": "d", "price": 10, "duration": 30}, {"name": "S2"}])
+    assert response.status_code == 400 and response.json["results"][0]["index"] == 1
+    assert client.get('/api/service').json["data"] == []
+
+def test_bulk_delete_reports_missing_ids(client):
+    services(client, 3)
+    response = client.delete('/api/service/bulk?chunk_size=2', json=[1, 7, 3])
+    assert response.status_code == 200
+    assert response.json["results"] == [{"id": 1, "status": "deleted"}, {"id": 7, "status": "not_found"},
+                                        {"id": 3, "status": "deleted"}]
+    assert [row["id"] for row in client.get('/api/service').json["data"]] == [2]
+    assert client.delete('/api/service/bulk', json=[1, "2"]).status_code == 400
+
+def test_bulk_items_are_limited(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'API_BULK_MAX_ITEMS', 2)
+    response = client.post('/api/service/bulk', json=[{"name": f"S{i}"} for i in range(3)])
+    assert response.status_code == 400 and "At most 2" in response.json["error"]
+    assert client.post('/api/service/bulk', json=[]).status_code == 400
@@ -0,0 +1,57 @@
+from data           import db
+from data.models    import Service
+from data.repositories import common
+from application    import app
+from datetime       import datetime, timedelta
+
+def age(model, seconds):
+    with app.app_context():
+        model.query.update({model.updated_at: datetime.now() - timedelta(seconds=seconds)}, synchronize_session=False)
+        db.session.commit()
+        common.invalidate_cache(model)
+
+def test_new_row_after_full_last_page_changes_etag(client):
+    client.post('/api/service', json={"name": "Wash", "description": "d", "price": 1, "duration": 30})
+    age(Service, 10)
+    first = client.get('/api/service?limit=1')
+    assert first.json["next_cursor"] is None and first.headers.get('ETag')
+    client.post('/api/service', json={"name": "Wax", "description": "d", "price": 1, "duration": 30})
+    age(Service, 10)
+    again = client.get('/api/service?limit=1', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 200
+    assert again.json["next_cursor"] is not None
+
+def test_rows_written_this_second_have_no_validators(client):
+    client.post('/api/service', json={"name": "Wash", "description": "d", "price": 1, "duration": 30})
+    response = client.get('/api/service/1')
+    assert 'ETag' not in response.headers and 'Last-Modified' not in response.headers
+    age(Service, 10)
+    response = client.get('/api/service/1')
+    assert client.get('/api/service/1', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+def test_list_has_no_last_modified_and_sees_deletes(client):
+    for name in ("Wash", "Wax"):
+        client.post('/api/service', json={"name": name, "description": "d", "price": 1, "duration": 30})
+    age(Service, 10)
+    first = client.get('/api/service')
+    assert 'Last-Modified' not in first.headers
+    client.delete('/api/service/2')
+    again = client.get('/api/service', headers={'If-None-Match': first.headers['ETag'],
+                                                'If-Modified-Since': 'Wed, 01 Jan 2098 00:00:00 GMT'})
+    assert again.status_code == 200 and len(again.json["data"]) == 1
+    assert client.get('/api/service', headers={'If-None-Match': again.headers['ETag']}).status_code == 304
+
+def test_single_record_validators(client):
+    client.post('/api/service', json={"name": "Wash", "description": "d", "price": 1, "duration": 30})
+    age(Service, 10)
+    first = client.get('/api/service/1')
+    assert first.headers.get('Last-Modified')
+    assert client.get('/api/service/1', headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 304
+    client.put('/api/service/1', json={"price": 2})
+    age(Service, 5)
+    again = client.get('/api/service/1', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 200 and again.json["price"] == 2
+    assert client.get('/api/service/1', headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 200
+
+def test_missing_record_is_404(client):
+    assert client.get('/api/service/99').status_code == 404
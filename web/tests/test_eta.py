@@ -0,0 +1,15 @@
+from data.models    import CompletionStat
+from application    import app
+from datetime       import datetime, timedelta
+
+def samples():
+    with app.app_context():
+        return {(row.scope, row.key): row.samples for row in CompletionStat.query}
+
+def test_only_transitions_to_completed_are_sampled(client, booking):
+    start = (datetime.now() - timedelta(minutes=40)).replace(microsecond=0).isoformat()
+    client.post('/api/appointment', json=booking(start, staff_id=1))
+    assert client.put('/api/appointment/1', json={"status": "Completed"}).status_code == 200
+    assert client.put('/api/appointment/1', json={"status": "Completed"}).status_code == 200
+    assert client.patch('/api/appointment/bulk', json=[{"id": 1, "status": "Completed"}]).status_code == 200
+    assert samples() == {('service', 'Full Wash'): 1, ('staff', '1'): 1}
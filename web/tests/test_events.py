@@ -0,0 +1,56 @@
+from data.repositories.events import Broker, FileBackend, LocalBackend
+import os
+import subprocess
+import sys
+import time
+
+def wait_for(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return predicate()
+
+def workers(tmp_path, max_bytes=1 << 20):
+    config = {"EVENTS_LOG_DIR": str(tmp_path), "EVENTS_POLL_SECONDS": 0.01, "EVENTS_LOG_MAX_BYTES": max_bytes}
+    return Broker(FileBackend(config)), Broker(FileBackend(config))
+
+def test_events_reach_every_worker_with_the_same_ids(tmp_path):
+    a, b = workers(tmp_path)
+    subscriber, backlog = b.subscribe({'queue'})
+    a.publish('queue', {"action": "create"})
+    assert wait_for(lambda: not subscriber.queue.empty())
+    sequence, channel, _ = subscriber.queue.get()
+    assert channel == 'queue' and a.epoch == b.epoch
+    assert wait_for(lambda: a.sequence == sequence)
+
+def test_last_event_id_replays_on_another_worker(tmp_path):
+    a, b = workers(tmp_path)
+    a.publish('queue', {"n": 1})
+    assert wait_for(lambda: b.sequence > b.floor)
+    seen = (a.epoch, b.sequence)
+    a.publish('queue', {"n": 2})
+    a.publish('appointment', {"n": 3})
+    assert wait_for(lambda: len(b.replay) == 3)
+    _, backlog = b.subscribe({'queue'}, seen)
+    assert [event[2] for event in backlog] == ['{"n": 2}']
+
+def test_ids_from_another_epoch_get_a_reset(tmp_path):
+    a, _ = workers(tmp_path)
+    local = Broker(LocalBackend())
+    local.publish('queue', {})
+    _, backlog = a.subscribe({'queue'}, (local.epoch, local.sequence))
+    assert backlog is None
+
+def test_rotation_starts_a_new_epoch(tmp_path):
+    a, b = workers(tmp_path, max_bytes=200)
+    old = b.epoch
+    for n in range(10):
+        a.publish('queue', {"n": n})
+    assert wait_for(lambda: b.epoch != old)
+    _, backlog = b.subscribe({'queue'}, (old, 1))
+    assert backlog is None
+
+def test_module_imports_without_fcntl():
+    # Windows has no fcntl; only FileBackend needs it.
+    code = "import sys; sys.modules['fcntl'] = None; import application"
+    assert subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(__file__))).returncode == 0
@@ -0,0 +1,49 @@
+from application    import app
+import csv
+import io
+import openpyxl
+import pytest
+import time
+
+@pytest.fixture
+def appointments(client, booking, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'EXPORT_DIR', str(tmp_path))
+    monkeypatch.setitem(app.config, 'EXPORT_FETCH_SIZE', 2)
+    for start, status in (('05T08', 'Pending'), ('05T10', 'Completed'), ('06T08', 'Pending'), ('08T08', 'Pending')):
+        assert client.post('/api/appointment', json=booking(f'2026-01-{start}:00:00', staff_id=1, status=status)).status_code == 200
+    return client
+
+def csv_rows(response):
+    return list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+def test_csv_export_streams_the_range(appointments):
+    response = appointments.get('/api/export/appointments?from=2026-01-05&to=2026-01-06')
+    assert response.status_code == 200 and response.mimetype == 'text/csv'
+    assert 'attachment' in response.headers['Content-Disposition']
+    rows = csv_rows(response)
+    assert rows[0][:3] == ["id", "appointment_date", "status"] and [row[0] for row in rows[1:]] == ['1', '2', '3']
+    rows = csv_rows(appointments.get('/api/export/appointments?status=Completed'))
+    assert [row[0] for row in rows[1:]] == ['2']
+
+def test_xlsx_export(appointments):
+    response = appointments.get('/api/export/appointments?format=xlsx&from=2026-01-06')
+    sheet = openpyxl.load_workbook(io.BytesIO(response.data), read_only=True).active
+    assert [row[0] for row in sheet.iter_rows(values_only=True)] == ["id", 3, 4]
+
+def test_large_exports_run_as_jobs(appointments, monkeypatch):
+    monkeypatch.setitem(app.config, 'EXPORT_SYNC_MAX_ROWS', 2)
+    response = appointments.get('/api/export/appointments')
+    assert response.status_code == 202
+    status_url = response.json["status_url"]
+    deadline = time.monotonic() + 5
+    while appointments.get(status_url).json["status"] not in ('done', 'failed') and time.monotonic() < deadline:
+        time.sleep(0.05)
+    job = appointments.get(status_url).json
+    assert job["status"] == 'done' and job["rows"] == 4
+    assert len(csv_rows(appointments.get(job["download_url"]))) == 5
+
+def test_export_arguments_are_validated(appointments):
+    assert appointments.get('/api/export/invoices').status_code == 404
+    assert appointments.get('/api/export/payments?format=pdf').status_code == 400
+    assert appointments.get('/api/export/payments?from=2026-02-01&to=2026-01-01').status_code == 400
+    assert appointments.get('/api/export/jobs/' + '0' * 32).status_code == 404
@@ -0,0 +1,13 @@
+from application    import app
+
+def test_factory_clamps_rows(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'API_FACTORY_MAX_ROWS', 3)
+    response = client.get('/api/factory?n=1000000&seed=1')
+    assert response.status_code == 200
+    assert set(response.json["rows"].values()) == {3}
+    assert client.get('/api/factory?n=0').status_code == 400
+
+def test_factory_is_development_only(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'TESTING', False)
+    monkeypatch.setitem(app.config, 'DEBUG', False)
+    assert client.get('/api/factory?n=1').status_code == 404
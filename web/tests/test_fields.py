@@ -0,0 +1,24 @@
+def service(client):
+    client.post('/api/service', json={"name": "Wash", "description": "d", "price": 10, "duration": 30})
+
+def test_fields_select_columns_and_keep_the_id(client):
+    service(client)
+    assert client.get('/api/service/1?fields=name,price').json == {"id": 1, "name": "Wash", "price": 10}
+    assert client.get('/api/service?fields=duration').json["data"] == [{"id": 1, "duration": 30}]
+
+def test_full_rows_match_to_dict(client):
+    service(client)
+    assert client.get('/api/service/1').json == {"id": 1, "name": "Wash", "description": "d", "price": 10, "duration": 30}
+
+def test_unknown_or_hidden_fields_are_rejected(client):
+    client.post('/api/user', json={"name": "A", "email": "a@x", "phone": "1", "password": "p", "role": "customer"})
+    for fields in ('nope', 'name,password_hash'):
+        response = client.get(f'/api/user/1?fields={fields}')
+        assert response.status_code == 400 and "Unknown fields" in response.json["error"]
+
+def test_projections_have_their_own_etags(client, booking):
+    client.post('/api/appointment', json=booking('2026-01-05T09:00:00', staff_id=1))
+    full = client.get('/api/appointment/1')
+    projected = client.get('/api/appointment/1?fields=status')
+    assert full.headers['ETag'] != projected.headers['ETag']
+    assert client.get('/api/appointment/1?fields=status', headers={'If-None-Match': projected.headers['ETag']}).status_code == 304
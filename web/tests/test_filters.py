@@ -0,0 +1,29 @@
+def ids(response):
+    assert response.status_code == 200
+    return [row["id"] for row in response.json["data"]]
+
+def appointments(client, booking):
+    client.post('/api/appointment', json=booking('2026-01-05T09:00:00', staff_id=1))
+    client.post('/api/appointment', json=booking('2026-01-06T09:00:00', staff_id=2, status='Confirmed'))
+    client.post('/api/appointment', json=booking('2026-01-07T09:00:00', staff_id=1, status='Cancelled'))
+
+def test_equality_and_in_filters(client, booking):
+    appointments(client, booking)
+    assert ids(client.get('/api/appointment?staff_id=1')) == [1, 3]
+    assert ids(client.get('/api/appointment?status=Confirmed,Cancelled')) == [2, 3]
+    assert ids(client.get('/api/appointment?staff_id=1&status=Pending')) == [1]
+
+def test_date_ranges_are_half_open(client, booking):
+    appointments(client, booking)
+    assert ids(client.get('/api/appointment?from=2026-01-06&to=2026-01-07T09:00:00')) == [2]
+    assert ids(client.get('/api/appointment?appointment_date_from=2026-01-06T09:00:00')) == [2, 3]
+
+def test_boolean_filter(client, booking):
+    client.put('/api/staff/2', json={"on_shift": False})
+    assert ids(client.get('/api/staff?on_shift=true')) == [1]
+    assert client.get('/api/staff?on_shift=maybe').status_code == 400
+
+def test_invalid_filter_values_are_rejected(client, booking):
+    for query in ('staff_id=one', 'from=not-a-date', 'appointment_date_to=2026-13-01'):
+        response = client.get(f'/api/appointment?{query}')
+        assert response.status_code == 400 and "Invalid" in response.json["error"]
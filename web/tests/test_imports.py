@@ -0,0 +1,26 @@
+import io
+
+def upload(client, text):
+    return client.post('/api/import/user', data={'file': (io.BytesIO(text.encode()), 'users.csv')},
+                       content_type='multipart/form-data')
+
+def test_rerun_with_different_email_case_skips(client):
+    header = "name,email,phone,password,role\n"
+    assert upload(client, header + "A,Ann@X.com,0917,pw,customer\n").json["created"] == 1
+    response = upload(client, header + "A,ann@x.COM,0917,pw,customer\nB,ANN@x.com,0918,pw,customer\n")
+    assert response.json["created"] == 0 and response.json["skipped"] == 2 and response.json["errors"] == []
+
+def test_unreadable_file_reports_committed_row(client):
+    # Past the first decoded block, so some chunks are committed before the error.
+    header = "name,description,price,duration\n"
+    rows = "".join(f"Service {i},d,10,30\n" for i in range(1, 601))
+    response = client.post('/api/import/service?chunk_size=100',
+                           data={'file': (io.BytesIO((header + rows).encode() + b"\xff\xfe,bad\n"), 'services.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    committed = response.json["committed_row"]
+    assert committed and committed % 100 == 0 and committed <= response.json["last_row"]
+    assert response.json["created"] == committed
+    resumed = client.post('/api/import/service', data={'file': (io.BytesIO((header + rows).encode()), 'services.csv')},
+                          content_type='multipart/form-data')
+    assert resumed.json["skipped"] == committed and resumed.json["committed_row"] == 600
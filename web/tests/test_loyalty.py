@@ -0,0 +1,28 @@
+def user(client):
+    client.post('/api/user', json={"name": "A", "email": "a@x", "phone": "1", "password": "p", "role": "customer"})
+
+def balance(client):
+    return client.get('/api/loyalty/balance/1').json
+
+def test_balance_follows_ledger_writes(client):
+    user(client)
+    assert balance(client)["balance"] == 0
+    client.post('/api/loyalty', json={"user_id": 1, "points_earned": 10, "reward_status": "Available"})
+    client.post('/api/loyalty/bulk', json=[{"user_id": 1, "points_earned": 5, "reward_status": "Available"}])
+    client.put('/api/loyalty/1', json={"points_spent": 3})
+    assert balance(client)["balance"] == 12 and balance(client)["entries"] == 2
+    client.delete('/api/loyalty/2')
+    assert balance(client)["balance"] == 7 and balance(client)["entries"] == 1
+
+def test_numeric_strings_are_coerced(client):
+    user(client)
+    assert client.post('/api/loyalty', json={"user_id": "1", "points_earned": "10", "reward_status": "Available"}).status_code == 200
+    assert client.put('/api/loyalty/1', json={"points_spent": "4"}).status_code == 200
+    assert balance(client)["balance"] == 6
+
+def test_bad_points_are_rejected(client):
+    user(client)
+    for points in ("ten", 1.5, [1]):
+        response = client.post('/api/loyalty', json={"user_id": 1, "points_earned": points, "reward_status": "Available"})
+        assert response.status_code == 400 and "points_earned" in response.json["error"]
+    assert client.get('/api/loyalty/balance/2').status_code == 404
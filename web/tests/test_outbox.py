@@ -0,0 +1,67 @@
+from data           import db
+from data.models    import Notification, User
+from data.repositories import outbox
+from application    import app
+from datetime       import datetime, timedelta
+import pytest
+
+def pending(client):
+    with app.app_context():
+        return outbox.stats()["delivery_status"].get(outbox.PENDING, 0)
+
+def test_booking_queues_notification(client, booking):
+    assert client.post('/api/appointment', json=booking('2026-01-05T09:00:00', staff_id=1)).status_code == 200
+    assert pending(client) == 1
+
+def test_rejected_bulk_queues_nothing(client, booking):
+    response = client.post('/api/appointment/bulk', json=[
+        booking('2026-01-05T12:00:00', staff_id=1), booking('2026-01-05T12:30:00', staff_id=1)])
+    assert response.status_code == 400
+    assert pending(client) == 0
+
+def test_transport_must_implement_send():
+    with pytest.raises(TypeError):
+        outbox.Transport({})
+
+def worker():
+    return outbox.OutboxWorker(app, transport=outbox.FakeTransport(app.config))
+
+def statuses():
+    with app.app_context():
+        return outbox.stats()["delivery_status"]
+
+def test_worker_delivers_and_fails_deleted_users(client, booking):
+    client.post('/api/user', json={"name": "B", "email": "b@x", "phone": "2", "password": "p", "role": "customer"})
+    client.post('/api/appointment', json=booking('2026-01-05T09:00:00', staff_id=1))
+    client.post('/api/appointment', json=booking('2026-01-05T09:00:00', staff_id=2, user_id=2))
+    with app.app_context():
+        db.session.execute(User.__table__.delete().where(User.id == 2))
+        db.session.commit()
+    sender = worker()
+    try:
+        assert sender.run_once() == 1
+    finally:
+        sender.stop()
+    assert [message["user_id"] for message in sender.transport.sent] == [1]
+    assert statuses() == {outbox.SENT: 1, outbox.FAILED: 1}
+
+def test_expired_claims_without_attempts_left_fail(client, booking):
+    client.post('/api/appointment', json=booking('2026-01-05T09:00:00', staff_id=1))
+    client.post('/api/appointment', json=booking('2026-01-05T11:00:00', staff_id=1))
+    with app.app_context():
+        Notification.query.update({Notification.delivery_status: outbox.SENDING,
+                                   Notification.claimed_at: datetime.now() - timedelta(days=1)})
+        Notification.query.filter(Notification.id == 1).update({Notification.attempts: app.config['NOTIFY_MAX_ATTEMPTS']})
+        db.session.commit()
+        sender = worker()
+        try:
+            assert sender.reclaim() == 1
+        finally:
+            sender.stop()
+    assert statuses() == {outbox.PENDING: 1, outbox.FAILED: 1}
+
+def test_worker_needs_a_transport_outside_testing(monkeypatch):
+    monkeypatch.setitem(app.config, 'NOTIFY_TRANSPORT', None)
+    monkeypatch.setitem(app.config, 'TESTING', False)
+    with pytest.raises(RuntimeError):
+        outbox.OutboxWorker(app)
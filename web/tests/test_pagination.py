@@ -0,0 +1,39 @@
+def services(client, count):
+    client.post('/api/service/bulk', json=[
+        {"name": f"S{i}", "description": "d", "price": 10, "duration": 30} for i in range(count)])
+
+def ids(response):
+    return [row["id"] for row in response.json["data"]]
+
+def test_cursor_walks_every_row_once(client):
+    services(client, 7)
+    seen, cursor = [], None
+    while True:
+        response = client.get('/api/service?limit=3' + (f'&after={cursor}' if cursor else ''))
+        assert response.status_code == 200
+        seen.extend(ids(response))
+        cursor = response.json["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == list(range(1, 8))
+
+def test_exact_last_page_has_no_next_cursor(client):
+    services(client, 3)
+    assert client.get('/api/service?limit=3').json["next_cursor"] is None
+
+def test_cursor_survives_deletes_before_it(client):
+    services(client, 6)
+    cursor = client.get('/api/service?limit=3').json["next_cursor"]
+    client.delete('/api/service/1')
+    assert ids(client.get(f'/api/service?limit=3&after={cursor}')) == [4, 5, 6]
+
+def test_page_size_is_capped(client, monkeypatch):
+    from application import app
+    monkeypatch.setitem(app.config, 'API_MAX_PAGE_SIZE', 2)
+    services(client, 3)
+    assert len(ids(client.get('/api/service?limit=100'))) == 2
+
+def test_bad_page_args_are_rejected(client):
+    for query in ('limit=abc', 'limit=0', 'after=!!not-a-cursor'):
+        response = client.get(f'/api/service?{query}')
+        assert response.status_code == 400 and "error" in response.json
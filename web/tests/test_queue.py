@@ -0,0 +1,29 @@
+from data           import db
+from data.models    import Queue
+from data.repositories import common
+from application    import app
+import pytest
+
+@pytest.fixture(params=['shared', 'local'])
+def line(request, client, booking):
+    directory = app.config['CACHE_INVALIDATION_DIR']
+    if request.param == 'local':
+        app.config['CACHE_INVALIDATION_DIR'] = None
+        common._read_cache = None
+    for hour in (9, 10, 11):
+        client.post('/api/appointment', json=booking(f'2026-01-05T{hour:02d}:00:00', staff_id=1))
+        client.post('/api/queue/enqueue', json={"appointment_id": hour - 8})
+    yield client
+    app.config['CACHE_INVALIDATION_DIR'] = directory
+    common._read_cache = None
+
+def test_position_follows_writes_from_other_workers(line):
+    assert line.get('/api/queue/3/position').json["position"] == 3
+    # Another worker serves the head of the line: the row changes and the bus
+    # is bumped, but this worker's in-memory line is not touched.
+    with app.app_context():
+        Queue.query.filter(Queue.id == 1).update({Queue.status: 'Serving'}, synchronize_session=False)
+        db.session.commit()
+        if common.read_cache().bus.shared:
+            common.read_cache().bus.publish('queue-order')
+    assert line.get('/api/queue/3/position').json["position"] == 2
@@ -0,0 +1,46 @@
+import pytest
+
+RANGE = 'from=2026-01-05&to=2026-01-06'
+
+@pytest.fixture
+def activity(client, booking):
+    client.post('/api/appointment', json=booking('2026-01-05T09:00:00', staff_id=1, status='Completed'))
+    client.post('/api/appointment', json=booking('2026-01-05T11:00:00', staff_id=2, status='Cancelled'))
+    client.post('/api/appointment', json=booking('2026-01-06T09:00:00', staff_id=1))
+    client.post('/api/payment/bulk', json=[
+        {"appointment_id": 1, "amount": 100, "payment_method": "Cash", "transaction_date": '2026-01-05T10:00:00', "payment_status": "Paid"},
+        {"appointment_id": 3, "amount": 50.5, "payment_method": "GCash", "transaction_date": '2026-01-06T10:00:00', "payment_status": "Paid"},
+        {"appointment_id": 2, "amount": 75, "payment_method": "Cash", "transaction_date": '2026-01-05T12:00:00'},
+    ])
+    return client
+
+def test_revenue_counts_paid_payments(activity):
+    report = activity.get(f'/api/reports/revenue?{RANGE}').json
+    assert report["total"] == 150.5 and report["payments"] == 2
+    assert [(row["payment_method"], row["amount"]) for row in report["by_method"]] == [("Cash", 100.0), ("GCash", 50.5)]
+    assert [row["day"] for row in report["by_day"]] == ['2026-01-05', '2026-01-06']
+
+def test_operations_rates(activity):
+    report = activity.get(f'/api/reports/operations?{RANGE}').json
+    assert report["appointments"] == 3
+    assert report["by_status"] == {"Cancelled": 1, "Completed": 1, "Pending": 1}
+    assert report["completion_rate"] == round(1 / 3, 4)
+
+def test_utilization_skips_cancelled(activity):
+    report = activity.get(f'/api/reports/utilization?{RANGE}').json
+    assert report["available_minutes"] == 2 * 480
+    staff = {row["staff_id"]: row for row in report["staff"]}
+    assert staff[1]["booked_minutes"] == 120 and staff[2]["booked_minutes"] == 0
+
+def test_reports_are_cached_until_refresh(activity):
+    first = activity.get(f'/api/reports/revenue?{RANGE}').json
+    activity.post('/api/payment', json={"appointment_id": 3, "amount": 10, "payment_method": "Cash",
+                                        "transaction_date": '2026-01-06T11:00:00', "payment_status": "Paid"})
+    assert activity.get(f'/api/reports/revenue?{RANGE}').json["total"] == first["total"]
+    assert activity.get(f'/api/reports/revenue?{RANGE}&refresh=1').json["total"] == 160.5
+
+def test_report_arguments_are_validated(client):
+    assert client.get('/api/reports/profit').status_code == 404
+    assert client.get('/api/reports/revenue?from=2026-02-01&to=2026-01-01').status_code == 400
+    assert client.get('/api/reports/revenue?from=yesterday').status_code == 400
+    assert client.get('/api/reports/revenue?from=2024-01-01&to=2026-01-01').status_code == 400
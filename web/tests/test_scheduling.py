@@ -0,0 +1,70 @@
+from data           import db
+from data.models    import Appointment
+from application    import app
+from datetime       import datetime
+
+def check(client, staff_id, start):
+    return client.get(f'/api/schedule/check?staff_id={staff_id}&start={start}&service_type=Full Wash').json['free']
+
+def test_overlapping_booking_is_rejected(client, booking):
+    assert client.post('/api/appointment', json=booking('2026-01-05T09:00:00', staff_id=1)).status_code == 200
+    assert client.post('/api/appointment', json=booking('2026-01-05T09:30:00', staff_id=1)).status_code == 409
+    assert client.post('/api/appointment', json=booking('2026-01-05T09:30:00', staff_id=2)).status_code == 200
+
+def test_bulk_items_see_each_other(client, booking):
+    response = client.post('/api/appointment/bulk', json=[
+        booking('2026-01-05T12:00:00', staff_id=1), booking('2026-01-05T12:30:00', staff_id=1)])
+    assert response.status_code == 400
+    assert response.json["results"][0]["index"] == 1
+
+def test_rolled_back_booking_leaves_no_phantom(client, booking):
+    assert check(client, 1, '2026-01-05T12:00:00')
+    client.post('/api/appointment/bulk', json=[
+        booking('2026-01-05T12:00:00', staff_id=1), booking('2026-01-05T12:30:00', staff_id=1)])
+    assert check(client, 1, '2026-01-05T12:00:00')
+
+def test_committed_booking_reaches_shared_index(client, booking):
+    assert check(client, 1, '2026-01-05T12:00:00')
+    client.post('/api/appointment', json=booking('2026-01-05T12:00:00', staff_id=1))
+    assert not check(client, 1, '2026-01-05T12:30:00')
+
+def test_booking_rechecks_rows_committed_elsewhere(client, booking):
+    # Warm this worker's index, then let "another worker" commit a booking.
+    assert check(client, 1, '2026-01-05T15:00:00')
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(Appointment.__table__.insert(), {
+                "user_id": 1, "staff_id": 1, "vehicle_id": 1, "service_type": "Full Wash",
+                "appointment_date": datetime(2026, 1, 5, 15), "status": 'Pending', "payment_status": 'Unpaid',
+                "created_at": datetime.now(), "updated_at": datetime.now()})
+    assert client.post('/api/appointment', json=booking('2026-01-05T15:30:00', staff_id=1)).status_code == 409
+
+def test_free_slots_are_earliest_across_staff(client, booking):
+    client.post('/api/appointment', json=booking('2026-01-05T08:00:00', staff_id=2))
+    slots = client.get('/api/schedule/free?service_type=Full Wash&start=2026-01-05T08:00:00'
+                       '&end=2026-01-05T12:00:00&limit=4').json['slots']
+    assert [(slot["start"][11:16], slot["staff_id"]) for slot in slots] == \
+        [("08:00", 1), ("08:15", 1), ("08:30", 1), ("08:45", 1)]
+    slots = client.get('/api/schedule/free?service_type=Full Wash&start=2026-01-05T09:00:00'
+                       '&end=2026-01-05T12:00:00&limit=4').json['slots']
+    assert [(slot["start"][11:16], slot["staff_id"]) for slot in slots] == \
+        [("09:00", 1), ("09:00", 2), ("09:15", 1), ("09:15", 2)]
+
+def test_rescheduling_onto_a_booked_slot_is_rejected(client, booking):
+    client.post('/api/appointment', json=booking('2026-01-05T09:00:00', staff_id=1))
+    client.post('/api/appointment', json=booking('2026-01-05T11:00:00', staff_id=2))
+    assert client.put('/api/appointment/2', json={"staff_id": 1, "appointment_date": '2026-01-05T09:30:00'}).status_code == 409
+    assert client.patch('/api/appointment/bulk', json=[
+        {"id": 2, "staff_id": 1, "appointment_date": '2026-01-05T09:15:00'}]).status_code == 409
+    # Moving a booking within its own slot is not a clash with itself.
+    assert client.put('/api/appointment/1', json={"appointment_date": '2026-01-05T09:15:00'}).status_code == 200
+    assert check(client, 1, '2026-01-05T08:00:00')
+    assert not check(client, 1, '2026-01-05T10:00:00')
+
+def test_bookings_across_midnight_clash(client, booking):
+    assert client.post('/api/appointment', json=booking('2026-01-05T23:30:00', staff_id=1)).status_code == 200
+    assert client.post('/api/appointment', json=booking('2026-01-06T00:00:00', staff_id=1)).status_code == 409
+    assert not check(client, 1, '2026-01-06T00:15:00')
+    slots = client.get('/api/schedule/free?service_type=Full Wash&start=2026-01-06T00:00:00'
+                       '&end=2026-01-06T02:00:00&limit=10').json['slots']
+    assert [slot["start"][11:16] for slot in slots if slot["staff_id"] == 1][0] == "00:30"
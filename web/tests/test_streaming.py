@@ -0,0 +1,32 @@
+from application    import app
+import json
+
+def services(client, count):
+    client.post('/api/service/bulk', json=[
+        {"name": f"S{i}", "description": "d", "price": 10, "duration": 30} for i in range(count)])
+
+def lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_stream_returns_every_row_as_ndjson(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'API_STREAM_BATCH_SIZE', 2)
+    services(client, 5)
+    response = client.get('/api/service?stream=1')
+    assert response.mimetype == 'application/x-ndjson'
+    assert [row["id"] for row in lines(response)] == [1, 2, 3, 4, 5]
+
+def test_accept_header_selects_the_stream(client):
+    services(client, 2)
+    response = client.get('/api/service', headers={'Accept': 'application/x-ndjson'})
+    assert response.mimetype == 'application/x-ndjson' and len(lines(response)) == 2
+
+def test_stream_applies_cursor_fields_and_filters(client):
+    services(client, 4)
+    rows = lines(client.get('/api/service?stream=1&after=2&fields=name'))
+    assert rows == [{"id": 3, "name": "S2"}, {"id": 4, "name": "S3"}]
+    assert lines(client.get('/api/service?stream=1&name=S1,S3&fields=name')) == [{"id": 2, "name": "S1"}, {"id": 4, "name": "S3"}]
+
+def test_stream_rejects_bad_arguments_before_streaming(client):
+    assert client.get('/api/service?stream=1&after=!!bad').status_code == 400
+    assert client.get('/api/service?stream=1&fields=nope').status_code == 400
+    assert client.get('/api/service?stream=1&from=yesterday').status_code == 400
@@ -0,0 +1,64 @@
+from application    import app
+import pytest
+
+@pytest.fixture
+def appointments(client, booking):
+    for hour in (9, 10, 11):
+        client.post('/api/appointment', json=booking(f'2026-01-05T{hour:02d}:00:00', staff_id=1))
+    return client
+
+def test_read_sends_version_etag(appointments):
+    response = appointments.get('/api/appointment/1')
+    assert response.headers['ETag'] == '"v1"' and response.json["version"] == 1
+    assert appointments.get('/api/appointment/1', headers={'If-None-Match': '"v1"'}).status_code == 304
+
+def test_if_match_update_bumps_version(appointments):
+    response = appointments.put('/api/appointment/1', json={"status": "Confirmed"}, headers={'If-Match': '"v1"'})
+    assert response.status_code == 200
+    assert response.json["version"] == 2 and response.headers['ETag'] == '"v2"'
+    assert appointments.get('/api/appointment/1').json["version"] == 2
+
+def test_stale_if_match_is_409(appointments):
+    appointments.put('/api/appointment/1', json={"status": "Confirmed"}, headers={'If-Match': '"v1"'})
+    response = appointments.put('/api/appointment/1', json={"status": "Cancelled"}, headers={'If-Match': '"v1"'})
+    assert response.status_code == 409 and response.json["version"] == 2
+    assert appointments.get('/api/appointment/1').json["status"] == 'Confirmed'
+
+def test_body_version_and_projection_etag(appointments):
+    etag = appointments.get('/api/appointment/1?fields=status').headers['ETag']
+    assert appointments.put('/api/appointment/1', json={"status": "Confirmed"}, headers={'If-Match': etag}).status_code == 200
+    assert appointments.put('/api/appointment/1', json={"status": "Pending", "version": 1}).status_code == 409
+    assert appointments.put('/api/appointment/1', json={"status": "Pending", "version": 2}).status_code == 200
+
+def test_bad_preconditions(appointments):
+    assert appointments.put('/api/appointment/1', json={"status": "Pending"}, headers={'If-Match': 'nope'}).status_code == 412
+    assert appointments.put('/api/appointment/1', json={"status": "Pending", "version": "1"}).status_code == 400
+    assert appointments.put('/api/appointment/1', json={"status": "Pending", "version": 2}, headers={'If-Match': '"v1"'}).status_code == 400
+    assert appointments.put('/api/appointment/99', json={"status": "Pending", "version": 1}).status_code == 404
+
+def test_if_match_required(appointments):
+    app.config['API_REQUIRE_IF_MATCH'] = True
+    try:
+        assert appointments.put('/api/appointment/1', json={"status": "Pending"}).status_code == 428
+        assert appointments.put('/api/appointment/1', json={"status": "Pending"}, headers={'If-Match': '"v1"'}).status_code == 200
+    finally:
+        app.config['API_REQUIRE_IF_MATCH'] = False
+
+def test_bulk_conflict_writes_nothing(appointments):
+    response = appointments.patch('/api/appointment/bulk', json=[
+        {"id": 2, "status": "Confirmed", "version": 1}, {"id": 3, "status": "Confirmed", "version": 5}])
+    assert response.status_code == 409
+    assert response.json["results"] == [{"index": 1, "id": 3, "status": "conflict", "version": 1, "expected": 5}]
+    assert appointments.get('/api/appointment/2').json["status"] == 'Pending'
+
+def test_bulk_rejects_duplicate_ids(appointments):
+    response = appointments.patch('/api/appointment/bulk', json=[
+        {"id": 2, "status": "Confirmed", "version": 1}, {"id": 2, "status": "Cancelled", "version": 1}])
+    assert response.status_code == 400
+    assert response.json["results"] == [{"index": 1, "error": "Duplicate id 2"}]
+
+def test_queue_transitions_bump_version(appointments):
+    appointments.post('/api/queue/enqueue', json={"appointment_id": 1})
+    appointments.post('/api/queue/next')
+    response = appointments.put('/api/queue/1', json={"status": "Done", "version": 1})
+    assert response.status_code == 409 and response.json["version"] == 2